@@ -0,0 +1,93 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""
+Run the function and class front ends on one corpus.
+
+Checks both produce identical output and prints their speed. Exits
+with status 1 if outputs differ or one front end is more than
+`max_ratio` times slower than the other.
+
+    $ PYTHONPATH=. python benchmarks/bench_engine.py [count] [max_ratio]
+"""
+
+import random
+import sys
+import time
+
+from pyben.bencode import bendecode, benencode
+from pyben.classes import Bendecoder, Benencoder
+
+
+def make_torrent(rng, num: int) -> dict:
+    """Build a multi-file torrent like structure."""
+    files = [
+        {"length": rng.randrange(1 << 30), "path": ["dir", f"file{i}.bin"]}
+        for i in range(rng.randrange(1, 50))
+    ]
+    return {
+        "announce": "http://tracker.example/announce",
+        "announce-list": [["http://a.example"], ["udp://b.example:80"]],
+        "creation date": 1700000000 + num,
+        "info": {
+            "files": files,
+            "name": f"torrent {num} é",
+            "piece length": 1 << 18,
+            "pieces": rng.randbytes(20 * rng.randrange(1, 500)),
+        },
+    }
+
+
+def timed(func, items, repeat=3) -> float:
+    """Return the best time of applying `func` to every item."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(count=2000, max_ratio=1.5):
+    """Run the benchmark."""
+    rng = random.Random(7)
+    values = [make_torrent(rng, num) for num in range(count)]
+    encoded = [benencode(value) for value in values]
+    decoder, encoder = Bendecoder(), Benencoder()
+
+    mismatches = sum(
+        encoder.encode(value) != data or decoder.decode(data) != value
+        for value, data in zip(values, encoded)
+    )
+    size = sum(map(len, encoded)) / (1 << 20)
+    print(f"corpus: {count} values, {size:.1f} MiB, {mismatches} mismatches")
+
+    status = int(bool(mismatches))
+    for name, funcs, items in (
+        ("decode", (bendecode, decoder.decode), encoded),
+        ("encode", (benencode, encoder.encode), values),
+    ):
+        func_time, class_time = (timed(func, items) for func in funcs)
+        print(
+            f"{name}: functions {size / func_time:7.1f} MiB/s  "
+            f"classes {size / class_time:7.1f} MiB/s"
+        )
+        if max(func_time, class_time) / min(func_time, class_time) > max_ratio:
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    sys.exit(main(int(args[0]) if args else 2000, *map(float, args[1:])))
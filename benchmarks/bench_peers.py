@@ -0,0 +1,72 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""
+Compare bulk compact peer unpacking with slicing records one by one.
+
+Prints announce replies per second for a reply of 50 peers, and the
+rate of packing them back.
+
+    $ PYTHONPATH=. python benchmarks/bench_peers.py [count]
+"""
+
+import random
+import socket
+import sys
+import time
+
+from pyben.peers import pack_compact, unpack_compact
+
+
+def sliced(data: bytes) -> list:
+    """Unpack peers 6 bytes at a time."""
+    peers = []
+    for start in range(0, len(data), 6):
+        ip = socket.inet_ntoa(data[start:start + 4])
+        port = int.from_bytes(data[start + 4:start + 6], "big")
+        peers.append((ip, port))
+    return peers
+
+
+def timed(func, items, repeat=3) -> float:
+    """Return the best time of applying `func` to every item."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(count=20000):
+    """Run the benchmark."""
+    rng = random.Random(7)
+    corpus = [rng.randbytes(6 * 50) for _ in range(count)]
+    peers = [unpack_compact(data) for data in corpus]
+    base = timed(sliced, corpus)
+    cases = (
+        ("unpack text", timed(unpack_compact, corpus)),
+        ("unpack raw", timed(lambda d: unpack_compact(d, text=False), corpus)),
+    )
+    print(f"{'sliced':12} {count / base:10,.0f} replies/s")
+    for label, spent in cases:
+        print(
+            f"{label:12} {count / spent:10,.0f} replies/s  x{base / spent:.2f}"
+        )
+    print(f"{'pack':12} {count / timed(pack_compact, peers):10,.0f} replies/s")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 20000)
@@ -0,0 +1,141 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""
+Compare schema-compiled decoders with the generic decoder.
+
+Prints messages per second for every built-in message type and exits
+with status 1 if a schema falls back on its own corpus.
+
+    $ PYTHONPATH=. python benchmarks/bench_schema.py [count]
+"""
+
+import random
+import sys
+import time
+
+from pyben import schema
+from pyben.bencode import bendecode, benencode
+
+
+def announce_response(rng) -> dict:
+    """Build a compact tracker announce response."""
+    return {
+        "complete": rng.randrange(1000),
+        "incomplete": rng.randrange(1000),
+        "interval": 1800,
+        "min interval": 900,
+        "peers": rng.randbytes(6 * 50),
+    }
+
+
+def krpc_ping(rng) -> dict:
+    """Build a KRPC ping response."""
+    return {"r": {"id": rng.randbytes(20)}, "t": rng.randbytes(2), "y": "r"}
+
+
+def krpc_get_peers(rng) -> dict:
+    """Build a KRPC get_peers query."""
+    return {
+        "a": {"id": rng.randbytes(20), "info_hash": rng.randbytes(20)},
+        "q": "get_peers",
+        "t": rng.randbytes(2),
+        "y": "q",
+    }
+
+
+def krpc_get_peers_response(rng) -> dict:
+    """Build a KRPC get_peers response carrying peers."""
+    return {
+        "r": {
+            "id": rng.randbytes(20),
+            "token": rng.randbytes(8),
+            "values": [rng.randbytes(6) for _ in range(8)],
+        },
+        "t": rng.randbytes(2),
+        "y": "r",
+    }
+
+
+def krpc_announce_peer(rng) -> dict:
+    """Build a KRPC announce_peer query."""
+    return {
+        "a": {
+            "id": rng.randbytes(20),
+            "implied_port": 1,
+            "info_hash": rng.randbytes(20),
+            "port": rng.randrange(1 << 16),
+            "token": rng.randbytes(8),
+        },
+        "q": "announce_peer",
+        "t": rng.randbytes(2),
+        "y": "q",
+    }
+
+
+def torrent_info(rng) -> dict:
+    """Build a multi-file torrent info dict."""
+    return {
+        "files": [
+            {"length": rng.randrange(1 << 30), "path": ["dir", f"{i}.bin"]}
+            for i in range(rng.randrange(1, 20))
+        ],
+        "name": "payload",
+        "piece length": 1 << 18,
+        "pieces": rng.randbytes(20 * rng.randrange(1, 200)),
+    }
+
+
+CASES = (
+    (schema.ANNOUNCE_RESPONSE, announce_response),
+    (schema.KRPC_PING, krpc_ping),
+    (schema.KRPC_GET_PEERS, krpc_get_peers),
+    (schema.KRPC_GET_PEERS_RESPONSE, krpc_get_peers_response),
+    (schema.KRPC_ANNOUNCE_PEER, krpc_announce_peer),
+    (schema.TORRENT_INFO, torrent_info),
+)
+
+
+def timed(func, items, repeat=3) -> float:
+    """Return the best time of applying `func` to every item."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(count=20000):
+    """Run the benchmark."""
+    rng = random.Random(7)
+    status = 0
+    for compiled, make in CASES:
+        corpus = [benencode(make(rng)) for _ in range(count)]
+        compiled.matched = compiled.fallbacks = 0
+        generic = timed(bendecode, corpus)
+        special = timed(compiled.decode, corpus)
+        if compiled.fallbacks:
+            status = 1
+        print(
+            f"{compiled.name:24} generic {count / generic:10,.0f} msg/s  "
+            f"schema {count / special:10,.0f} msg/s  "
+            f"x{generic / special:4.2f}  fallbacks {compiled.fallbacks}"
+        )
+    return status
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    sys.exit(main(int(args[0]) if args else 20000))
@@ -0,0 +1,69 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""
+Compare pickled and shared memory results of process pool decoding.
+
+    $ PYTHONPATH=. python benchmarks/bench_shm.py [count] [piece_bytes]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import pyben
+from pyben.parallel import load_many
+from pyben.shm import load_many_shared
+
+
+def make_torrents(directory: str, count: int, piece_bytes: int) -> list:
+    """Write `count` torrents with `piece_bytes` of piece hashes."""
+    paths = []
+    for num in range(count):
+        meta = {
+            "announce": "http://tracker.example/announce",
+            "info": {
+                "name": f"file{num}",
+                "piece length": 1 << 18,
+                "pieces": os.urandom(piece_bytes),
+                "length": piece_bytes << 13,
+            },
+        }
+        path = os.path.join(directory, f"{num}.torrent")
+        pyben.dump(meta, path)
+        paths.append(path)
+    return paths
+
+
+def timed(func, paths: list) -> float:
+    """Return the seconds taken to consume `func(paths)`."""
+    start = time.perf_counter()
+    for _, result in func(paths, executor="process"):
+        if isinstance(result, Exception):
+            raise result
+    return time.perf_counter() - start
+
+
+def main(count=200, piece_bytes=1 << 20):
+    """Run the benchmark."""
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_torrents(directory, count, piece_bytes)
+        total = count * piece_bytes / (1 << 20)
+        for name, func in (("pickle", load_many), ("shm", load_many_shared)):
+            best = min(timed(func, paths) for _ in range(3))
+            print(f"{name:>8}: {best:.3f}s  {total / best:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
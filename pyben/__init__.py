@@ -16,53 +16,236 @@ PyBen is a library for decoding/encoding data, with the bencode specification.
 
 Bencode is commonly used for encoding Bittorrent Protocol Metafiles (.torrent).
 
+Submodules beyond decoding and encoding, and the names they export, are
+imported on first access so `import pyben` stays light.
+
 Modules
 ---------
 * api
 * classes
 * bencode
+* core
+* sinks
+* spans
+* parallel
+* stream
+* aio
+* rpc
+* cache
+* diskcache
+* shm
+* recordlog
+* transcode
+* export
+* schema
+* torrent
+* verify
+* create
+* peers
 
 Classes
 ---------
 * Bendecoder
 * Benencoder
+* BufferList
+* CoderPool
+* DecodeCache
+* DiskCache
+* IncrementalDecoder
+* Metainfo
+* PieceHashes
+* RecordLog
+* Schema
+* HashSink
+* TeeSink
+* VerifyResult
 
 Functions
 ---------
+* adump
+* aload
 * bendecode
 * benencode
+* benencode_into
+* cache_info
+* compact_array
+* compact_hook
 * dump
+* dump_many
 * dumps
+* encode_to
+* export_columns
+* export_ndjson
+* from_json
+* iterload
+* iterloads
 * load
 * loads
+* load_many
+* make_torrent
+* pack_compact
+* read_bencoded
 * readinto
+* scan
+* to_json_stream
+* unpack_compact
+* write_bencoded
 """
 
-from pyben import api, bencode, classes
-from pyben.api import dump, dumps, load, loadinto, loads, show
-from pyben.bencode import bendecode, benencode
-from pyben.classes import Bendecoder, Benencoder
-from pyben.exceptions import DecodeError, EncodeError, FilePathError
+import importlib
+
+from pyben import (api, bencode, cache, classes, core, sinks, spans, stream,
+                   transcode)
+from pyben.api import (dump, dump_many, dumps, iterload, iterloads, load,
+                       loadinto, loads, show)
+from pyben.bencode import bendecode, benencode, benencode_into, cache_info
+from pyben.cache import DecodeCache
+from pyben.classes import Bendecoder, Benencoder, CoderPool
+from pyben.exceptions import (DecodeError, EncodeError, FilePathError,
+                              RPCError)
+from pyben.sinks import BufferList, HashSink, TeeSink, encode_to
+from pyben.stream import IncrementalDecoder
+from pyben.transcode import from_json, to_json_stream
 from pyben.version import version
 
+_LAZY = {
+    "aio": (
+        "adump",
+        "aload",
+        "iter_bencoded",
+        "read_bencoded",
+        "write_bencoded",
+    ),
+    "create": ("make_torrent",),
+    "diskcache": ("DiskCache",),
+    "export": ("export_columns", "export_ndjson"),
+    "parallel": ("load_many", "scan"),
+    "peers": (
+        "compact_array",
+        "compact_hook",
+        "pack_compact",
+        "unpack_compact",
+    ),
+    "recordlog": ("RecordLog",),
+    "rpc": (),
+    "schema": ("Schema",),
+    "shm": (),
+    "torrent": ("Metainfo", "PieceHashes"),
+    "verify": ("VerifyResult",),
+}
+
+_EXPORTS = {name: module for module, names in _LAZY.items() for name in names}
+
+
+def __getattr__(name: str):
+    """
+    Import the submodules not needed for decoding on first access.
+
+    asyncio, multiprocessing, thread pools and NumPy are only loaded by
+    programs using the submodules or names that need them.
+
+    Parameters
+    ----------
+    name : str
+        Submodule or name exported by a submodule.
+
+    Raises
+    ------
+    AttributeError
+        `name` is not part of the package.
+
+    Returns
+    -------
+    any
+        The submodule or exported object.
+    """
+    if name in _LAZY:
+        return importlib.import_module(f"pyben.{name}")
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'pyben' has no attribute {name!r}")
+    module = importlib.import_module(f"pyben.{_EXPORTS[name]}")
+    value = globals()[name] = getattr(module, name)
+    return value
+
+
+def __dir__() -> list:
+    """List the package names including the ones imported lazily."""
+    return sorted(set(globals()) | set(__all__))
+
+
 __version__ = version
 __author__ = "alexpdev"
 
+# Lazy names are resolved by __getattr__.
+# pylint: disable=undefined-all-variable
 __all__ = [
     "Bendecoder",
     "Benencoder",
+    "BufferList",
+    "CoderPool",
+    "DecodeCache",
+    "DiskCache",
+    "IncrementalDecoder",
+    "Metainfo",
+    "PieceHashes",
+    "RecordLog",
+    "Schema",
+    "HashSink",
+    "TeeSink",
+    "VerifyResult",
+    "adump",
+    "aio",
+    "aload",
     "api",
     "bencode",
     "bendecode",
     "benencode",
+    "benencode_into",
+    "cache",
+    "cache_info",
     "classes",
+    "compact_array",
+    "compact_hook",
+    "core",
+    "diskcache",
     "dump",
+    "dump_many",
     "dumps",
+    "encode_to",
+    "export",
+    "export_columns",
+    "export_ndjson",
+    "from_json",
+    "iter_bencoded",
+    "iterload",
+    "iterloads",
     "load",
     "loads",
+    "load_many",
+    "make_torrent",
+    "create",
+    "pack_compact",
+    "parallel",
+    "peers",
+    "read_bencoded",
+    "recordlog",
+    "scan",
+    "schema",
+    "shm",
+    "stream",
+    "to_json_stream",
+    "torrent",
+    "transcode",
+    "unpack_compact",
+    "verify",
+    "write_bencoded",
     "show",
     "loadinto",
+    "sinks",
+    "spans",
     "DecodeError",
     "FilePathError",
     "EncodeError",
+    "RPCError",
+    "rpc",
 ]
@@ -0,0 +1,219 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""
+Asyncio API for loading, dumping and streaming bencoded data.
+
+File I/O and large decodes run in an executor so they never block the
+event loop.
+
+    >>> meta = await pyben.aload("path/to/file.torrent")
+    >>> await pyben.write_bencoded(writer, {"y": "q", "q": "ping"})
+    >>> reply = await pyben.read_bencoded(reader)
+
+Functions
+---------
+* aload
+* adump
+* iter_bencoded
+* read_bencoded
+* write_bencoded
+"""
+
+import asyncio
+import weakref
+from functools import partial
+
+from pyben.api import dump, load
+from pyben.bencode import bendecode, benencode_into
+from pyben.sinks import BufferList
+from pyben.stream import IncrementalDecoder
+
+READ_SIZE = 1 << 16
+OFFLOAD_SIZE = 1 << 20
+HIGH_WATER = 1 << 18
+
+_DECODERS = weakref.WeakKeyDictionary()
+
+
+async def aload(buffer, executor=None, **kwargs):
+    """
+    Coroutine version of `pyben.load`.
+
+    Parameters
+    ----------
+    buffer : str
+        Path or open binary file to decode.
+    executor : Executor, optional
+        Executor for the read and decode, the loop default if None.
+    **kwargs : dict
+        Keyword arguments passed to `load`.
+
+    Returns
+    -------
+    any
+        Decoded contents of file.
+    """
+    loop = asyncio.get_running_loop()
+    func = partial(load, buffer, **kwargs)
+    return await loop.run_in_executor(executor, func)
+
+
+async def adump(obj, buffer, executor=None, **kwargs):
+    """
+    Coroutine version of `pyben.dump`.
+
+    Parameters
+    ----------
+    obj : any
+        Data to be encoded.
+    buffer : str
+        Path or open binary file to write to.
+    executor : Executor, optional
+        Executor for the encode and write, the loop default if None.
+    **kwargs : dict
+        Keyword arguments passed to `dump`.
+    """
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(executor, partial(dump, obj, buffer, **kwargs))
+
+
+def _decoder_for(reader, max_size=None) -> IncrementalDecoder:
+    """
+    Return the decoder holding the buffered data of a StreamReader.
+
+    Bytes read past the end of a value are kept for the next call.
+
+    Parameters
+    ----------
+    reader : asyncio.StreamReader
+        Stream being decoded.
+    max_size : int, optional
+        Largest accepted value in bytes.
+
+    Returns
+    -------
+    IncrementalDecoder
+        Decoder bound to `reader`.
+    """
+    decoder = _DECODERS.get(reader)
+    if decoder is None:
+        decoder = _DECODERS[reader] = IncrementalDecoder(max_size)
+    return decoder
+
+
+async def read_bencoded(reader, executor=None, **kwargs):
+    """
+    Read and decode the next value from an `asyncio.StreamReader`.
+
+    Parameters
+    ----------
+    reader : asyncio.StreamReader
+        Stream to read from.
+    executor : Executor, optional
+        Executor used to decode values of `offload_size` bytes or more.
+    **kwargs : dict
+        `max_size` the largest accepted value in bytes, `offload_size`
+        (default 1 MiB) and `read_size` (default 64 KiB).
+
+    Raises
+    ------
+    asyncio.IncompleteReadError
+        The stream ended before a complete value was read.
+
+    Returns
+    -------
+    any
+        Decoded value.
+    """
+    decoder = _decoder_for(reader, kwargs.get("max_size"))
+    read_size = kwargs.get("read_size", READ_SIZE)
+    frame = decoder.next_frame()
+    while frame is None:
+        data = await reader.read(read_size)
+        if not data:
+            del _DECODERS[reader]
+            raise asyncio.IncompleteReadError(decoder.remainder, None)
+        decoder.feed(data)
+        frame = decoder.next_frame()
+
+    if len(frame) >= kwargs.get("offload_size", OFFLOAD_SIZE):
+        loop = asyncio.get_running_loop()
+        decoded, _ = await loop.run_in_executor(executor, bendecode, frame)
+    else:
+        decoded, _ = bendecode(frame)
+    return decoded
+
+
+async def iter_bencoded(reader, executor=None, **kwargs):
+    """
+    Decode values from an `asyncio.StreamReader` until it ends.
+
+    Parameters
+    ----------
+    reader : asyncio.StreamReader
+        Stream to read from.
+    executor : Executor, optional
+        Executor used to decode large values.
+    **kwargs : dict
+        Keyword arguments passed to `read_bencoded`.
+
+    Raises
+    ------
+    asyncio.IncompleteReadError
+        The stream ended in the middle of a value.
+
+    Yields
+    ------
+    any
+        Decoded values.
+    """
+    while True:
+        try:
+            yield await read_bencoded(reader, executor, **kwargs)
+        except asyncio.IncompleteReadError as err:
+            if err.partial:
+                raise
+            return
+
+
+async def write_bencoded(writer, obj, high_water=HIGH_WATER):
+    """
+    Encode a value and write it to an `asyncio.StreamWriter`.
+
+    Large byte strings are written by reference and the writer is drained
+    every `high_water` bytes, so big values never pile up in the
+    transport buffer.
+
+    Parameters
+    ----------
+    writer : asyncio.StreamWriter
+        Stream to write to.
+    obj : any
+        Data to be encoded.
+    high_water : int, optional
+        Bytes written between calls to `drain`.
+    """
+    buffers = BufferList()
+    benencode_into(obj, buffers.write)
+    pending, size = [], 0
+    for buf in buffers.getbuffers():
+        pending.append(buf)
+        size += len(buf)
+        if size >= high_water:
+            writer.writelines(pending)
+            pending, size = [], 0
+            await writer.drain()
+    if pending:
+        writer.writelines(pending)
+    await writer.drain()
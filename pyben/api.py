@@ -19,7 +19,10 @@ Features simple API inspired by json and pickle modules in stdlib.
 Functions
 ---------
 * dump
+* dump_many
 * dumps
+* iterload
+* iterloads
 * load
 * loads
 * tojson
@@ -64,11 +67,21 @@ Examples
     ... True
 """
 
+from functools import partial
+
 from pyben.bencode import bendecode, benencode
+from pyben.cache import default_cache
+from pyben.core import decode, encode
 from pyben.exceptions import FilePathError
+from pyben.sinks import BufferList, encode_to
+from pyben.spans import SPAN_TYPES, decode_spans, dumps_spans
+from pyben.stream import IncrementalDecoder
+from pyben.transcode import to_json_stream
+
+READ_SIZE = 1 << 16
 
 
-def dump(obj, buffer):
+def dump(obj, buffer, vectored=False, taps=None):
     """
     Shortcut function for bencode encode data and write to file.
 
@@ -81,7 +94,18 @@ def dump(obj, buffer):
         Data to be encoded.
     buffer : str or BytesIO
         File of path-like to write the data to.
+    vectored : bool
+        Collect output as buffer references and flush them with
+        `os.writev` (or `socket.sendmsg` for sockets) so large byte
+        strings are never copied into an intermediate buffer.
+    taps : dict
+        Mapping of key path to sink, e.g. `{"info": HashSink("sha1")}`,
+        receiving the encoded bytes of that value during the same pass.
     """
+    if vectored or taps or isinstance(obj, SPAN_TYPES):
+        _dump_to(obj, buffer, vectored, taps)
+        return
+
     encoded = benencode(obj)
 
     if not hasattr(buffer, "write"):
@@ -95,6 +119,55 @@ def dump(obj, buffer):
         buffer.write(encoded)
 
 
+def _dump_to(obj, buffer, vectored, taps):
+    """
+    Encode data straight into a file, socket or vectored buffer list.
+
+    Parameters
+    ----------
+    obj : any
+        Data to be encoded.
+    buffer : str or int or BytesIO or socket
+        Path, file descriptor, file or socket to write the data to. A
+        file descriptor is written to and left open.
+    vectored : bool
+        Flush the output with a single writev call.
+    taps : dict
+        Mapping of key path to sink passed to `encode_to`.
+    """
+    opened = hasattr(buffer, "write") or hasattr(buffer, "sendmsg")
+    if opened or isinstance(buffer, int):
+        _encode_out(obj, buffer, vectored, taps)
+    else:
+        if hasattr(buffer, "decode"):  # pragma: nocover
+            buffer = buffer.decode("utf-8")
+        with open(buffer, "wb") as _fd:
+            _encode_out(obj, _fd, vectored, taps)
+
+
+def _encode_out(obj, target, vectored, taps):
+    """
+    Encode data into an open target.
+
+    Parameters
+    ----------
+    obj : any
+        Data to be encoded.
+    target : any
+        Open file, socket or object with `write`.
+    vectored : bool
+        Flush the output with a single writev call.
+    taps : dict
+        Mapping of key path to sink passed to `encode_to`.
+    """
+    if vectored or not hasattr(target, "write"):
+        buffers = BufferList()
+        encode_to(obj, buffers, taps)
+        buffers.writeto(target)
+    else:
+        encode_to(obj, target, taps)
+
+
 def dumps(obj):
     """
     Shortuct function to encoding given obj to bencode encoding.
@@ -109,10 +182,20 @@ def dumps(obj):
     bytes :
         Encoded data.
     """
+    if isinstance(obj, SPAN_TYPES):
+        return dumps_spans(obj)
     return bytes(benencode(obj))
 
 
-def load(buffer, to_json=False):
+def load(
+    buffer,
+    to_json=False,
+    spans=False,
+    cache=None,
+    *,
+    object_hook=None,
+    object_pairs_hook=None,
+):
     """
     Load bencoded data from a file of path object and decodes it.
 
@@ -122,6 +205,15 @@ def load(buffer, to_json=False):
         Open and/or read data from file to be decoded.
     to_json : bool
         convert to json serializable metadata if True else leave it alone.
+    spans : bool
+        Decode into span tracking containers, see `loads`.
+    cache : DecodeCache, DiskCache or bool, optional
+        Cache results for paths, True uses the process wide default
+        cache. Ignored for open files.
+    object_hook : callable, optional
+        Called with every decoded dict, see `loads`.
+    object_pairs_hook : callable, optional
+        Called with the member pairs of every dictionary, see `loads`.
 
     Returns
     -------
@@ -131,45 +223,206 @@ def load(buffer, to_json=False):
     if buffer in [None, ""]:
         raise FilePathError(buffer)
 
+    hooks = {}
+    if object_hook is not None:
+        hooks["object_hook"] = object_hook
+    if object_pairs_hook is not None:
+        hooks["object_pairs_hook"] = object_pairs_hook
     if hasattr(buffer, "read"):
-        decoded, _ = bendecode(buffer.read())
+        return loads(buffer.read(), to_json=to_json, spans=spans, **hooks)
+
+    if hasattr(buffer, "decode"):  # pragma: nocover
+        path = buffer.decode("utf-8")
     else:
-        if hasattr(buffer, "decode"):  # pragma: nocover
-            path = buffer.decode("utf-8")
-        else:
-            path = buffer
-        try:
-            with open(path, "rb") as _fd:
-                decoded, _ = bendecode(_fd.read())
-        except (FileNotFoundError, IsADirectoryError, PermissionError) as err:
-            raise FilePathError(buffer) from err
-    if to_json:
-        decoded = _to_json(decoded)
-    return decoded
+        path = buffer
+    reader = partial(_load_path, to_json=to_json, spans=spans, **hooks)
+    try:
+        if cache is True:
+            cache = default_cache()
+        if cache not in (None, False):
+            variant = (to_json, spans) + tuple(sorted(hooks.items()))
+            return cache.get(path, reader, variant=variant)
+        return reader(path)
+    except (FileNotFoundError, IsADirectoryError, PermissionError) as err:
+        raise FilePathError(buffer) from err
+
 
+def _load_path(path, to_json=False, spans=False, **hooks):
+    """
+    Read and decode the file at `path`.
+
+    Parameters
+    ----------
+    path : str
+        Path to the file.
+    to_json : bool
+        Passed to `loads`.
+    spans : bool
+        Passed to `loads`.
+    **hooks : dict
+        Passed to `loads`.
 
-def loads(encoded, to_json=False):
+    Returns
+    -------
+    any
+        Decoded contents of file.
+    """
+    with open(path, "rb") as _fd:
+        data = _fd.read()
+    return loads(data, to_json=to_json, spans=spans, **hooks)
+
+
+def loads(
+    encoded,
+    to_json=False,
+    spans=False,
+    *,
+    object_hook=None,
+    object_pairs_hook=None,
+):
     """
     Shortcut function for decoding encoded data.
 
+    Only the first value is decoded, use `iterloads` for concatenated
+    values.
+
     Parameters
     ----------
     encoded : bytes
         Bencoded data.
     to_json : bool
         Convert to json serializable if true otherwise leave it alone.
+    spans : bool
+        Decode into containers that remember their source span and track
+        mutations, so `dump` and `dumps` only re-encode modified subtrees
+        and copy everything else from `encoded` byte for byte. Ignored
+        when a hook is given.
+    object_hook : callable, optional
+        Called with every decoded dict, innermost first, and its return
+        value used in place of the dict, e.g. to build dataclasses.
+    object_pairs_hook : callable, optional
+        Called with every dictionary as a list of `(key, value)` pairs in
+        input order, keeping duplicates. Takes priority over
+        `object_hook`.
 
     Returns
     -------
     dict :
         (any), Decoded data.
     """
+    if to_json or object_hook is not None or object_pairs_hook is not None:
+        binary = bytes.hex if to_json else None
+        return decode(encoded, 0, binary, object_hook, object_pairs_hook)[0]
+    if spans:
+        return decode_spans(encoded)
     decoded, _ = bendecode(encoded)
-    if to_json:
-        decoded = _to_json(decoded)
     return decoded
 
 
+def iterloads(encoded, to_json=False):
+    """
+    Decode every top-level value of concatenated bencoded data.
+
+    Parameters
+    ----------
+    encoded : bytes
+        Bencoded values written back to back, e.g. by `dump_many`.
+    to_json : bool
+        Convert to json serializable if true otherwise leave it alone.
+
+    Raises
+    ------
+    DecodeError
+        Malformed data or a truncated final value.
+
+    Yields
+    ------
+    any
+        Decoded values in order.
+    """
+    if encoded.__class__ is not bytes:
+        encoded = bytes(encoded)
+    binary = bytes.hex if to_json else None
+    pos, size = 0, len(encoded)
+    while pos < size:
+        decoded, pos = decode(encoded, pos, binary)
+        yield decoded
+
+
+def iterload(buffer, to_json=False, read_size=READ_SIZE):
+    """
+    Decode every top-level value of a file or stream of bencoded data.
+
+    The input is read in chunks of `read_size` bytes, so files of any
+    size are decoded in constant memory.
+
+    Parameters
+    ----------
+    buffer : str
+        Path or open binary file to decode.
+    to_json : bool
+        Convert to json serializable if true otherwise leave it alone.
+    read_size : int
+        Bytes read at a time.
+
+    Raises
+    ------
+    DecodeError
+        Malformed data or a truncated final value.
+
+    Yields
+    ------
+    any
+        Decoded values in order.
+    """
+    if buffer in [None, ""]:
+        raise FilePathError(buffer)
+    if not hasattr(buffer, "read"):
+        try:
+            with open(buffer, "rb") as _fd:
+                yield from iterload(_fd, to_json, read_size)
+        except (FileNotFoundError, IsADirectoryError, PermissionError) as err:
+            raise FilePathError(buffer) from err
+        return
+
+    decoder = IncrementalDecoder()
+    for chunk in iter(partial(buffer.read, read_size), b""):
+        decoder.feed(chunk)
+        for decoded in decoder:
+            yield _to_json(decoded) if to_json else decoded
+    decoder.close()
+
+
+def dump_many(objs, buffer, append=False) -> int:
+    """
+    Encode values back to back into one file or stream.
+
+    The output can be read back with `iterload` or `iterloads`.
+
+    Parameters
+    ----------
+    objs : iterable
+        Values to be encoded.
+    buffer : str or BytesIO
+        Path or open binary file to write to.
+    append : bool
+        Append to the file at `buffer` instead of truncating it.
+
+    Returns
+    -------
+    int
+        Number of values written.
+    """
+    if not hasattr(buffer, "write"):
+        with open(buffer, "ab" if append else "wb") as _fd:
+            return dump_many(objs, _fd)
+    count = 0
+    for obj in objs:
+        buffer.write(encode(obj))
+        count += 1
+    return count
+
+
 def _to_json(decoded):
     """
     Convert bencode decoded output into json serializable object.
@@ -205,6 +458,9 @@ def show(inp):
     """
     Ouptut readable metadata.
 
+    Files, paths and bytes are converted by `pyben.transcode` while they
+    are read, so no decoded copy of the input is held in memory.
+
     Parameters
     ----------
     inp : any
@@ -219,19 +475,14 @@ def show(inp):
     import os
     import sys
 
-    if isinstance(inp, dict):
-        meta = _to_json(inp)
-    elif hasattr(inp, "read"):
-        meta = load(inp, to_json=True)
-
-    elif isinstance(inp, (str, os.PathLike)):
-        try:
-            meta = load(inp, to_json=True)
-        except FilePathError:
-            meta = inp
-    elif isinstance(inp, (bytes, bytearray)):
-        meta = loads(inp, to_json=True)
+    if hasattr(inp, "read") or isinstance(inp, (bytes, bytearray)):
+        to_json_stream(inp, sys.stdout, indent=4)
+        return True
+    if isinstance(inp, (str, os.PathLike)) and os.path.isfile(inp):
+        to_json_stream(inp, sys.stdout, indent=4)
+        return True
 
+    meta = _to_json(inp) if isinstance(inp, dict) else inp
     json.dump(meta, sys.stdout, indent=4)
     return True
 
@@ -240,7 +491,8 @@ def loadinto(buffer, lst):
     """
     Shortcut function to load becoded data from file and store it in list.
 
-    This function is most useful for multithreading purposes.
+    This function is most useful for multithreading purposes, see
+    `parallel.load_many` for a pool based bulk loader.
 
     Parameters
     ----------
@@ -14,6 +14,9 @@
 """
 API helper functions for decoding and encoding data with bencode format.
 
+The functions are thin wrappers around the shared engine in
+`pyben.core`, which the classes in `pyben.classes` use as well.
+
 Functions
 ---------
 * bendecode
@@ -23,16 +26,48 @@ Functions
 * bendecode_str
 
 * benencode
+* benencode_into
 * bencode_bytes
+* byteview
 * bencode_dict
 * bencode_int
 * bencode_list
 * bencode_str
-"""
 
-import re
+* cache_info
+* cache_clear
 
-from pyben.exceptions import DecodeError, EncodeError
+Classes
+-------
+* FragmentCache
+"""
+
+from pyben.core import (COMMON_KEYS, INT_CACHE, MAX_CACHED_INT,
+                        MAX_CACHED_STR, STR_CACHE, FragmentCache, byteview,
+                        decode, encode, encode_int, encode_into, encode_str)
+from pyben.exceptions import EncodeError
+
+__all__ = [
+    "COMMON_KEYS",
+    "MAX_CACHED_INT",
+    "MAX_CACHED_STR",
+    "FragmentCache",
+    "bencode_bytes",
+    "bencode_dict",
+    "bencode_int",
+    "bencode_list",
+    "bencode_str",
+    "bendecode",
+    "bendecode_dict",
+    "bendecode_int",
+    "bendecode_list",
+    "bendecode_str",
+    "benencode",
+    "benencode_into",
+    "byteview",
+    "cache_clear",
+    "cache_info",
+]
 
 
 def bendecode(bits: bytes) -> tuple:
@@ -52,25 +87,9 @@ def bendecode(bits: bytes) -> tuple:
     Returns
     -------
     tuple
-        Bencode decoded data.
+        Bencode decoded data and the number of bytes consumed.
     """
-    if bits.startswith(b"i"):
-        match, feed = bendecode_int(bits)
-        return match, feed
-
-    if chr(bits[0]).isdigit():
-        match, feed = bendecode_str(bits)
-        return match, feed
-
-    if bits.startswith(b"l"):
-        lst, feed = bendecode_list(bits)
-        return lst, feed
-
-    if bits.startswith(b"d"):
-        dic, feed = bendecode_dict(bits)
-        return dic, feed
-
-    raise DecodeError(bits)
+    return decode(bits)
 
 
 def bendecode_str(units: bytes) -> str:
@@ -88,18 +107,7 @@ def bendecode_str(units: bytes) -> str:
         Decoded data string.
 
     """
-    match = re.match(rb"(\d+):", units)
-    word_len, start = int(match.groups()[0]), match.span()[1]
-    end = start + word_len
-    text = units[start:end]
-
-    try:
-        text = text.decode("utf-8")
-
-    except UnicodeDecodeError:
-        pass
-
-    return text, end
+    return decode(units)
 
 
 def bendecode_int(bits: bytes) -> int:
@@ -116,8 +124,7 @@ def bendecode_int(bits: bytes) -> int:
     int :
         Decoded int value.
     """
-    obj = re.match(rb"i(-?\d+)e", bits)
-    return int(obj.group(1)), obj.end()
+    return decode(bits)
 
 
 def bendecode_dict(bits: bytes) -> tuple:
@@ -134,17 +141,7 @@ def bendecode_dict(bits: bytes) -> tuple:
     tuple
         Decoded dictionary and contents
     """
-    dic, feed = {}, 1
-
-    while not bits[feed:].startswith(b"e"):
-        match1, rest = bendecode(bits[feed:])
-        feed += rest
-        match2, rest = bendecode(bits[feed:])
-        feed += rest
-        dic[match1] = match2
-
-    feed += 1
-    return dic, feed
+    return decode(bits)
 
 
 def bendecode_list(bits: bytes) -> tuple:
@@ -161,15 +158,7 @@ def bendecode_list(bits: bytes) -> tuple:
     tuple
         Bencode decoded list and contents.
     """
-    lst, feed = [], 1
-
-    while not bits[feed:].startswith(b"e"):
-        match, rest = bendecode(bits[feed:])
-        lst.append(match)
-        feed += rest
-
-    feed += 1
-    return lst, feed
+    return decode(bits)
 
 
 def benencode(val) -> bytes:
@@ -191,25 +180,31 @@ def benencode(val) -> bytes:
     bytes
         Bencoded data.
     """
-    if isinstance(val, str):
-        return bencode_str(val)
-
-    if isinstance(val, int):
-        return bencode_int(val)
+    return encode(val)
 
-    if isinstance(val, list):
-        return bencode_list(val)
 
-    if isinstance(val, dict):
-        return bencode_dict(val)
+def benencode_into(val, write):
+    """
+    Encode data with bencoding, passing each fragment to `write`.
 
-    if hasattr(val, "hex"):
-        return bencode_bytes(val)
+    Unlike `benencode`, byte strings and other buffer-protocol objects are
+    handed to `write` by reference instead of being copied into the encoded
+    output, which lets callers collect large values without an
+    intermediate buffer.
 
-    if isinstance(val, tuple):
-        return bencode_list(list(val))
+    Parameters
+    ----------
+    val : any
+        Data for encoding.
+    write : callable
+        Called once per encoded fragment.
 
-    raise EncodeError(val)
+    Raises
+    ------
+    EncodeError
+        Cannot interpret data.
+    """
+    encode_into(val, write)
 
 
 def bencode_bytes(bits: bytes) -> bytes:
@@ -219,15 +214,17 @@ def bencode_bytes(bits: bytes) -> bytes:
     Parameters
     ----------
     bits : bytes
-        Bytes treated as a byte-string literal.
+        Bytes or any buffer-protocol object treated as a byte-string literal.
 
     Returns
     -------
     bytes
         Bencode encoded byte string literal.
     """
-    size = str(len(bits)) + ":"
-    return size.encode("utf-8") + bits
+    view = byteview(bits)
+    if view is None:
+        raise EncodeError(bits)
+    return b"%d:" % len(view) + view
 
 
 def bencode_str(txt: str) -> bytes:
@@ -244,9 +241,7 @@ def bencode_str(txt: str) -> bytes:
     bytes
         Bencoded string literal.
     """
-    text = txt.encode("utf-8")
-    size = str(len(text)) + ":"
-    return size.encode("utf-8") + text
+    return encode_str(txt)
 
 
 def bencode_int(i: int) -> bytes:
@@ -263,7 +258,7 @@ def bencode_int(i: int) -> bytes:
     bytes
         Bencoded Integer.
     """
-    return ("i" + str(i) + "e").encode("utf-8")
+    return encode_int(i)
 
 
 def bencode_list(elems: list) -> bytes:
@@ -280,14 +275,7 @@ def bencode_list(elems: list) -> bytes:
     bytes
         Bencoded list and contents.
     """
-    arr = bytearray("l", encoding="utf-8")
-
-    for elem in elems:
-        encoded = benencode(elem)
-        arr.extend(encoded)
-
-    arr.extend(b"e")
-    return arr
+    return encode(elems)
 
 
 def bencode_dict(dic: dict) -> bytes:
@@ -304,9 +292,23 @@ def bencode_dict(dic: dict) -> bytes:
     bytes :
         Bencoded key, value pairs of data.
     """
-    result = b"d"
+    return encode(dic)
+
+
+def cache_info() -> dict:
+    """
+    Return statistics for the string and integer fragment caches.
+
+    Returns
+    -------
+    dict
+        Statistics of `STR_CACHE` and `INT_CACHE`.
+    """
+    return {"str": STR_CACHE.info(), "int": INT_CACHE.info()}
 
-    for key, val in dic.items():
-        result += b"".join([benencode(key), benencode(val)])
 
-    return result + b"e"
+def cache_clear():
+    """Reset the string and integer fragment caches and their counters."""
+    for cache in (STR_CACHE, INT_CACHE):
+        cache.clear()
+        cache.hits = cache.misses = 0
@@ -0,0 +1,356 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""
+In-memory LRU cache of decoded files.
+
+Entries are keyed on `(realpath, st_mtime_ns, st_size)` so a file that
+changes on disk is decoded again. The cache is opt-in:
+
+    >>> cache = DecodeCache(maxsize=1000, maxbytes=64 << 20)
+    >>> meta = pyben.load("file.torrent", cache=cache)
+    >>> meta = pyben.load("file.torrent", cache=True)  # shared default
+
+Classes
+-------
+* DecodeCache
+
+Functions
+---------
+* copy_tree
+* default_cache
+* estimate_size
+* freeze
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+from pyben.spans import DICT_MUTATORS, LIST_MUTATORS
+
+SHARED = "shared"
+COPY = "copy"
+
+
+def estimate_size(obj) -> int:
+    """
+    Estimate the memory used by decoded data.
+
+    Parameters
+    ----------
+    obj : any
+        Decoded data.
+
+    Returns
+    -------
+    int
+        Approximate size in bytes.
+    """
+    size, stack = 0, [obj]
+    while stack:
+        item = stack.pop()
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+    return size
+
+
+_READONLY = {}
+
+
+def _state(obj) -> dict:
+    """Return the slot attributes of a container, such as its span."""
+    return {
+        name: getattr(obj, name)
+        for kind in obj.__class__.__mro__
+        for name in kind.__dict__.get("__slots__", ())
+        if hasattr(obj, name)
+    }
+
+
+def _remake(cls, items, state):
+    """
+    Build a container of `cls` holding `items`.
+
+    Parameters
+    ----------
+    cls : type
+        `dict`, `list` or a subclass of them.
+    items : any
+        Contents of the container.
+    state : dict
+        Slot attributes restored after the contents are set.
+
+    Returns
+    -------
+    any
+        The new container.
+    """
+    container = cls(items)
+    for name, value in state.items():
+        setattr(container, name, value)
+    return container
+
+
+def _refuse(self, *args, **kwargs):
+    """Reject modifying a cached container."""
+    raise TypeError(f"cached {type(self).__name__} is read-only")
+
+
+def _thawed(self):
+    """Copy and pickle a read-only container as its mutable base type."""
+    base = type(self).__bases__[0]
+    items = dict(self) if isinstance(self, dict) else list(self)
+    return _remake, (base, items, _state(self))
+
+
+def _readonly(cls) -> type:
+    """Return the subclass of `cls` whose mutating methods raise."""
+    frozen = _READONLY.get(cls)
+    if frozen is None:
+        names = DICT_MUTATORS if issubclass(cls, dict) else LIST_MUTATORS
+        namespace = dict.fromkeys(names, _refuse)
+        namespace.update(__slots__=(), __reduce__=_thawed)
+        frozen = type(f"ReadOnly{cls.__name__}", (cls,), namespace)
+        _READONLY[cls] = frozen
+    return frozen
+
+
+def copy_tree(obj):
+    """
+    Copy the containers of decoded data, sharing the immutable leaves.
+
+    Container subclasses keep their type and slot attributes, so span
+    containers from `decode_spans` still copy unmodified from source.
+
+    Parameters
+    ----------
+    obj : any
+        Decoded data.
+
+    Returns
+    -------
+    any
+        Independent copy of `obj`.
+    """
+    kind = obj.__class__
+    if kind is dict:
+        return {key: copy_tree(val) for key, val in obj.items()}
+    if kind is list:
+        return [copy_tree(val) for val in obj]
+    if isinstance(obj, dict):
+        items = {key: copy_tree(val) for key, val in obj.items()}
+    elif isinstance(obj, list):
+        items = [copy_tree(val) for val in obj]
+    else:
+        return obj
+    return _remake(kind, items, _state(obj))
+
+
+def freeze(obj):
+    """
+    Copy the containers of decoded data into read-only ones.
+
+    The copies are subclasses of the original containers raising
+    TypeError when modified, `copy.deepcopy` or pickling them gives
+    back mutable containers.
+
+    Parameters
+    ----------
+    obj : any
+        Decoded data.
+
+    Returns
+    -------
+    any
+        Read-only copy of `obj`.
+    """
+    if isinstance(obj, dict):
+        items = {key: freeze(val) for key, val in obj.items()}
+    elif isinstance(obj, list):
+        items = [freeze(val) for val in obj]
+    else:
+        return obj
+    return _remake(_readonly(obj.__class__), items, _state(obj))
+
+
+class DecodeCache:
+    """Thread-safe LRU cache of decoded files bounded by count and bytes."""
+
+    def __init__(self, maxsize=1024, maxbytes=256 << 20, mode=SHARED):
+        """
+        Construct the DecodeCache.
+
+        Parameters
+        ----------
+        maxsize : int, optional
+            Maximum number of cached files.
+        maxbytes : int, optional
+            Maximum estimated memory used by cached results.
+        mode : str, optional
+            "shared" returns the cached object itself, frozen with
+            `freeze` so it cannot be modified. "copy" returns a copy of
+            the containers.
+        """
+        if mode not in (SHARED, COPY):
+            raise ValueError(mode)
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.mode = mode
+        self.hits = self.misses = self.evictions = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Return the number of cached files."""
+        return len(self._entries)
+
+    @staticmethod
+    def key(path, variant=None) -> tuple:
+        """
+        Build the cache key of a file.
+
+        Parameters
+        ----------
+        path : str
+            Path to the file.
+        variant : any, optional
+            Extra key separating different decodings of the same file.
+
+        Raises
+        ------
+        OSError
+            The file cannot be stat'ed.
+
+        Returns
+        -------
+        tuple
+            `(realpath, st_mtime_ns, st_size, variant)`
+        """
+        real = os.path.realpath(path)
+        stat = os.stat(real)
+        return real, stat.st_mtime_ns, stat.st_size, variant
+
+    def get(self, path, loader, variant=None):
+        """
+        Return the decoded contents of a file, loading it on a miss.
+
+        Parameters
+        ----------
+        path : str
+            Path to the file.
+        loader : callable
+            Called with the path to decode the file on a miss.
+        variant : any, optional
+            Extra key separating different decodings of the same file.
+
+        Returns
+        -------
+        any
+            Decoded contents of the file.
+        """
+        key = self.key(path, variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entry is not None:
+            return self._result(entry[0])
+
+        value = loader(path)
+        if self.mode == SHARED:
+            value = freeze(value)
+        try:
+            unchanged = self.key(path, variant) == key
+        except OSError:
+            unchanged = False
+        if unchanged:
+            self._store(key, value)
+        return self._result(value)
+
+    def _result(self, value):
+        """Return `value` or a copy of it depending on the mode."""
+        if self.mode == COPY:
+            return copy_tree(value)
+        return value
+
+    def _store(self, key, value):
+        """Add an entry and evict the least recently used ones."""
+        size = estimate_size(value)
+        if size > self.maxbytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while len(self._entries) > self.maxsize or (
+                self.nbytes > self.maxbytes
+            ):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        """Remove every entry and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """
+        Return cache statistics.
+
+        Returns
+        -------
+        dict
+            Hits, misses, evictions, hit rate, entries and bytes.
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._entries),
+                "bytes": self.nbytes,
+            }
+
+
+_DEFAULT = []
+
+
+def default_cache() -> DecodeCache:
+    """
+    Return the process wide cache used by `load(..., cache=True)`.
+
+    Returns
+    -------
+    DecodeCache
+        The shared default cache.
+    """
+    if not _DEFAULT:
+        _DEFAULT.append(DecodeCache())
+    return _DEFAULT[0]
@@ -15,24 +15,39 @@
 OOP implementation of bencode decoders and encoders.
 
 This style is not recommended as it can get bulky. The json-like api
-from the bencode.py module is much easier to use.
+from the bencode.py module is much easier to use. Both share the engine
+in `pyben.core` and produce identical results.
 
 Classes
 -------
 * Bendecoder
 * Benencoder
+* CoderPool
 """
 
 import os
-import re
+import queue
+import threading
+from contextlib import contextmanager
+from functools import partial
 
-from pyben.exceptions import DecodeError, EncodeError
+from pyben.cache import default_cache
+from pyben.core import (INT_CACHE, STR_CACHE, byteview, decode, encode_int,
+                        encode_into, encode_str)
+from pyben.exceptions import EncodeError, FilePathError
 
 
 class Bendecoder:
-    """Decode class contains all decode methods."""
+    """
+    Decode class contains all decode methods.
 
-    def __init__(self, data: bytes = None):
+    `object_hook` and `object_pairs_hook` work as in `json.JSONDecoder`,
+    so dictionaries can be turned into typed objects while decoding.
+    """
+
+    def __init__(
+        self, data: bytes = None, object_hook=None, object_pairs_hook=None
+    ):
         """
         Initialize instance with optional pre compiled data.
 
@@ -40,12 +55,18 @@ class Bendecoder:
         ----------
         data : bytes
             (Optional) (default=None) Target data for decoding.
+        object_hook : callable, optional
+            Called with every decoded dict, its result replaces the dict.
+        object_pairs_hook : callable, optional
+            Called with every dictionary as a list of `(key, value)`
+            pairs, takes priority over `object_hook`.
         """
         self.data = data
-        self.decoded = None
+        self.object_hook = object_hook
+        self.object_pairs_hook = object_pairs_hook
 
     @classmethod
-    def load(cls, item: str) -> dict:
+    def load(cls, item: str, cache=None, **hooks) -> dict:
         """
         Extract contents from path/path-like and return Decoded data.
 
@@ -53,6 +74,11 @@ class Bendecoder:
         ----------
         item : str
             Path containing bencoded data.
+        cache : DecodeCache, DiskCache or bool, optional
+            Cache results for paths, True uses the process wide default
+            cache.
+        **hooks : dict
+            `object_hook` and `object_pairs_hook` for the decoder.
 
         Raises
         ------
@@ -64,17 +90,26 @@ class Bendecoder:
         any
             Decoded contents of file, Usually a dictionary.
         """
-        decoder = cls()
         if hasattr(item, "read"):
-            data = item.read()
+            return cls(**hooks).decode(item.read())
+        if not (os.path.exists(item) and os.path.isfile(item)):
+            raise FilePathError(item)
+        if cache is True:
+            cache = default_cache()
+        loader = partial(cls._load_path, **hooks)
+        if cache not in (None, False):
+            variant = (cls,) + tuple(sorted(hooks.items()))
+            return cache.get(item, loader, variant=variant)
+        return loader(item)
 
-        elif os.path.exists(item) and os.path.isfile(item):
-            with open(item, "rb") as _fd:
-                data = _fd.read()
-        return decoder.decode(data)
+    @classmethod
+    def _load_path(cls, path: str, **hooks):
+        """Read and decode the file at `path`."""
+        with open(path, "rb") as _fd:
+            return cls(**hooks).decode(_fd.read())
 
     @classmethod
-    def loads(cls, data: bytes) -> dict:
+    def loads(cls, data: bytes, **hooks) -> dict:
         """
         Shortcut to Decode raw bencoded data.
 
@@ -82,19 +117,24 @@ class Bendecoder:
         ----------
         data : bytes
             Bendencoded bytes
+        **hooks : dict
+            `object_hook` and `object_pairs_hook` for the decoder.
 
         Returns
         -------
         any
             Decoded data usually a dictionary.
         """
-        decoder = cls()
+        decoder = cls(**hooks)
         return decoder.decode(data)
 
     def decode(self, data: bytes = None) -> dict:
         """
         Decode bencoded data.
 
+        Nothing is stored on the instance, so one decoder can be shared by
+        many threads.
+
         Parameters
         ----------
         data : bytes
@@ -106,8 +146,8 @@ class Bendecoder:
             the decoded data.
         """
         data = self.data if not data else data
-        self.decoded, _ = self._decode(bits=data)
-        return self.decoded
+        decoded, _ = self._decode(bits=data)
+        return decoded
 
     def _decode(self, bits: bytes = None) -> dict:
         """
@@ -120,29 +160,10 @@ class Bendecoder:
 
         Returns
         -------
-        dict
-            The decoded data.
+        tuple
+            The decoded data and the number of bytes consumed.
         """
-        if bits.startswith(b"i"):
-            match, feed = self._decode_int(bits)
-            return match, feed
-
-        # decode string
-        if chr(bits[0]).isdigit():
-            num, feed = self._decode_str(bits)
-            return num, feed
-
-        # decode list and contents
-        if bits.startswith(b"l"):
-            lst, feed = self._decode_list(bits)
-            return lst, feed
-
-        # decode dictionary and contents
-        if bits.startswith(b"d"):
-            dic, feed = self._decode_dict(bits)
-            return dic, feed
-
-        raise DecodeError(bits)
+        return decode(bits, 0, None, self.object_hook, self.object_pairs_hook)
 
     def _decode_dict(self, bits: bytes) -> dict:
         """
@@ -159,15 +180,7 @@ class Bendecoder:
             Dictionary and contents.
 
         """
-        dct, feed = {}, 1
-        while not bits[feed:].startswith(b"e"):
-            match1, rest = self._decode(bits[feed:])
-            feed += rest
-            match2, rest = self._decode(bits[feed:])
-            feed += rest
-            dct[match1] = match2
-        feed += 1
-        return dct, feed
+        return decode(bits)
 
     def _decode_list(self, data: bytes) -> list:
         """
@@ -183,13 +196,7 @@ class Bendecoder:
         list
             decoded list and contents
         """
-        seq, feed = [], 1
-        while not data[feed:].startswith(b"e"):
-            match, rest = self._decode(data[feed:])
-            seq.append(match)
-            feed += rest
-        feed += 1
-        return seq, feed
+        return decode(data)
 
     @staticmethod
     def _decode_str(bits: bytes) -> str:
@@ -206,18 +213,7 @@ class Bendecoder:
         str
             Decoded string.
         """
-        match = re.match(rb"(\d+):", bits)
-        word_size, start = int(match.groups()[0]), match.span()[1]
-        finish = start + word_size
-        word = bits[start:finish]
-
-        try:
-            word = word.decode("utf-8")
-
-        except UnicodeDecodeError:
-            pass
-
-        return word, finish
+        return decode(bits)
 
     @staticmethod
     def _decode_int(bits: bytes) -> int:
@@ -234,12 +230,21 @@ class Bendecoder:
         int
             Decoded intiger.
         """
-        obj = re.match(rb"i(-?\d+)e", bits)
-        return int(obj.group(1)), obj.end()
+        return decode(bits)
 
 
 class Benencoder:
-    """Encoder for bencode encoding used for Bittorrent meta-files."""
+    """
+    Encoder for bencode encoding used for Bittorrent meta-files.
+
+    Short strings and small integers are looked up in the fragment caches
+    shared with `pyben.bencode`, exposed as `str_cache` and `int_cache`.
+    Encoding keeps no state on the instance, so instances are safe to
+    share between threads.
+    """
+
+    str_cache = STR_CACHE
+    int_cache = INT_CACHE
 
     def __init__(self, data: bytes = None):
         """
@@ -251,7 +256,6 @@ class Benencoder:
             data, by default None
         """
         self.data = data
-        self.encoded = None
 
     @classmethod
     def dump(cls, data: bytes, path: os.PathLike) -> bool:
@@ -311,42 +315,43 @@ class Benencoder:
         """
         if val is None:
             val = self.data
-        self.encoded = self._encode(val)
-        return self.encoded
+        return self._encode(val)
 
-    def _encode(self, val: bytes):
+    def _encode(self, val) -> bytes:
         """
         Encode data with bencode protocol.
 
         Parameters
         ----------
-        val : bytes
-            Bencoded data for decoding.
+        val : any
+            Data for encoding.
 
         Returns
         -------
-        any
-            the decoded data.
+        bytes
+            Bencoded data.
         """
-        if isinstance(val, str):
-            return self._encode_str(val)
-
-        if hasattr(val, "hex"):
-            return self._encode_bytes(val)
+        parts = []
+        self._encode_into(val, parts.append)
+        return b"".join(parts)
 
-        if isinstance(val, int):
-            return self._encode_int(val)
-
-        if isinstance(val, list):
-            return self._encode_list(val)
-
-        if isinstance(val, dict):
-            return self._encode_dict(val)
+    def _encode_into(self, val, write):
+        """
+        Encode data, passing each fragment to `write`.
 
-        if isinstance(val, tuple):
-            return self._encode_list(list(val))
+        Parameters
+        ----------
+        val : any
+            Data for encoding.
+        write : callable
+            Called with every encoded fragment in order.
 
-        raise EncodeError(val)
+        Raises
+        ------
+        EncodeError
+            `val` contains a type that cannot be encoded.
+        """
+        encode_into(val, write)
 
     @staticmethod
     def _encode_bytes(val: bytes) -> bytes:
@@ -356,20 +361,22 @@ class Benencoder:
         Parameters
         ----------
         val : bytes
-            data
+            bytes or any buffer-protocol object.
 
         Returns
         -------
         bytes
             data
         """
-        size = str(len(val)) + ":"
-        return size.encode("utf-8") + val
+        view = byteview(val)
+        if view is None:
+            raise EncodeError(val)
+        return b"%d:" % len(view) + view
 
     @staticmethod
     def _encode_str(txt: str) -> bytes:
         """
-        Decode string.
+        Encode string with its utf-8 byte length.
 
         Parameters
         ----------
@@ -381,8 +388,7 @@ class Benencoder:
         bytes
             Bencoded string.
         """
-        size = str(len(txt)).encode("utf-8")
-        return size + b":" + txt.encode("utf-8")
+        return encode_str(txt)
 
     @staticmethod
     def _encode_int(num: int) -> bytes:
@@ -399,7 +405,7 @@ class Benencoder:
         bytes
             Bencoded intiger.
         """
-        return b"i" + str(num).encode("utf-8") + b"e"
+        return encode_int(num)
 
     def _encode_list(self, elems: list) -> bytes:
         """
@@ -415,13 +421,7 @@ class Benencoder:
         bytes
             Bencoded data
         """
-        lst = [b"l"]
-        for elem in elems:
-            encoded = self._encode(elem)
-            lst.append(encoded)
-        lst.append(b"e")
-        bit_lst = b"".join(lst)
-        return bit_lst
+        return self._encode(elems)
 
     def _encode_dict(self, dic: dict) -> bytes:
         """
@@ -437,7 +437,104 @@ class Benencoder:
         bytes
             Bencoded data.
         """
-        result = b"d"
-        for key, val in dic.items():
-            result += b"".join([self._encode(key), self._encode(val)])
-        return result + b"e"
+        return self._encode(dic)
+
+
+class CoderPool:
+    """
+    Pool of configured decoders or encoders reused across requests.
+
+    Instances are handed out one caller at a time and returned after
+    use, so configured instances are reused instead of constructed on
+    every call. Nothing decoded or encoded is kept by pooled instances.
+    """
+
+    def __init__(self, factory=Bendecoder, size: int = 8, **kwargs):
+        """
+        Construct the CoderPool.
+
+        Parameters
+        ----------
+        factory : callable, optional
+            Class or function creating the pooled instances.
+        size : int, optional
+            Maximum number of instances, callers block when all are in
+            use.
+        **kwargs : dict
+            Keyword arguments passed to `factory`.
+        """
+        self.factory = factory
+        self.size = size
+        self.kwargs = kwargs
+        self.created = 0
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self):
+        """
+        Borrow an instance for the duration of a `with` block.
+
+        Yields
+        ------
+        any
+            Instance created by `factory`.
+        """
+        coder = self._get()
+        try:
+            yield coder
+        finally:
+            self._idle.put(coder)
+
+    def _get(self):
+        """Return an idle instance, creating one while below `size`."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self.created < self.size
+            if create:
+                self.created += 1
+        if not create:
+            return self._idle.get()
+        try:
+            return self.factory(**self.kwargs)
+        except BaseException:
+            with self._lock:
+                self.created -= 1
+            raise
+
+    def decode(self, data: bytes):
+        """
+        Decode data with a pooled decoder.
+
+        Parameters
+        ----------
+        data : bytes
+            Bencoded data.
+
+        Returns
+        -------
+        any
+            Decoded data.
+        """
+        with self.acquire() as coder:
+            return coder.decode(data)
+
+    def encode(self, val) -> bytes:
+        """
+        Encode data with a pooled encoder.
+
+        Parameters
+        ----------
+        val : any
+            Data for encoding.
+
+        Returns
+        -------
+        bytes
+            Bencoded data.
+        """
+        with self.acquire() as coder:
+            return coder.encode(val)
@@ -0,0 +1,524 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""
+Shared decoding and encoding engine.
+
+Both the functions in `pyben.bencode` and the classes in `pyben.classes`
+delegate here, so they behave identically and any speed-up applies to
+both. The decoder walks the input by offset with an explicit stack
+instead of slicing it, so decoding is linear in the input size and deep
+nesting never hits the recursion limit.
+
+Functions
+---------
+* decode
+* encode
+* encode_into
+* encode_int
+* encode_str
+* byteview
+
+Classes
+-------
+* FragmentCache
+"""
+
+from pyben.exceptions import DecodeError, EncodeError
+
+MAX_CACHED_STR = 64
+MAX_CACHED_INT = 1 << 16
+ERROR_CONTEXT = 32
+
+COMMON_KEYS = (
+    "announce",
+    "announce-list",
+    "comment",
+    "complete",
+    "created by",
+    "creation date",
+    "downloaded",
+    "failure reason",
+    "files",
+    "id",
+    "incomplete",
+    "info",
+    "info_hash",
+    "interval",
+    "length",
+    "min interval",
+    "name",
+    "nodes",
+    "path",
+    "peers",
+    "peers6",
+    "piece length",
+    "pieces",
+    "port",
+    "private",
+    "q",
+    "r",
+    "t",
+    "target",
+    "token",
+    "values",
+    "y",
+)
+
+_NOKEY = object()
+_LIST = object()
+
+
+class _PairList(list):
+    """Dictionary frame collecting `(key, value)` pairs in order."""
+
+    __slots__ = ()
+
+    def __setitem__(self, key, value):
+        """Append a member, keeping duplicate keys."""
+        self.append((key, value))
+
+
+def decode(
+    bits,
+    pos: int = 0,
+    binary=None,
+    object_hook=None,
+    object_pairs_hook=None,
+) -> tuple:
+    """
+    Decode the bencoded value starting at `pos`.
+
+    Strings that are valid utf-8 are returned as `str`, others as `bytes`.
+    The hooks work like those of `json.loads` and are called on every
+    dictionary as soon as it is complete, innermost first.
+
+    Parameters
+    ----------
+    bits : bytes
+        Bencoded data, any bytes-like object.
+    pos : int, optional
+        Offset of the value.
+    binary : callable, optional
+        Applied to strings that are not valid utf-8, e.g. `bytes.hex`.
+    object_hook : callable, optional
+        Called with each decoded dict, its result replaces the dict.
+    object_pairs_hook : callable, optional
+        Called with each dictionary as a list of `(key, value)` pairs in
+        input order, duplicates included. No dict is built and
+        `object_hook` is ignored.
+
+    Raises
+    ------
+    DecodeError
+        Malformed or truncated data.
+
+    Returns
+    -------
+    tuple
+        `(value, end)` where `end` is the offset after the value.
+    """
+    try:
+        if bits.__class__ is not bytes:
+            bits = bytes(bits)
+        if object_hook is None and object_pairs_hook is None:
+            return _decode(bits, pos, binary)
+        return _decode(bits, pos, binary, object_hook, object_pairs_hook)
+    except (IndexError, TypeError, ValueError) as err:
+        raise DecodeError(bits) from err
+
+
+def _decode(
+    bits: bytes,
+    pos: int,
+    binary,
+    object_hook=None,
+    object_pairs_hook=None,
+    *,
+    containers=None,
+) -> tuple:
+    """
+    Decode one value iteratively, see `decode`.
+
+    Parameters
+    ----------
+    bits : bytes
+        Bencoded data.
+    pos : int
+        Offset of the value.
+    binary : callable or None
+        Applied to strings that are not valid utf-8.
+    object_hook : callable or None
+        Applied to every completed dict.
+    object_pairs_hook : callable or None
+        Applied to the member pairs of every dictionary.
+    containers : tuple or None
+        `(list_type, dict_type)` every decoded container is converted to
+        when complete, setting the `source`, `start`, `end` and `dirty`
+        attributes of `pyben.spans`.
+
+    Returns
+    -------
+    tuple
+        `(value, end)`
+    """
+    size = len(bits)
+    stack = []
+    hooked = object_hook is not None or object_pairs_hook is not None
+    new_dict = dict if object_pairs_hook is None else _PairList
+    while True:
+        lead = bits[pos]
+        if lead == 0x6C:  # l
+            stack.append([[], _LIST, pos])
+            pos += 1
+            continue
+        if lead == 0x64:  # d
+            stack.append([new_dict(), _NOKEY, pos])
+            pos += 1
+            continue
+        if lead == 0x65 and stack:  # e
+            value, key, start = stack.pop()
+            if key is not _NOKEY and key is not _LIST:
+                raise DecodeError(bits[pos:pos + ERROR_CONTEXT])
+            pos += 1
+            if containers is not None:
+                value = containers[key is _NOKEY](value)
+                value.source, value.start, value.end = bits, start, pos
+                value.dirty = False
+            elif hooked and key is _NOKEY:
+                if object_pairs_hook is not None:
+                    value = object_pairs_hook(list(value))
+                else:
+                    value = object_hook(value)
+        elif lead == 0x69:  # i
+            end = bits.index(b"e", pos)
+            digits = bits[pos + 1:end]
+            if not (
+                digits.isdigit()
+                or digits[:1] == b"-"
+                and digits[1:].isdigit()
+            ):
+                raise DecodeError(bits[pos:end + 1])
+            value = int(digits)
+            pos = end + 1
+        else:
+            colon = bits.find(b":", pos, pos + ERROR_CONTEXT)
+            digits = bits[pos:colon]
+            if colon < 0 or not digits.isdigit():
+                raise DecodeError(bits[pos:pos + ERROR_CONTEXT])
+            start = colon + 1
+            pos = start + int(digits)
+            if pos > size:
+                raise DecodeError(digits)
+            value = bits[start:pos]
+            try:
+                value = value.decode("utf-8")
+            except UnicodeDecodeError:
+                if binary is not None:
+                    value = binary(value)
+
+        if not stack:
+            return value, pos
+        frame = stack[-1]
+        key = frame[1]
+        if key is _LIST:
+            frame[0].append(value)
+        elif key is _NOKEY:
+            frame[1] = value
+        else:
+            frame[0][key] = value
+            frame[1] = _NOKEY
+
+
+def byteview(val):
+    """
+    Return a flat unsigned byte view of a buffer-protocol object.
+
+    Accepts `bytes`, `bytearray`, `memoryview`, `array.array`, NumPy arrays
+    and anything else exposing the buffer protocol. Only non-contiguous
+    buffers are copied.
+
+    Parameters
+    ----------
+    val : any
+        Object that may support the buffer protocol.
+
+    Returns
+    -------
+    memoryview or None
+        Byte view of `val` or None if it isn't a buffer.
+    """
+    if isinstance(val, bytes):
+        return val
+    try:
+        view = memoryview(val)
+    except TypeError:
+        return None
+    if not view.c_contiguous:
+        view = memoryview(view.tobytes())
+    return view.cast("B")
+
+
+def encode_str(txt: str) -> bytes:
+    """
+    Encode a string with its utf-8 byte length.
+
+    Parameters
+    ----------
+    txt : str
+        Any text string.
+
+    Returns
+    -------
+    bytes
+        Bencoded string literal.
+    """
+    text = txt.encode("utf-8")
+    return b"%d:%s" % (len(text), text)
+
+
+def encode_int(num: int) -> bytes:
+    """
+    Encode an integer.
+
+    Parameters
+    ----------
+    num : int
+        Number that needs encoding.
+
+    Returns
+    -------
+    bytes
+        Bencoded integer.
+    """
+    return b"i%de" % num
+
+
+class FragmentCache:
+    """
+    Bounded cache of pre-encoded fragments for small values.
+
+    Used for the short strings and small integers that dominate tracker
+    responses and DHT messages. Only values of the exact type given are
+    cached, so `True` never shares an entry with `1`. When the cache is
+    full it is cleared and refilled, like the `re` module cache.
+    """
+
+    def __init__(self, encoder, kind, limit, maxsize=4096, preload=()):
+        """
+        Construct the FragmentCache.
+
+        Parameters
+        ----------
+        encoder : callable
+            Function producing the encoded fragment for a value.
+        kind : type
+            Exact type of the values that may be cached.
+        limit : int
+            Largest cached value for ints, longest cached string for str.
+        maxsize : int, optional
+            Maximum number of cached fragments.
+        preload : iterable, optional
+            Values encoded up front and kept across clears.
+        """
+        self.encoder = encoder
+        self.kind = kind
+        self.limit = limit
+        self.maxsize = maxsize
+        self.preload = tuple(preload)
+        self.hits = self.misses = 0
+        self.table = {}
+        self.clear()
+
+    def __call__(self, val) -> bytes:
+        """
+        Return the encoded fragment for `val`.
+
+        Parameters
+        ----------
+        val : str or int
+            Value to encode.
+
+        Returns
+        -------
+        bytes
+            Encoded fragment.
+        """
+        if val.__class__ is not self.kind:
+            return self.encoder(val)
+        try:
+            fragment = self.table[val]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            return fragment
+        self.misses += 1
+        fragment = self.encoder(val)
+        if self._eligible(val):
+            if len(self.table) >= self.maxsize:
+                self.clear()
+            self.table[val] = fragment
+        return fragment
+
+    def _eligible(self, val) -> bool:
+        """
+        Check if a value is small enough to be cached.
+
+        Parameters
+        ----------
+        val : str or int
+            Value to check.
+
+        Returns
+        -------
+        bool
+            True if `val` can be cached.
+        """
+        if self.kind is int:
+            return -self.limit <= val <= self.limit
+        return len(val) <= self.limit
+
+    def clear(self):
+        """Drop every cached fragment except the preloaded ones."""
+        self.table = {val: self.encoder(val) for val in self.preload}
+
+    def info(self) -> dict:
+        """
+        Return cache statistics.
+
+        Returns
+        -------
+        dict
+            Hits, misses, hit rate and current size.
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self.table),
+            "maxsize": self.maxsize,
+        }
+
+
+STR_CACHE = FragmentCache(
+    encode_str, str, MAX_CACHED_STR, preload=COMMON_KEYS
+)
+INT_CACHE = FragmentCache(
+    encode_int, int, MAX_CACHED_INT, preload=range(-1, 257)
+)
+
+
+def encode_into(val, write):
+    """
+    Encode data, passing each fragment to `write`.
+
+    Byte strings and other buffer-protocol objects are handed to `write`
+    by reference instead of being copied.
+
+    Parameters
+    ----------
+    val : any
+        Data for encoding.
+    write : callable
+        Called once per encoded fragment.
+
+    Raises
+    ------
+    EncodeError
+        Cannot interpret data.
+    """
+    kind = val.__class__
+    if kind is str:
+        write(STR_CACHE(val))
+    elif kind is int:
+        write(INT_CACHE(val))
+    elif kind is dict:
+        write(b"d")
+        for key, item in val.items():
+            encode_into(key, write)
+            encode_into(item, write)
+        write(b"e")
+    elif kind is list or kind is tuple:
+        write(b"l")
+        for item in val:
+            encode_into(item, write)
+        write(b"e")
+    elif kind is bytes:
+        write(b"%d:" % len(val))
+        write(val)
+    else:
+        _encode_other(val, write)
+
+
+def _encode_other(val, write):
+    """
+    Encode subclasses and buffers not handled by the exact type checks.
+
+    Parameters
+    ----------
+    val : any
+        Data for encoding.
+    write : callable
+        Called once per encoded fragment.
+    """
+    if isinstance(val, str):
+        write(encode_str(val))
+
+    elif isinstance(val, int):
+        write(encode_int(val))
+
+    elif isinstance(val, (list, tuple)):
+        write(b"l")
+        for item in val:
+            encode_into(item, write)
+        write(b"e")
+
+    elif isinstance(val, dict):
+        write(b"d")
+        for key, item in val.items():
+            encode_into(key, write)
+            encode_into(item, write)
+        write(b"e")
+
+    else:
+        view = byteview(val)
+        if view is None:
+            raise EncodeError(val)
+        write(b"%d:" % len(view))
+        write(view)
+
+
+def encode(val) -> bytes:
+    """
+    Encode data with bencoding.
+
+    Parameters
+    ----------
+    val : any
+        Data for encoding.
+
+    Raises
+    ------
+    EncodeError
+        Cannot interpret data.
+
+    Returns
+    -------
+    bytes
+        Bencoded data.
+    """
+    parts = []
+    encode_into(val, parts.append)
+    return b"".join(parts)
@@ -0,0 +1,391 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""
+Creation of torrent metainfo from payload files.
+
+Payload files are memory-mapped and hashed in a thread pool in one read,
+building v1 pieces, v2 merkle trees and piece layers, or both for hybrid
+torrents. The metainfo is then streamed to its file by the encoder:
+
+    >>> hasher = HashSink("sha1")
+    >>> meta = make_torrent("payload", "payload.torrent", version="hybrid",
+    ...                     announce="udp://tracker:1337",
+    ...                     taps={"info": hasher})
+    >>> hasher.hexdigests()["sha1"]
+
+Functions
+---------
+* make_torrent
+* piece_length_for
+"""
+
+import hashlib
+import os
+import time
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from pyben.api import dump
+from pyben.exceptions import FilePathError
+from pyben.verify import (BLOCK_SIZE, _batches, _feed, _Payload, _pow2,
+                          block_hashes, merkle_root, pieces_root)
+
+VERSIONS = {1: 1, 2: 2, "hybrid": 3}
+MIN_PIECE = BLOCK_SIZE
+MAX_PIECE = 1 << 24
+TARGET_PIECES = 1500
+
+
+def piece_length_for(size: int) -> int:
+    """
+    Choose a piece length for a payload.
+
+    Parameters
+    ----------
+    size : int
+        Total size of the payload in bytes.
+
+    Returns
+    -------
+    int
+        Power of two between 16 KiB and 16 MiB giving about 1500 pieces.
+    """
+    length = _pow2(max(size // TARGET_PIECES, 1))
+    return min(max(length, MIN_PIECE), MAX_PIECE)
+
+
+def _walk(root: str) -> list:
+    """
+    List the regular files below `root`.
+
+    Returns
+    -------
+    list
+        `(path, components)` pairs, components relative to `root`.
+    """
+    found = []
+    for current, dirs, names in os.walk(root):
+        dirs.sort()
+        rel = os.path.relpath(current, root)
+        parts = () if rel == os.curdir else tuple(rel.split(os.sep))
+        for name in names:
+            path = os.path.join(current, name)
+            if os.path.isfile(path):
+                found.append((path, parts + (name,)))
+    return found
+
+
+def _collect(paths, name):
+    """
+    Resolve the payload into a torrent name and its files.
+
+    Returns
+    -------
+    tuple
+        `(name, files, single)`, files being sorted `(path, components,
+        length)` triples and `single` True for a single file torrent.
+    """
+    if isinstance(paths, (str, bytes, os.PathLike)):
+        paths = [paths]
+    paths = [os.fsdecode(path) for path in paths]
+    if not paths:
+        raise ValueError("no payload paths")
+    for path in paths:
+        if not os.path.exists(path):
+            raise FilePathError(path)
+    if len(paths) == 1:
+        root = os.path.abspath(paths[0])
+        name = name or os.path.basename(root)
+        if os.path.isfile(root):
+            return name, [(root, (name,), os.path.getsize(root))], True
+        found = _walk(root)
+    else:
+        if not name:
+            raise ValueError("a name is required for several paths")
+        found = []
+        for path in paths:
+            base = os.path.basename(os.path.abspath(path))
+            if os.path.isfile(path):
+                found.append((path, (base,)))
+            else:
+                found.extend(
+                    (full, (base,) + parts) for full, parts in _walk(path)
+                )
+    if not found:
+        raise ValueError("no files in payload")
+    files = sorted(
+        (parts, path, os.path.getsize(path)) for path, parts in found
+    )
+    return name, [(path, parts, size) for parts, path, size in files], False
+
+
+def _hash_v1(payload, stream, piece_length, batch):
+    """
+    Return the SHA-1 digests of a batch of v1 pieces.
+
+    `stream` is `(files, starts, total)`, the `(path, length)` pairs of
+    the concatenated files with their offsets and total length.
+    """
+    files, starts, total = stream
+    digests = []
+    for index in batch:
+        start = index * piece_length
+        end = min(start + piece_length, total)
+        digest = hashlib.sha1()
+        if not _feed(payload, stream, start, end, digest):
+            raise FilePathError(files[bisect_right(starts, start) - 1][0])
+        digests.append(digest.digest())
+    return digests
+
+
+def _hash_aligned(payload, piece_length, hybrid, batch):
+    """
+    Hash a batch of file aligned pieces.
+
+    Returns
+    -------
+    list
+        `(merkle_root, sha1)` of every piece, sha1 is None unless
+        `hybrid`, the last piece of a file is padded with zeros for it.
+    """
+    count = piece_length // BLOCK_SIZE
+    results = []
+    for path, length, piece, pad in batch:
+        offset = piece * piece_length
+        data = payload.read(path, offset, min(piece_length, length - offset))
+        if data is None:
+            raise FilePathError(path)
+        leaves = block_hashes(data)
+        if length <= piece_length:
+            root = merkle_root(leaves, _pow2(len(leaves)))
+        else:
+            root = merkle_root(leaves, count)
+        sha1 = None
+        if hybrid:
+            digest = hashlib.sha1(data)
+            if pad and len(data) < piece_length:
+                digest.update(bytes(piece_length - len(data)))
+            sha1 = digest.digest()
+        results.append((root, sha1))
+    return results
+
+
+def _v1_layout(files, single, piece_length, padded) -> dict:
+    """Build the v1 members of the info dictionary."""
+    if single:
+        return {"length": files[0][2]}
+    entries = []
+    for num, (_, parts, length) in enumerate(files):
+        entries.append({"length": length, "path": list(parts)})
+        gap = -length % piece_length
+        if padded and gap and num < len(files) - 1:
+            pad = {"attr": "p", "length": gap, "path": [".pad", str(gap)]}
+            entries.append(pad)
+    return {"files": entries}
+
+
+def _tiers(announce) -> list:
+    """Return announce urls as a list of tiers, a flat list being one."""
+    if all(isinstance(url, str) for url in announce):
+        announce = [announce]
+    tiers = []
+    for tier in announce:
+        valid = isinstance(tier, (list, tuple)) and tier
+        if not valid or not all(isinstance(url, str) for url in tier):
+            raise ValueError(f"invalid announce tier {tier!r}")
+        tiers.append(list(tier))
+    return tiers
+
+
+def _build_v1(pool, payload, files, piece_length) -> bytes:
+    """Hash the v1 pieces of the concatenated files."""
+    stream, starts, total = [], [], 0
+    for path, _, length in files:
+        stream.append((path, length))
+        starts.append(total)
+        total += length
+    layout = (stream, starts, total)
+    jobs = [
+        pool.submit(_hash_v1, payload, layout, piece_length, b)
+        for b in _batches(range(-(-total // piece_length)))
+    ]
+    return b"".join(digest for job in jobs for digest in job.result())
+
+
+def _build_v2(pool, payload, files, piece_length, hybrid) -> tuple:
+    """
+    Hash the file aligned pieces of v2 and hybrid torrents.
+
+    Returns
+    -------
+    tuple
+        `(file_tree, piece_layers, pieces)`, pieces holding the v1
+        digests of hybrid torrents.
+    """
+    units = []
+    for num, (path, _, length) in enumerate(files):
+        pad = num < len(files) - 1
+        for piece in range(-(-length // piece_length)):
+            units.append((path, length, piece, pad))
+    jobs = [
+        pool.submit(_hash_aligned, payload, piece_length, hybrid, b)
+        for b in _batches(units)
+    ]
+    hashes = iter([item for job in jobs for item in job.result()])
+    tree, layers, sha1 = {}, {}, []
+    for _, parts, length in files:
+        node = tree
+        for part in parts:
+            node = node.setdefault(part, {})
+        node[""] = {"length": length}
+        pieces = [next(hashes) for _ in range(-(-length // piece_length))]
+        sha1.extend(digest for _, digest in pieces)
+        if not pieces:
+            continue
+        if length <= piece_length:
+            root = pieces[0][0]
+        else:
+            layer = [digest for digest, _ in pieces]
+            root = pieces_root(layer, piece_length)
+            layers[root] = b"".join(layer)
+        node[""]["pieces root"] = root
+    layers = dict(sorted(layers.items()))
+    return tree, layers, b"".join(sha1) if hybrid else None
+
+
+def _hash(files, single, piece_length, version, workers) -> tuple:
+    """
+    Hash the payload files.
+
+    Returns
+    -------
+    tuple
+        `(info, layers)`, the hashed members of the info dictionary and
+        the piece layers, None for v1 torrents.
+    """
+    info = {}
+    with ExitStack() as stack:
+        payload = _Payload(stack)
+        for path, _, length in files:
+            payload.open(path)
+            mapped = payload.maps[path]
+            if length and (mapped is None or len(mapped) < length):
+                raise FilePathError(path)
+        pool = stack.enter_context(
+            ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+        )
+        if version == 1:
+            info["pieces"] = _build_v1(pool, payload, files, piece_length)
+            info.update(_v1_layout(files, single, piece_length, False))
+            return info, None
+        hybrid = version == 3
+        tree, layers, pieces = _build_v2(
+            pool, payload, files, piece_length, hybrid
+        )
+        info["file tree"] = tree
+        info["meta version"] = 2
+        if hybrid:
+            info["pieces"] = pieces
+            info.update(_v1_layout(files, single, piece_length, True))
+    return info, layers
+
+
+def make_torrent(
+    paths,
+    out=None,
+    piece_length=None,
+    version=1,
+    *,
+    workers=None,
+    name=None,
+    announce=None,
+    comment=None,
+    private=False,
+    source=None,
+    taps=None,
+) -> dict:
+    """
+    Hash payload files and build their torrent metainfo.
+
+    Parameters
+    ----------
+    paths : str or list
+        File or directory to share, or several of them under `name`.
+    out : str or BytesIO, optional
+        Where to write the encoded torrent with `pyben.dump`.
+    piece_length : int, optional
+        Power of two of at least 16 KiB, chosen from the payload size
+        by default.
+    version : int or str, optional
+        1, 2 or "hybrid".
+    workers : int, optional
+        Hashing threads, defaults to `os.cpu_count()`.
+    name : str, optional
+        Torrent name, defaults to the name of the file or directory.
+    announce : str or list, optional
+        Tracker url, a list of urls forming one tier, or a list of tiers
+        of urls.
+    comment : str, optional
+        Free form comment.
+    private : bool, optional
+        Set the private flag.
+    source : str, optional
+        Source tag of the info dictionary.
+    taps : dict, optional
+        Sinks tapping the output while writing to `out`, see `dump`.
+
+    Raises
+    ------
+    ValueError
+        Unknown version, invalid piece length, malformed announce tiers
+        or empty payload.
+    FilePathError
+        A payload path is missing or unreadable.
+
+    Returns
+    -------
+    dict
+        Metainfo of the torrent, keys in the sorted order of bencode.
+    """
+    if version not in VERSIONS:
+        raise ValueError(f"unknown torrent version {version!r}")
+    version = VERSIONS[version]
+    name, files, single = _collect(paths, name)
+    total = sum(length for _, _, length in files)
+    piece_length = piece_length or piece_length_for(total)
+    if piece_length < MIN_PIECE or piece_length & (piece_length - 1):
+        raise ValueError(f"invalid piece length {piece_length}")
+    hashed, layers = _hash(files, single, piece_length, version, workers)
+    info = {"name": name, "piece length": piece_length, **hashed}
+    meta = {} if layers is None else {"piece layers": layers}
+    if private:
+        info["private"] = 1
+    if source:
+        info["source"] = source
+    if isinstance(announce, str):
+        meta["announce"] = announce
+    elif announce:
+        tiers = _tiers(announce)
+        meta["announce"] = tiers[0][0]
+        meta["announce-list"] = tiers
+    if comment:
+        meta["comment"] = comment
+    meta["created by"] = "pyben"
+    meta["creation date"] = int(time.time())
+    meta["info"] = dict(sorted(info.items()))
+    meta = dict(sorted(meta.items()))
+    if out is not None:
+        dump(meta, out, taps=taps)
+    return meta
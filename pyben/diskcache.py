@@ -0,0 +1,333 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""
+Persistent on-disk cache of decoded files.
+
+Decoded results are stored with `marshal` in a cache directory, so a
+restarted process loads them without parsing bencode again. A
+`DiskCache` can be passed anywhere a `DecodeCache` is accepted:
+
+    >>> cache = DiskCache("~/.cache/pyben", maxbytes=1 << 30)
+    >>> meta = pyben.load("file.torrent", cache=cache)
+
+Entries are written to a temporary file and renamed into place, so
+several processes can share one directory. Decodings using hooks are
+only persisted when every hook is a module level function or class, as
+nothing else can be named the same way by another process.
+
+Classes
+-------
+* DiskCache
+"""
+
+import hashlib
+import marshal
+import os
+import struct
+import sys
+import tempfile
+
+MAGIC = b"PYBC"
+FORMAT_VERSION = 1
+HEADER = struct.Struct(">4sHH")
+SUFFIX = ".pybc"
+STAT = "stat"
+CONTENT = "content"
+_PLAIN = (str, bytes, int, float, bool, type(None))
+
+
+def _stable(value):
+    """
+    Describe a cache variant identically in every process.
+
+    Parameters
+    ----------
+    value : any
+        Variant, plain values, callables and tuples of them.
+
+    Returns
+    -------
+    str or None
+        Description, None if part of the variant has no stable name.
+    """
+    if isinstance(value, tuple):
+        parts = [_stable(item) for item in value]
+        if None in parts:
+            return None
+        return "(" + ", ".join(parts) + ",)"
+    if isinstance(value, _PLAIN):
+        return repr(value)
+    module = getattr(value, "__module__", None)
+    qualname = getattr(value, "__qualname__", None)
+    if (
+        not isinstance(module, str)
+        or not isinstance(qualname, str)
+        or "<" in qualname
+        or hasattr(value, "__func__")
+    ):
+        return None
+    return f"{module}.{qualname}"
+
+
+class DiskCache:
+    """Directory of marshalled decode results bounded by total size."""
+
+    def __init__(self, directory, maxbytes=1 << 30, key=STAT):
+        """
+        Construct the DiskCache.
+
+        Parameters
+        ----------
+        directory : str
+            Cache directory, created if missing.
+        maxbytes : int, optional
+            Size of the directory above which old entries are evicted.
+        key : str, optional
+            "stat" keys entries on `(inode, mtime, size)`, "content" on a
+            hash of the file contents.
+        """
+        if key not in (STAT, CONTENT):
+            raise ValueError(key)
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        os.makedirs(self.directory, exist_ok=True)
+        self.maxbytes = maxbytes
+        self.keytype = key
+        self.hits = self.misses = self.errors = 0
+        self._written = 0
+        self._tag = sys.implementation.cache_tag
+
+    def key(self, path, variant=None) -> str:
+        """
+        Build the entry name of a file.
+
+        Parameters
+        ----------
+        path : str
+            Path to the file.
+        variant : any, optional
+            Extra key separating different decodings of the same file.
+
+        Raises
+        ------
+        OSError
+            The file cannot be read.
+
+        Returns
+        -------
+        str or None
+            Hex digest naming the entry, None if the variant cannot be
+            keyed across processes.
+        """
+        variant = _stable(variant)
+        if variant is None:
+            return None
+        if self.keytype == CONTENT:
+            digest = hashlib.sha256()
+            with open(path, "rb") as _fd:
+                for chunk in iter(lambda: _fd.read(1 << 20), b""):
+                    digest.update(chunk)
+            ident = digest.hexdigest()
+        else:
+            stat = os.stat(path)
+            ident = (stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        text = repr((self._tag, FORMAT_VERSION, ident, variant))
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _entry(self, name: str) -> str:
+        """Return the path of an entry."""
+        return os.path.join(self.directory, name + SUFFIX)
+
+    def get(self, path, loader, variant=None):
+        """
+        Return the decoded contents of a file, loading it on a miss.
+
+        Parameters
+        ----------
+        path : str
+            Path to the file.
+        loader : callable
+            Called with the path to decode the file on a miss.
+        variant : any, optional
+            Extra key separating different decodings of the same file.
+
+        Returns
+        -------
+        any
+            Decoded contents of the file.
+        """
+        name = self.key(path, variant)
+        if name is None:
+            self.misses += 1
+            return loader(path)
+        entry = self._entry(name)
+        found, value = self._read(entry)
+        if found:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = loader(path)
+        self._write(entry, value)
+        return value
+
+    def _read(self, entry: str) -> tuple:
+        """
+        Load an entry, removing it if it is unreadable.
+
+        Parameters
+        ----------
+        entry : str
+            Path of the entry.
+
+        Returns
+        -------
+        tuple
+            `(found, value)`
+        """
+        try:
+            with open(entry, "rb") as _fd:
+                data = _fd.read()
+        except OSError:
+            return False, None
+        try:
+            magic, version, marshal_version = HEADER.unpack_from(data)
+            if (magic, version, marshal_version) != (
+                MAGIC,
+                FORMAT_VERSION,
+                marshal.version,
+            ):
+                raise ValueError(entry)
+            value = marshal.loads(memoryview(data)[HEADER.size:])
+        except (EOFError, ValueError, TypeError, struct.error):
+            self.errors += 1
+            self._remove(entry)
+            return False, None
+        try:
+            os.utime(entry)
+        except OSError:  # pragma: nocover
+            pass
+        return True, value
+
+    def _write(self, entry: str, value):
+        """
+        Atomically store an entry, ignoring values marshal cannot store.
+
+        Parameters
+        ----------
+        entry : str
+            Path of the entry.
+        value : any
+            Decoded data.
+        """
+        try:
+            payload = marshal.dumps(value)
+        except ValueError:
+            return
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, marshal.version)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as _fd:
+                _fd.write(header)
+                _fd.write(payload)
+            os.replace(tmp, entry)
+        except OSError:
+            self._remove(tmp)
+            return
+        self._written += len(header) + len(payload)
+        if self._written > self.maxbytes // 8:
+            self.prune()
+
+    @staticmethod
+    def _remove(path: str):
+        """Delete a file, ignoring errors."""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _entries(self) -> list:
+        """
+        List the entries of the cache directory.
+
+        Returns
+        -------
+        list
+            `(mtime, size, path)` of every entry.
+        """
+        entries = []
+        with os.scandir(self.directory) as found:
+            for item in found:
+                if not item.name.endswith(SUFFIX):
+                    continue
+                try:
+                    stat = item.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, item.path))
+        return entries
+
+    def size(self) -> int:
+        """Return the total size of the stored entries."""
+        return sum(size for _, size, _ in self._entries())
+
+    def prune(self, maxbytes=None) -> int:
+        """
+        Evict the least recently used entries above a size limit.
+
+        Parameters
+        ----------
+        maxbytes : int, optional
+            Size limit, defaults to `self.maxbytes`.
+
+        Returns
+        -------
+        int
+            Number of entries removed.
+        """
+        limit = self.maxbytes if maxbytes is None else maxbytes
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= limit:
+                break
+            self._remove(path)
+            total -= size
+            removed += 1
+        self._written = 0
+        return removed
+
+    def clear(self):
+        """Remove every entry and reset the statistics."""
+        self.prune(0)
+        self.hits = self.misses = self.errors = 0
+
+    def stats(self) -> dict:
+        """
+        Return cache statistics.
+
+        Returns
+        -------
+        dict
+            Hits, misses, unreadable entries, hit rate, entries and bytes.
+        """
+        entries = self._entries()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+        }
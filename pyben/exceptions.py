@@ -32,6 +32,11 @@ class DecodeError(Exception):
         """Construct Exception DecodeError."""
         msg = f"Unable to decode invalid {type(val)} type = {str(val)}"
         super().__init__(msg)
+        self.val = val
+
+    def __reduce__(self):
+        """Pickle with the original value so workers can return it."""
+        return type(self), (self.val,)
 
 
 class EncodeError(Exception):
@@ -52,6 +57,11 @@ class EncodeError(Exception):
         """Construct Exception EncodeError."""
         msg = f"Encoder is unable to interpret {type(val)} type = {str(val)}"
         super().__init__(msg)
+        self.val = val
+
+    def __reduce__(self):
+        """Pickle with the original value so workers can return it."""
+        return type(self), (self.val,)
 
 
 class FilePathError(Exception):
@@ -70,3 +80,33 @@ class FilePathError(Exception):
         """Construct Exception Subclass FilePathError."""
         msg = f"{str(obj)} doesn't exist or is unavailable."
         super().__init__(msg)
+        self.obj = obj
+
+    def __reduce__(self):
+        """Pickle with the original value so workers can return it."""
+        return type(self), (self.obj,)
+
+
+class RPCError(Exception):
+    """Error reply to a bencode RPC request.
+
+    Raised by clients when the remote end answers with a KRPC style
+    error message, and raised by request handlers to send one.
+
+    Parameters
+    ----------
+    code : int
+        Error code, 201 generic, 202 server, 203 protocol, 204 method.
+    message : str
+        Error description.
+    """
+
+    def __init__(self, code=201, message="Generic Error"):
+        """Construct Exception RPCError."""
+        super().__init__(f"{code} {message}")
+        self.code = code
+        self.message = message
+
+    def __reduce__(self):
+        """Pickle with the original code and message."""
+        return type(self), (self.code, self.message)
@@ -0,0 +1,347 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""
+Bulk export of many torrent files to NDJSON or columnar arrays.
+
+Files are decoded in a worker pool and reduced to rows inside the
+workers, so only the exported values travel back to the caller:
+
+    >>> pyben.export_ndjson(paths, "torrents.ndjson", workers=8)
+    >>> cols = pyben.export_columns(paths, ["total_length", "infohash"])
+    >>> cols["total_length"].sum()
+
+Integer fields become `numpy.int64` arrays when NumPy is installed and
+`array.array("q")` otherwise. Infohashes become a `V20` array, read one
+digest with `column[row].tobytes()`.
+
+Functions
+---------
+* export_columns
+* export_ndjson
+"""
+
+import hashlib
+import json
+from array import array
+from functools import partial
+
+from pyben.api import load
+from pyben.parallel import imap_chunks
+
+DEFAULT_COLUMNS = (
+    "name",
+    "total_length",
+    "piece_length",
+    "piece_count",
+    "file_count",
+    "infohash",
+)
+
+
+def _files(info: dict) -> list:
+    """
+    Return the lengths of every file described by an info dict.
+
+    Parameters
+    ----------
+    info : dict
+        Decoded info dictionary, v1, v2 or hybrid.
+
+    Returns
+    -------
+    list
+        File lengths in bytes, BEP 47 padding files left out.
+    """
+    if "files" in info:
+        return [
+            entry.get("length", 0)
+            for entry in info["files"]
+            if "p" not in entry.get("attr", "")
+        ]
+    if "length" in info:
+        return [info["length"]]
+    lengths, stack = [], [info.get("file tree", {})]
+    while stack:
+        node = stack.pop()
+        for key, child in node.items():
+            if key == "" and isinstance(child, dict):
+                lengths.append(child.get("length", 0))
+            elif isinstance(child, dict):
+                stack.append(child)
+    return lengths
+
+
+def _piece_count(info: dict) -> int:
+    """Return the number of pieces of an info dict."""
+    if "pieces" in info:
+        return len(info["pieces"]) // 20
+    piece_length = info.get("piece length") or 1
+    return sum(-(-size // piece_length) for size in _files(info))
+
+
+def _infohash(info) -> bytes:
+    """Return the sha1 digest of the info dict as it was encoded."""
+    return hashlib.sha1(info.source[info.start:info.end]).digest()
+
+
+def _text(value) -> str:
+    """Return a decoded string, hex encoding binary ones."""
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    return value
+
+
+FIELDS = {
+    "name": ("str", lambda meta: _text(meta["info"].get("name", ""))),
+    "announce": ("str", lambda meta: _text(meta.get("announce", ""))),
+    "total_length": ("int", lambda meta: sum(_files(meta["info"]))),
+    "piece_length": (
+        "int",
+        lambda meta: meta["info"].get("piece length", 0),
+    ),
+    "piece_count": ("int", lambda meta: _piece_count(meta["info"])),
+    "file_count": ("int", lambda meta: len(_files(meta["info"]))),
+    "private": ("int", lambda meta: meta["info"].get("private", 0)),
+    "creation_date": ("int", lambda meta: meta.get("creation date", 0)),
+    "infohash": ("bytes", lambda meta: _infohash(meta["info"])),
+}
+
+
+def _row(path, fields: tuple) -> tuple:
+    """
+    Decode one torrent and extract the requested fields.
+
+    Parameters
+    ----------
+    path : str
+        Path to the torrent file.
+    fields : tuple
+        Names of entries in `FIELDS`.
+
+    Returns
+    -------
+    tuple
+        Field values in the order of `fields`.
+    """
+    meta = load(path, spans="infohash" in fields)
+    return tuple(FIELDS[field][1](meta) for field in fields)
+
+
+def _row_chunk(paths: list, fields: tuple) -> list:
+    """
+    Extract rows for a chunk of paths, capturing errors.
+
+    Parameters
+    ----------
+    paths : list
+        Paths to the torrent files.
+    fields : tuple
+        Names of entries in `FIELDS`.
+
+    Returns
+    -------
+    list
+        `(path, row_or_exception)` pairs.
+    """
+    rows = []
+    for path in paths:
+        try:
+            rows.append((path, _row(path, fields)))
+        except Exception as err:  # pylint: disable=broad-except
+            rows.append((path, err))
+    return rows
+
+
+def _ndjson_chunk(paths: list, fields) -> list:
+    """
+    Serialize a chunk of paths to NDJSON lines.
+
+    Parameters
+    ----------
+    paths : list
+        Paths to the torrent files.
+    fields : tuple or None
+        Names of entries in `FIELDS`, None for the whole metadata.
+
+    Returns
+    -------
+    list
+        One line per path, the whole metadata becomes `{"path", "meta"}`
+        objects and errors become `{"path", "error"}` objects.
+    """
+    lines = []
+    for path in paths:
+        try:
+            if fields is None:
+                meta = load(path, to_json=True)
+                record = {"path": str(path), "meta": meta}
+            else:
+                record = {"path": str(path)}
+                for field, value in zip(fields, _row(path, fields)):
+                    record[field] = _text(value)
+        except Exception as err:  # pylint: disable=broad-except
+            record = {"path": str(path), "error": repr(err)}
+        lines.append(json.dumps(record) + "\n")
+    return lines
+
+
+def _check_fields(fields) -> tuple:
+    """Return `fields` as a tuple, rejecting unknown names."""
+    fields = tuple(fields)
+    for field in fields:
+        if field not in FIELDS:
+            raise KeyError(field)
+    return fields
+
+
+def export_ndjson(paths, out, fields=None, workers=None, **kwargs) -> int:
+    """
+    Write one JSON line per torrent file.
+
+    Parameters
+    ----------
+    paths : iterable
+        Paths to torrent files.
+    out : str or TextIO
+        Path or open text file the lines are written to.
+    fields : iterable, optional
+        Names of entries in `FIELDS` to export, by default the complete
+        metadata as returned by `load(path, to_json=True)` is written
+        under a "meta" key next to the "path".
+    workers : int, optional
+        Number of workers, defaults to `os.cpu_count()`.
+    **kwargs : dict
+        `executor`, `ordered`, `chunksize` and `backlog`, see
+        `pyben.parallel.imap_chunks`.
+
+    Returns
+    -------
+    int
+        Number of lines written.
+    """
+    if not hasattr(out, "write"):
+        with open(out, "w", encoding="utf-8") as _fd:
+            return export_ndjson(paths, _fd, fields, workers, **kwargs)
+    if fields is not None:
+        fields = _check_fields(fields)
+    count = 0
+    lines = imap_chunks(
+        partial(_ndjson_chunk, fields=fields), paths, workers, **kwargs
+    )
+    for line in lines:
+        out.write(line)
+        count += 1
+    return count
+
+
+def _numpy():
+    """Import NumPy on first use, returning None if it is not installed."""
+    try:
+        import numpy
+    except ImportError:  # pragma: nocover
+        return None
+    return numpy
+
+
+def _column(kind: str, values: list, numpy=None):
+    """
+    Convert a list of values into a column.
+
+    Parameters
+    ----------
+    kind : str
+        "int", "str" or "bytes".
+    values : list
+        Column values.
+    numpy : module, optional
+        Build NumPy arrays instead of `array.array` and lists.
+
+    Returns
+    -------
+    any
+        The column.
+    """
+    if numpy is not None:
+        if kind == "int":
+            return numpy.array(values, dtype=numpy.int64)
+        if kind == "bytes":
+            # "S20" would strip trailing NUL bytes from the digests.
+            return numpy.array(values, dtype="V20")
+        return numpy.array(values, dtype=object)
+    if kind == "int":
+        return array("q", values)
+    return values
+
+
+def export_columns(
+    paths,
+    fields=DEFAULT_COLUMNS,
+    workers=None,
+    use_numpy=None,
+    errors=None,
+    **kwargs,
+) -> dict:
+    """
+    Collect selected fields of many torrent files into columns.
+
+    Parameters
+    ----------
+    paths : iterable
+        Paths to torrent files.
+    fields : iterable, optional
+        Names of entries in `FIELDS`.
+    workers : int, optional
+        Number of workers, defaults to `os.cpu_count()`.
+    use_numpy : bool, optional
+        Build NumPy arrays, by default when NumPy is installed.
+    errors : list, optional
+        Failed files are appended as `(path, exception)` and skipped,
+        without it the first failure is raised.
+    **kwargs : dict
+        `executor`, `ordered`, `chunksize` and `backlog`, see
+        `pyben.parallel.imap_chunks`.
+
+    Raises
+    ------
+    ImportError
+        `use_numpy` is True and NumPy is not installed.
+
+    Returns
+    -------
+    dict
+        Column per field plus a "path" list.
+    """
+    fields = _check_fields(fields)
+    numpy = None
+    if use_numpy or use_numpy is None:
+        numpy = _numpy()
+        if numpy is None and use_numpy:
+            raise ImportError("numpy")
+    found, values = [], [[] for _ in fields]
+    rows = imap_chunks(
+        partial(_row_chunk, fields=fields), paths, workers, **kwargs
+    )
+    for path, row in rows:
+        if isinstance(row, Exception):
+            if errors is None:
+                raise row
+            errors.append((path, row))
+            continue
+        found.append(path)
+        for column, value in zip(values, row):
+            column.append(value)
+    columns = {"path": found}
+    for field, column in zip(fields, values):
+        columns[field] = _column(FIELDS[field][0], column, numpy)
+    return columns
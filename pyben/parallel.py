@@ -0,0 +1,352 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""
+Bulk decoding of many bencoded files with thread or process pools.
+
+    >>> for path, meta in pyben.load_many(paths, workers=8):
+    ...     if isinstance(meta, Exception):
+    ...         print(path, meta)
+
+Functions
+---------
+* load_many
+* scan
+"""
+
+import os
+from collections import deque
+from concurrent import futures
+from fnmatch import fnmatch
+from functools import partial
+from itertools import islice
+
+from pyben.api import load
+
+EXECUTORS = {
+    "thread": futures.ThreadPoolExecutor,
+    "process": futures.ProcessPoolExecutor,
+}
+
+
+def _load_chunk(paths: list) -> list:
+    """
+    Decode every path in a chunk, capturing errors.
+
+    Parameters
+    ----------
+    paths : list
+        Paths to decode.
+
+    Returns
+    -------
+    list
+        `(path, result_or_exception)` pairs.
+    """
+    results = []
+    for path in paths:
+        try:
+            results.append((path, load(path)))
+        except Exception as err:  # pylint: disable=broad-except
+            results.append((path, err))
+    return results
+
+
+def _chunks(items, size: int):
+    """
+    Split an iterable into lists of `size` items.
+
+    Parameters
+    ----------
+    items : iterable
+        Items to split.
+    size : int
+        Number of items per chunk.
+
+    Yields
+    ------
+    list
+        Next chunk.
+    """
+    items = iter(items)
+    chunk = list(islice(items, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(items, size))
+
+
+def imap_chunks(
+    func,
+    items,
+    workers=None,
+    executor="thread",
+    *,
+    ordered=True,
+    chunksize=64,
+    backlog=None,
+):
+    """
+    Apply `func` to chunks of `items` in a pool with bounded backlog.
+
+    At most `backlog` chunks are in flight at any time, so `items` may
+    be a lazy iterator over millions of entries.
+
+    Parameters
+    ----------
+    func : callable
+        Picklable function taking a list and returning a list of results.
+    items : iterable
+        Items to process.
+    workers : int, optional
+        Number of workers, defaults to `os.cpu_count()`.
+    executor : str or Executor, optional
+        "thread", "process" or an existing `concurrent.futures.Executor`.
+    ordered : bool, optional
+        Yield results in input order, otherwise as they complete.
+    chunksize : int, optional
+        Items per task.
+    backlog : int, optional
+        Chunks in flight, defaults to twice the number of workers.
+
+    Yields
+    ------
+    any
+        Items of the lists returned by `func`.
+    """
+    workers = workers or os.cpu_count() or 1
+    backlog = backlog or 2 * workers
+
+    if isinstance(executor, futures.Executor):
+        pool, owned = executor, False
+    else:
+        pool, owned = EXECUTORS[executor](max_workers=workers), True
+
+    chunks = _chunks(items, chunksize)
+    pending = deque()
+    try:
+        for chunk in islice(chunks, backlog):
+            pending.append(pool.submit(func, chunk))
+        while pending:
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                finished, _ = futures.wait(
+                    pending, return_when=futures.FIRST_COMPLETED
+                )
+                done = [fut for fut in pending if fut in finished]
+                for fut in done:
+                    pending.remove(fut)
+            for future in done:
+                results = future.result()
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    pending.append(pool.submit(func, chunk))
+                yield from results
+    finally:
+        for future in pending:
+            future.cancel()
+        if owned:
+            pool.shutdown(wait=True)
+
+
+def load_many(
+    paths,
+    workers=None,
+    executor="thread",
+    ordered=True,
+    *,
+    chunksize=64,
+    backlog=None,
+):
+    """
+    Decode many bencoded files in parallel.
+
+    Errors never abort the iteration, the exception raised for a path is
+    returned in place of its result.
+
+    Parameters
+    ----------
+    paths : iterable
+        Paths or path-like objects to decode.
+    workers : int, optional
+        Number of workers, defaults to `os.cpu_count()`.
+    executor : str or Executor, optional
+        "thread", "process" or an existing `concurrent.futures.Executor`.
+    ordered : bool, optional
+        Yield results in input order, otherwise as they complete.
+    chunksize : int, optional
+        Paths per task.
+    backlog : int, optional
+        Chunks in flight, see `imap_chunks`.
+
+    Yields
+    ------
+    tuple
+        `(path, result_or_exception)` for every path.
+    """
+    yield from imap_chunks(
+        _load_chunk,
+        paths,
+        workers=workers,
+        executor=executor,
+        ordered=ordered,
+        chunksize=chunksize,
+        backlog=backlog,
+    )
+
+
+def _walk(directory, pattern: str, recursive: bool):
+    """
+    Find files matching `pattern` with `os.scandir`.
+
+    Parameters
+    ----------
+    directory : str
+        Directory to search.
+    pattern : str
+        Shell style pattern matched against file names.
+    recursive : bool
+        Descend into sub directories.
+
+    Yields
+    ------
+    tuple
+        `(path, stat)` for every matching file.
+    """
+    stack = [os.fspath(directory)]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            stack.append(entry.path)
+                    elif fnmatch(entry.name, pattern):
+                        yield entry.path, entry.stat()
+                except OSError:
+                    continue
+
+
+def _select(decoded, fields) -> dict:
+    """
+    Keep only the requested fields of a decoded dictionary.
+
+    Parameters
+    ----------
+    decoded : dict
+        Decoded data.
+    fields : iterable
+        Keys, or tuples of keys describing a nested path.
+
+    Returns
+    -------
+    dict
+        Mapping of each field found to its value.
+    """
+    selected = {}
+    for field in fields:
+        value = decoded
+        for key in field if isinstance(field, tuple) else (field,):
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            selected[field] = value
+    return selected
+
+
+def _scan_chunk(items: list, fields=None) -> list:
+    """
+    Decode a chunk of `(path, stat)` pairs found by `_walk`.
+
+    Parameters
+    ----------
+    items : list
+        `(path, stat)` pairs.
+    fields : iterable, optional
+        Fields passed to `_select`.
+
+    Returns
+    -------
+    list
+        `(path, stat, result_or_exception)` records.
+    """
+    records = []
+    paths = [path for path, _ in items]
+    for (path, decoded), (_, stat) in zip(_load_chunk(paths), items):
+        if fields is not None and isinstance(decoded, dict):
+            decoded = _select(decoded, fields)
+        records.append((path, stat, decoded))
+    return records
+
+
+def scan(
+    directory,
+    pattern="*.torrent",
+    recursive=True,
+    workers=None,
+    *,
+    fields=None,
+    executor="thread",
+    ordered=False,
+    chunksize=64,
+    backlog=None,
+):
+    """
+    Find and decode every bencoded file below a directory in parallel.
+
+    Records are yielded as soon as they are decoded, in no particular
+    order unless `ordered` is set.
+
+    Parameters
+    ----------
+    directory : str
+        Directory to search.
+    pattern : str, optional
+        Shell style pattern matched against file names.
+    recursive : bool, optional
+        Descend into sub directories.
+    workers : int, optional
+        Number of workers, defaults to `os.cpu_count()`.
+    fields : iterable, optional
+        Keys or key path tuples to keep from each decoded file, by
+        default everything is kept.
+    executor : str or Executor, optional
+        "thread", "process" or an existing `concurrent.futures.Executor`.
+    ordered : bool, optional
+        Yield records in the order files are found.
+    chunksize : int, optional
+        Files per task.
+    backlog : int, optional
+        Chunks in flight, see `imap_chunks`.
+
+    Yields
+    ------
+    tuple
+        `(path, stat, decoded_or_exception)` for every matching file.
+    """
+    if fields is not None:
+        fields = tuple(fields)
+    yield from imap_chunks(
+        partial(_scan_chunk, fields=fields),
+        _walk(directory, pattern, recursive),
+        workers=workers,
+        executor=executor,
+        ordered=ordered,
+        chunksize=chunksize,
+        backlog=backlog,
+    )
@@ -0,0 +1,220 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+r"""
+Compact peer and node lists of tracker and DHT messages.
+
+Tracker replies and DHT responses carry `peers`, `peers6`, `nodes` and
+`nodes6` as packed binary strings. They are unpacked in bulk with
+`struct.iter_unpack`, or viewed as NumPy structured arrays without
+copying:
+
+    >>> unpack_compact(reply["peers"])
+    [('10.0.0.1', 6881), ...]
+    >>> unpack_compact(reply["nodes"], "nodes", text=False)
+    [(b'<node id>', b'\n\x00\x00\x01', 6881), ...]
+    >>> compact_array(reply["peers"])["port"]
+
+`compact_hook` is an `object_hook` for `pyben.loads` unpacking these
+members while decoding.
+
+Functions
+---------
+* compact_array
+* compact_hook
+* pack_compact
+* unpack_compact
+"""
+
+import socket
+import struct
+from functools import partial
+
+from pyben.exceptions import DecodeError, EncodeError
+
+FORMATS = {
+    "peers": (struct.Struct(">4sH"), socket.AF_INET),
+    "peers6": (struct.Struct(">16sH"), socket.AF_INET6),
+    "nodes": (struct.Struct(">20s4sH"), socket.AF_INET),
+    "nodes6": (struct.Struct(">20s16sH"), socket.AF_INET6),
+}
+
+DTYPES = {
+    "peers": [("ip", ">u4"), ("port", ">u2")],
+    "peers6": [("ip", "u1", (16,)), ("port", ">u2")],
+    "nodes": [("id", "u1", (20,)), ("ip", ">u4"), ("port", ">u2")],
+    "nodes6": [("id", "u1", (20,)), ("ip", "u1", (16,)), ("port", ">u2")],
+}
+
+VALUE_KINDS = {6: "peers", 18: "peers6"}
+
+
+def _format(kind: str) -> tuple:
+    """Return the struct and address family of a compact kind."""
+    try:
+        return FORMATS[kind]
+    except KeyError:
+        raise ValueError(f"unknown compact kind {kind!r}") from None
+
+
+def _blob(data, size: int):
+    """Check a compact string holds whole records."""
+    if data.__class__ is str:
+        data = data.encode("utf-8")
+    if len(data) % size:
+        raise DecodeError(bytes(data[:32]))
+    return data
+
+
+def unpack_compact(data, kind: str = "peers", text: bool = True) -> list:
+    """
+    Unpack a compact peer or node list.
+
+    Parameters
+    ----------
+    data : bytes-like
+        Packed records, a `str` is taken as its utf-8 bytes.
+    kind : str, optional
+        "peers", "peers6", "nodes" or "nodes6".
+    text : bool, optional
+        Return addresses as text, otherwise as packed bytes.
+
+    Raises
+    ------
+    DecodeError
+        The length of `data` is not a multiple of the record size.
+
+    Returns
+    -------
+    list
+        `(ip, port)` for peers, `(node_id, ip, port)` for nodes.
+    """
+    record, family = _format(kind)
+    data = _blob(data, record.size)
+    items = record.iter_unpack(data)
+    if not text:
+        return list(items)
+    if family == socket.AF_INET:
+        ntoa = socket.inet_ntoa
+    else:
+        ntoa = partial(socket.inet_ntop, family)
+    if kind.startswith("peers"):
+        return [(ntoa(ip), port) for ip, port in items]
+    return [(node, ntoa(ip), port) for node, ip, port in items]
+
+
+def pack_compact(items, kind: str = "peers") -> bytes:
+    """
+    Pack peers or nodes into a compact string.
+
+    Parameters
+    ----------
+    items : Iterable or numpy.ndarray
+        `(ip, port)` or `(node_id, ip, port)` tuples with addresses as
+        text or packed bytes, or an array from `compact_array`.
+    kind : str, optional
+        "peers", "peers6", "nodes" or "nodes6".
+
+    Raises
+    ------
+    EncodeError
+        An item is not a valid address record.
+
+    Returns
+    -------
+    bytes
+        Packed records.
+    """
+    record, family = _format(kind)
+    if hasattr(items, "dtype"):
+        return items.astype(DTYPES[kind], copy=False).tobytes()
+    pack, aton = record.pack, socket.inet_pton
+    out = []
+    for item in items:
+        try:
+            *head, ip, port = item
+            if ip.__class__ is str:
+                ip = aton(family, ip)
+            out.append(pack(*head, ip, port))
+        except (OSError, TypeError, ValueError, struct.error) as err:
+            raise EncodeError(item) from err
+    return b"".join(out)
+
+
+def compact_array(data, kind: str = "peers"):
+    """
+    View a compact peer or node list as a NumPy structured array.
+
+    Parameters
+    ----------
+    data : bytes-like
+        Packed records.
+    kind : str, optional
+        "peers", "peers6", "nodes" or "nodes6".
+
+    Raises
+    ------
+    ImportError
+        NumPy is not installed.
+    DecodeError
+        The length of `data` is not a multiple of the record size.
+
+    Returns
+    -------
+    numpy.ndarray
+        Read-only array over `data` with `ip` and `port` fields, and
+        `id` for nodes. IPv4 addresses are big-endian integers.
+    """
+    import numpy
+
+    record, _ = _format(kind)
+    return numpy.frombuffer(_blob(data, record.size), dtype=DTYPES[kind])
+
+
+def compact_hook(obj: dict, text: bool = True) -> dict:
+    """
+    Unpack compact members of a decoded dictionary.
+
+    Pass as `object_hook` to `pyben.loads` or `pyben.load`, or wrapped
+    with `functools.partial` for `text=False`. The `peers`, `peers6`,
+    `nodes` and `nodes6` members and the DHT `values` list are replaced
+    by lists of tuples, other members and non-compact peer lists are
+    left unchanged.
+
+    Parameters
+    ----------
+    obj : dict
+        Decoded dictionary.
+    text : bool, optional
+        Return addresses as text, otherwise as packed bytes.
+
+    Returns
+    -------
+    dict
+        `obj` with its compact members unpacked.
+    """
+    for kind in FORMATS:
+        value = obj.get(kind)
+        if value.__class__ is bytes or value.__class__ is str:
+            obj[kind] = unpack_compact(value, kind, text)
+    values = obj.get("values")
+    if values.__class__ is list:
+        peers = []
+        for value in values:
+            if value.__class__ is str:
+                value = value.encode("utf-8")
+            if value.__class__ is not bytes or len(value) not in VALUE_KINDS:
+                return obj
+            peers.extend(unpack_compact(value, VALUE_KINDS[len(value)], text))
+        obj["values"] = peers
+    return obj
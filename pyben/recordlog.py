@@ -0,0 +1,451 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""
+Indexed append-only store of bencoded records.
+
+Values are appended to a data file as bencoded records and located
+through a compact side index of `(key, offset, length)` entries, so a
+single record is read from a memory map without scanning:
+
+    >>> with RecordLog("resume.dat") as log:
+    ...     log.put(info_hash, {"uploaded": 1024, "bitfield": bits})
+    ...     state = log.get(info_hash)
+    ...     log.compact()
+
+Updating or deleting a key appends a new record, `stale` counts the
+records left behind and `compact` drops them. After a crash, records
+missing from the index are recovered from the data file and a torn
+final record is truncated.
+
+Classes
+-------
+* RecordLog
+"""
+
+import mmap
+import os
+import struct
+
+from pyben.core import decode, encode
+from pyben.exceptions import DecodeError
+
+DATA_MAGIC = b"PYBR"
+INDEX_MAGIC = b"PYBI"
+FORMAT_VERSION = 1
+HEADER = struct.Struct(">4sH16s")
+ENTRY = struct.Struct(">QIBH")
+TEXT_KEY = 1
+DELETED = 2
+
+
+def _key_bytes(key) -> tuple:
+    """
+    Split a key into its raw bytes and type flag.
+
+    Parameters
+    ----------
+    key : str or bytes
+        Record key.
+
+    Returns
+    -------
+    tuple
+        `(raw, flags)`
+    """
+    if isinstance(key, str):
+        return key.encode("utf-8"), TEXT_KEY
+    if isinstance(key, (bytes, bytearray)):
+        return bytes(key), 0
+    raise TypeError(key)
+
+
+def _key_from(raw, flags: int):
+    """
+    Rebuild a key from its raw form and flags.
+
+    Parameters
+    ----------
+    raw : str or bytes
+        Key as stored.
+    flags : int
+        Flags written with the key.
+
+    Returns
+    -------
+    str or bytes
+        The original key.
+    """
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")
+    return raw.decode("utf-8") if flags & TEXT_KEY else raw
+
+
+class RecordLog:
+    """Append-only data file of bencoded records with a side index."""
+
+    def __init__(self, path, sync: bool = False):
+        """
+        Open or create a record log.
+
+        Parameters
+        ----------
+        path : str
+            Data file, the index is kept next to it in `path + ".idx"`.
+        sync : bool, optional
+            Call `os.fsync` whenever the log is flushed.
+        """
+        self.path = os.fspath(path)
+        self.index_path = self.path + ".idx"
+        self.sync = sync
+        self._index = {}
+        self.stale = 0
+        self._map = None
+        self._mapped = 0
+        self._generation = None
+        self._open()
+
+    # -- opening and recovery ---------------------------------------------
+
+    def _open(self):
+        """Open both files, rebuilding the index if it is out of date."""
+        if not os.path.exists(self.path):
+            self._create(self.path, os.urandom(16))
+        with open(self.path, "rb") as _fd:
+            magic, version, generation = HEADER.unpack(
+                _fd.read(HEADER.size)
+            )
+        if (magic, version) != (DATA_MAGIC, FORMAT_VERSION):
+            raise DecodeError(magic)
+        self._generation = generation
+        end = self._read_index()
+        self._data = open(self.path, "r+b")
+        self._data.seek(0, os.SEEK_END)
+        end = self._recover(end)
+        self._data.truncate(end)
+        self._data.seek(end)
+        self._idx = open(self.index_path, "ab")
+
+    @staticmethod
+    def _create(path: str, generation: bytes):
+        """Write an empty data file."""
+        with open(path, "wb") as _fd:
+            _fd.write(HEADER.pack(DATA_MAGIC, FORMAT_VERSION, generation))
+
+    def _read_index(self) -> int:
+        """
+        Load the index entries that point inside the data file.
+
+        Returns
+        -------
+        int
+            End offset of the last indexed record.
+        """
+        size = os.path.getsize(self.path)
+        try:
+            with open(self.index_path, "rb") as _fd:
+                data = _fd.read()
+        except FileNotFoundError:
+            data = b""
+        header = HEADER.pack(INDEX_MAGIC, FORMAT_VERSION, self._generation)
+        if not data.startswith(header):
+            with open(self.index_path, "wb") as _fd:
+                _fd.write(header)
+            return HEADER.size
+
+        end = pos = HEADER.size
+        while pos + ENTRY.size <= len(data):
+            offset, length, flags, keylen = ENTRY.unpack_from(data, pos)
+            stop = pos + ENTRY.size + keylen
+            if stop > len(data) or offset + length + 1 > size:
+                break
+            key = _key_from(data[pos + ENTRY.size:stop], flags)
+            self._apply(key, offset, length, flags)
+            end = offset + length + 1
+            pos = stop
+        if pos != len(data):
+            os.truncate(self.index_path, pos)
+        return end
+
+    def _recover(self, end: int) -> int:
+        """
+        Index records written after the last index entry.
+
+        A torn record at the end of the data file is dropped.
+
+        Parameters
+        ----------
+        end : int
+            End offset of the last indexed record.
+
+        Returns
+        -------
+        int
+            End offset of the last complete record.
+        """
+        size = self._data.tell()
+        if end >= size:
+            return end
+        self._data.seek(end)
+        tail = self._data.read()
+        entries, pos = [], 0
+        while pos < len(tail):
+            try:
+                record, stop = decode(tail, pos)
+            except DecodeError:
+                break
+            if not (
+                isinstance(record, list)
+                and len(record) in (2, 3)
+                and isinstance(record[0], int)
+            ):
+                break
+            flags, key = record[0], record[1]
+            start = end + pos + 1 + len(encode(flags)) + len(encode(key))
+            length = end + stop - 1 - start
+            key = _key_from(key, flags)
+            entries.append(self._entry(key, start, length, flags))
+            self._apply(key, start, length, flags)
+            pos = stop
+        with open(self.index_path, "ab") as _fd:
+            _fd.write(b"".join(entries))
+        return end + pos
+
+    def _apply(self, key, offset: int, length: int, flags: int):
+        """Update the in-memory index with one entry."""
+        if flags & DELETED:
+            self._index.pop(key, None)
+            self.stale += 2
+        else:
+            if key in self._index:
+                self.stale += 1
+            self._index[key] = (offset, length)
+
+    @staticmethod
+    def _entry(key, offset: int, length: int, flags: int) -> bytes:
+        """Pack one index entry."""
+        raw, _ = _key_bytes(key)
+        return ENTRY.pack(offset, length, flags, len(raw)) + raw
+
+    # -- writing ------------------------------------------------------------
+
+    def _append(self, key, value, flags: int):
+        """
+        Append one record and its index entry.
+
+        Parameters
+        ----------
+        key : str or bytes
+            Record key.
+        value : any
+            Value to store, None for a deletion.
+        flags : int
+            Record flags.
+        """
+        raw, kind = _key_bytes(key)
+        flags |= kind
+        head = b"l" + encode(flags) + encode(raw)
+        body = b"" if value is None else encode(value)
+        offset = self._data.tell() + len(head)
+        self._data.write(head + body + b"e")
+        self._idx.write(self._entry(key, offset, len(body), flags))
+        self._apply(key, offset, len(body), flags)
+
+    def put(self, key, value):
+        """
+        Store a value under `key`, replacing any previous value.
+
+        Parameters
+        ----------
+        key : str or bytes
+            Record key.
+        value : any
+            Bencodable value.
+        """
+        if value is None:
+            raise TypeError(value)
+        self._append(key, value, 0)
+
+    def delete(self, key):
+        """
+        Remove `key` from the log.
+
+        Parameters
+        ----------
+        key : str or bytes
+            Record key.
+
+        Raises
+        ------
+        KeyError
+            The key is not in the log.
+        """
+        if key not in self._index:
+            raise KeyError(key)
+        self._append(key, None, DELETED)
+
+    def flush(self):
+        """Write buffered records to disk, syncing them if `sync` is set."""
+        self._data.flush()
+        self._idx.flush()
+        if self.sync:
+            os.fsync(self._data.fileno())
+            os.fsync(self._idx.fileno())
+
+    # -- reading ------------------------------------------------------------
+
+    def _remap(self):
+        """Map the data file again after it has grown."""
+        self._data.flush()
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(
+            self._data.fileno(), 0, access=mmap.ACCESS_READ
+        )
+        self._mapped = len(self._map)
+
+    def raw(self, key) -> bytes:
+        """
+        Return the encoded bytes of a record.
+
+        Parameters
+        ----------
+        key : str or bytes
+            Record key.
+
+        Raises
+        ------
+        KeyError
+            The key is not in the log.
+
+        Returns
+        -------
+        bytes
+            Bencoded value.
+        """
+        offset, length = self._index[key]
+        if offset + length > self._mapped:
+            self._remap()
+        return self._map[offset:offset + length]
+
+    def get(self, key, default=None):
+        """
+        Return the value stored under `key`.
+
+        Parameters
+        ----------
+        key : str or bytes
+            Record key.
+        default : any, optional
+            Returned when the key is not in the log.
+
+        Returns
+        -------
+        any
+            Decoded value.
+        """
+        if key not in self._index:
+            return default
+        return decode(self.raw(key))[0]
+
+    def __getitem__(self, key):
+        """Return the value stored under `key`."""
+        return decode(self.raw(key))[0]
+
+    def __setitem__(self, key, value):
+        """Store a value under `key`."""
+        self.put(key, value)
+
+    def __delitem__(self, key):
+        """Remove `key` from the log."""
+        self.delete(key)
+
+    def __contains__(self, key) -> bool:
+        """Return True if `key` is in the log."""
+        return key in self._index
+
+    def __len__(self) -> int:
+        """Return the number of live keys."""
+        return len(self._index)
+
+    def __iter__(self):
+        """Iterate over the live keys."""
+        return iter(list(self._index))
+
+    def keys(self) -> list:
+        """Return the live keys."""
+        return list(self._index)
+
+    def items(self):
+        """
+        Iterate over live records in file order.
+
+        Yields
+        ------
+        tuple
+            `(key, value)` pairs.
+        """
+        entries = sorted(self._index.items(), key=lambda item: item[1])
+        for key, _ in entries:
+            yield key, self[key]
+
+    # -- maintenance --------------------------------------------------------
+
+    def compact(self):
+        """
+        Rewrite the data file with only the live records.
+
+        The new files are written under temporary names and renamed into
+        place. Index and data file share a random generation id, so a
+        crash between the two renames is detected and the index rebuilt.
+        """
+        generation = os.urandom(16)
+        tmp_data, tmp_index = self.path + ".tmp", self.index_path + ".tmp"
+        self._create(tmp_data, generation)
+        with open(tmp_data, "ab") as data, open(tmp_index, "wb") as index:
+            index.write(HEADER.pack(INDEX_MAGIC, FORMAT_VERSION, generation))
+            for key, _ in sorted(self._index.items(), key=lambda i: i[1]):
+                raw, flags = _key_bytes(key)
+                head = b"l" + encode(flags) + encode(raw)
+                body = self.raw(key)
+                offset = data.tell() + len(head)
+                data.write(head)
+                data.write(body)
+                data.write(b"e")
+                index.write(self._entry(key, offset, len(body), flags))
+            for _fd in (data, index):
+                _fd.flush()
+                os.fsync(_fd.fileno())
+        self.close()
+        os.replace(tmp_data, self.path)
+        os.replace(tmp_index, self.index_path)
+        self._index, self.stale = {}, 0
+        self._open()
+
+    def close(self):
+        """Flush and close the log."""
+        if self._map is not None:
+            self._map.close()
+            self._map, self._mapped = None, 0
+        if not self._data.closed:
+            self.flush()
+            self._data.close()
+            self._idx.close()
+
+    def __enter__(self):
+        """Return the log."""
+        return self
+
+    def __exit__(self, *_):
+        """Close the log."""
+        self.close()
@@ -0,0 +1,756 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""
+KRPC style request/response messaging over TCP and UDP with asyncio.
+
+Every message is a bencoded dictionary. Queries carry a transaction id
+`t`, `"y": "q"`, the method name `q` and arguments `a`. Replies repeat
+`t` with either `"y": "r"` and the result `r`, or `"y": "e"` and an
+`[code, message]` list `e`. Transaction ids let many requests share one
+connection at the same time, and replies may arrive in any order.
+
+    >>> server = RPCServer({"ping": lambda args, peer: {"id": args["id"]}})
+    >>> host, port = await server.start_tcp("127.0.0.1", 0)
+    >>> async with ClientPool() as pool:
+    ...     await pool.request((host, port), "ping", {"id": b"abc"})
+    ... {'id': 'abc'}
+
+Classes
+-------
+* ClientPool
+* RPCClient
+* RPCServer
+* UDPClient
+"""
+
+import asyncio
+import inspect
+import ipaddress
+import itertools
+import socket
+
+from pyben.api import dumps, loads
+from pyben.exceptions import DecodeError, EncodeError, RPCError
+from pyben.stream import IncrementalDecoder
+
+GENERIC_ERROR = 201
+SERVER_ERROR = 202
+PROTOCOL_ERROR = 203
+METHOD_UNKNOWN = 204
+
+MAX_MESSAGE = 1 << 20
+
+
+def _tid_key(tid) -> bytes:
+    """
+    Normalize a transaction id decoded as `str` or `bytes`.
+
+    Parameters
+    ----------
+    tid : str or bytes
+        Transaction id.
+
+    Returns
+    -------
+    bytes
+        Transaction id bytes.
+    """
+    if isinstance(tid, str):
+        return tid.encode("utf-8")
+    return bytes(tid)
+
+
+def _server_error(reply: dict) -> dict:
+    """
+    Replace a reply whose result could not be encoded with an error.
+
+    Parameters
+    ----------
+    reply : dict
+        Reply message.
+
+    Returns
+    -------
+    dict
+        Server error reply for the same transaction.
+    """
+    return {"t": reply["t"], "y": "e", "e": [SERVER_ERROR, "Server Error"]}
+
+
+class _MessageProtocol(asyncio.Protocol):
+    """Protocol framing bencoded messages on a stream transport."""
+
+    def __init__(self, on_message, on_lost=None, max_size=MAX_MESSAGE):
+        """
+        Construct the protocol.
+
+        Parameters
+        ----------
+        on_message : callable
+            Called with each decoded message and this protocol.
+        on_lost : callable, optional
+            Called with the exception, if any, when the connection closes.
+        max_size : int, optional
+            Largest accepted message in bytes.
+        """
+        self.on_message = on_message
+        self.on_lost = on_lost
+        self.decoder = IncrementalDecoder(max_size)
+        self.transport = None
+        self.peer = None
+
+    def connection_made(self, transport):
+        """Store the transport of a new connection."""
+        self.transport = transport
+        self.peer = transport.get_extra_info("peername")
+
+    def data_received(self, data):
+        """Decode every complete message received so far."""
+        self.decoder.feed(data)
+        try:
+            for message in self.decoder:
+                self.on_message(message, self)
+        except (DecodeError, ValueError, IndexError, AttributeError):
+            self.send({"y": "e", "e": [PROTOCOL_ERROR, "Protocol Error"]})
+            self.transport.close()
+
+    def connection_lost(self, exc):
+        """Notify the owner that the connection closed."""
+        if self.on_lost is not None:
+            self.on_lost(exc)
+
+    def send(self, message: dict):
+        """
+        Encode a message and write it to the transport.
+
+        Parameters
+        ----------
+        message : dict
+            Message to send.
+        """
+        if not self.transport.is_closing():
+            self.transport.write(dumps(message))
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    """Protocol decoding one bencoded message per datagram."""
+
+    def __init__(self, on_message):
+        """
+        Construct the protocol.
+
+        Parameters
+        ----------
+        on_message : callable
+            Called with each decoded message and the sender address.
+        """
+        self.on_message = on_message
+        self.transport = None
+
+    def connection_made(self, transport):
+        """Store the datagram transport."""
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        """Decode a datagram, ignoring malformed ones."""
+        try:
+            message = loads(data)
+        except (DecodeError, ValueError, IndexError, AttributeError):
+            return
+        self.on_message(message, addr)
+
+    def send(self, message: dict, addr):
+        """
+        Encode a message and send it to `addr`.
+
+        Parameters
+        ----------
+        message : dict
+            Message to send.
+        addr : tuple
+            Destination address.
+        """
+        self.transport.sendto(dumps(message), addr)
+
+
+class RPCServer:
+    """Server answering KRPC style queries over TCP and UDP."""
+
+    def __init__(self, handlers=None, max_size=MAX_MESSAGE):
+        """
+        Construct the RPCServer.
+
+        Handlers are called with the query arguments and the peer
+        address and return the result, either directly or as a
+        coroutine. Raising `RPCError` sends an error reply.
+
+        Parameters
+        ----------
+        handlers : dict, optional
+            Mapping of method name to handler.
+        max_size : int, optional
+            Largest accepted message in bytes.
+        """
+        self.handlers = dict(handlers or {})
+        self.max_size = max_size
+        self._servers = []
+        self._tasks = set()
+
+    def route(self, name: str):
+        """
+        Register a handler with a decorator.
+
+        Parameters
+        ----------
+        name : str
+            Method name.
+
+        Returns
+        -------
+        callable
+            Decorator registering the handler.
+        """
+
+        def register(func):
+            self.handlers[name] = func
+            return func
+
+        return register
+
+    async def dispatch(self, message: dict, peer) -> dict:
+        """
+        Run the handler for a query and build its reply.
+
+        Parameters
+        ----------
+        message : dict
+            Decoded query.
+        peer : tuple
+            Address of the sender.
+
+        Returns
+        -------
+        dict or None
+            Reply message, None if `message` is not a query.
+        """
+        if not isinstance(message, dict) or message.get("y") != "q":
+            return None
+        reply = {"t": message.get("t", b"")}
+        handler = self.handlers.get(message.get("q"))
+        try:
+            if handler is None:
+                raise RPCError(METHOD_UNKNOWN, "Method Unknown")
+            result = handler(message.get("a", {}), peer)
+            if inspect.isawaitable(result):
+                result = await result
+            reply.update(y="r", r=result)
+        except RPCError as err:
+            reply.update(y="e", e=[err.code, err.message])
+        except Exception:  # pylint: disable=broad-except
+            reply.update(y="e", e=[SERVER_ERROR, "Server Error"])
+        return reply
+
+    def _spawn(self, coro):
+        """Run a coroutine as a task that is kept until it finishes."""
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _reply_stream(self, message, proto):
+        """Dispatch a query received on a stream connection."""
+        reply = await self.dispatch(message, proto.peer)
+        if reply is not None:
+            try:
+                proto.send(reply)
+            except EncodeError:
+                proto.send(_server_error(reply))
+
+    async def _reply_datagram(self, message, addr, proto):
+        """Dispatch a query received as a datagram."""
+        reply = await self.dispatch(message, addr)
+        if reply is not None:
+            try:
+                proto.send(reply, addr)
+            except EncodeError:
+                proto.send(_server_error(reply), addr)
+
+    async def start_tcp(self, host="127.0.0.1", port=0) -> tuple:
+        """
+        Listen for TCP connections.
+
+        Parameters
+        ----------
+        host : str, optional
+            Address to bind.
+        port : int, optional
+            Port to bind, 0 picks a free port.
+
+        Returns
+        -------
+        tuple
+            Bound address.
+        """
+        loop = asyncio.get_running_loop()
+
+        def factory():
+            return _MessageProtocol(
+                lambda msg, proto: self._spawn(self._reply_stream(msg, proto)),
+                max_size=self.max_size,
+            )
+
+        server = await loop.create_server(factory, host, port)
+        self._servers.append(server)
+        return server.sockets[0].getsockname()[:2]
+
+    async def start_udp(self, host="127.0.0.1", port=0) -> tuple:
+        """
+        Listen for UDP datagrams.
+
+        Parameters
+        ----------
+        host : str, optional
+            Address to bind.
+        port : int, optional
+            Port to bind, 0 picks a free port.
+
+        Returns
+        -------
+        tuple
+            Bound address.
+        """
+        loop = asyncio.get_running_loop()
+        proto = _DatagramProtocol(None)
+        proto.on_message = lambda msg, addr: self._spawn(
+            self._reply_datagram(msg, addr, proto)
+        )
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: proto, local_addr=(host, port)
+        )
+        self._servers.append(transport)
+        return transport.get_extra_info("sockname")[:2]
+
+    async def close(self):
+        """Stop listening and wait for running handlers."""
+        for server in self._servers:
+            server.close()
+            if hasattr(server, "wait_closed"):
+                await server.wait_closed()
+        self._servers = []
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def __aenter__(self):
+        """Use the server as an async context manager."""
+        return self
+
+    async def __aexit__(self, *_):
+        """Close the server."""
+        await self.close()
+
+
+class _Router:
+    """Match replies to outstanding requests by transaction id."""
+
+    def __init__(self):
+        """Construct the router."""
+        self.pending = {}
+        self._ids = itertools.count()
+
+    def open(self, key=None) -> tuple:
+        """
+        Register a new transaction.
+
+        Parameters
+        ----------
+        key : any, optional
+            Extra routing key, e.g. the destination address.
+
+        Returns
+        -------
+        tuple
+            Transaction id bytes and the future receiving the reply.
+        """
+        tid = (next(self._ids) & 0xFFFFFFFF).to_bytes(4, "big")
+        future = asyncio.get_running_loop().create_future()
+        self.pending[(key, tid)] = future
+        return tid, future
+
+    def resolve(self, message: dict, key=None):
+        """
+        Complete the future of the transaction a reply belongs to.
+
+        Parameters
+        ----------
+        message : dict
+            Decoded reply.
+        key : any, optional
+            Extra routing key, e.g. the source address.
+        """
+        if not isinstance(message, dict) or "t" not in message:
+            return
+        future = self.pending.pop((key, _tid_key(message["t"])), None)
+        if future is None or future.done():
+            return
+        if message.get("y") == "r":
+            future.set_result(message.get("r"))
+        elif message.get("y") == "e":
+            error = message.get("e") or [GENERIC_ERROR, "Generic Error"]
+            future.set_exception(RPCError(*error[:2]))
+
+    def cancel(self, tid, key=None):
+        """Forget a transaction, e.g. after a timeout."""
+        self.pending.pop((key, tid), None)
+
+    def fail(self, exc):
+        """Fail every outstanding transaction with `exc`."""
+        pending, self.pending = self.pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(exc)
+
+    def __len__(self) -> int:
+        """Return the number of outstanding transactions."""
+        return len(self.pending)
+
+
+async def _wait(router, tid, future, timeout, key=None):
+    """
+    Wait for a reply, dropping the transaction on timeout.
+
+    Parameters
+    ----------
+    router : _Router
+        Router the transaction belongs to.
+    tid : bytes
+        Transaction id.
+    future : asyncio.Future
+        Future receiving the reply.
+    timeout : float
+        Seconds to wait, None waits forever.
+    key : any, optional
+        Extra routing key.
+
+    Returns
+    -------
+    any
+        Result of the request.
+    """
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        router.cancel(tid, key)
+        raise
+
+
+class RPCClient:
+    """Pipelined TCP client for one server."""
+
+    def __init__(self, host, port, timeout=10.0, max_size=MAX_MESSAGE):
+        """
+        Construct the RPCClient.
+
+        Parameters
+        ----------
+        host : str
+            Server host.
+        port : int
+            Server port.
+        timeout : float, optional
+            Default seconds to wait for each reply.
+        max_size : int, optional
+            Largest accepted message in bytes.
+        """
+        self.address = (host, port)
+        self.timeout = timeout
+        self.max_size = max_size
+        self.router = _Router()
+        self._proto = None
+        self._lock = None
+
+    @property
+    def closed(self) -> bool:
+        """Return True if the connection is not usable."""
+        return self._proto is None or self._proto.transport.is_closing()
+
+    async def connect(self):
+        """
+        Open the connection unless it is already open.
+
+        Concurrent callers wait for the same connection to be opened.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self.closed:
+                loop = asyncio.get_running_loop()
+                _, self._proto = await loop.create_connection(
+                    lambda: _MessageProtocol(
+                        lambda msg, _: self.router.resolve(msg),
+                        self._connection_lost,
+                        self.max_size,
+                    ),
+                    *self.address,
+                )
+        return self
+
+    def _connection_lost(self, exc):
+        """Fail outstanding requests when the connection drops."""
+        self.router.fail(exc or ConnectionError("Connection closed"))
+
+    async def request(self, method: str, args=None, timeout=None):
+        """
+        Send a query and wait for its reply.
+
+        Parameters
+        ----------
+        method : str
+            Method name.
+        args : dict, optional
+            Query arguments.
+        timeout : float, optional
+            Seconds to wait, defaults to the client timeout.
+
+        Raises
+        ------
+        RPCError
+            The server answered with an error.
+
+        Returns
+        -------
+        any
+            Result of the query.
+        """
+        if self.closed:
+            await self.connect()
+        tid, future = self.router.open()
+        self._proto.send({"t": tid, "y": "q", "q": method, "a": args or {}})
+        timeout = self.timeout if timeout is None else timeout
+        return await _wait(self.router, tid, future, timeout)
+
+    async def close(self):
+        """Close the connection."""
+        if self._proto is not None:
+            self._proto.transport.close()
+            self._proto = None
+
+    async def __aenter__(self):
+        """Connect as an async context manager."""
+        return await self.connect()
+
+    async def __aexit__(self, *_):
+        """Close the connection."""
+        await self.close()
+
+
+class UDPClient:
+    """Client sending KRPC style queries as datagrams from one socket."""
+
+    def __init__(self, local_addr=("0.0.0.0", 0), timeout=10.0):
+        """
+        Construct the UDPClient.
+
+        Parameters
+        ----------
+        local_addr : tuple, optional
+            Address to bind the socket to.
+        timeout : float, optional
+            Default seconds to wait for each reply.
+        """
+        self.local_addr = local_addr
+        self.timeout = timeout
+        self.router = _Router()
+        self._proto = None
+        self._lock = None
+
+    async def connect(self):
+        """
+        Open the datagram socket unless it is already open.
+
+        Concurrent callers wait for the same socket to be opened.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._proto is None:
+                loop = asyncio.get_running_loop()
+                _, self._proto = await loop.create_datagram_endpoint(
+                    lambda: _DatagramProtocol(
+                        lambda msg, addr: self.router.resolve(msg, addr[:2])
+                    ),
+                    local_addr=self.local_addr,
+                )
+        return self
+
+    async def _resolve(self, addr) -> tuple:
+        """
+        Return `addr` in the form replies from it are reported.
+
+        Parameters
+        ----------
+        addr : tuple
+            Destination `(host, port)`, host may be a name.
+
+        Returns
+        -------
+        tuple
+            Numeric `(host, port)`.
+        """
+        host, port = addr[:2]
+        try:
+            return str(ipaddress.ip_address(host)), port
+        except ValueError:
+            pass
+        family = self._proto.transport.get_extra_info("socket").family
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            host, port, family=family, type=socket.SOCK_DGRAM
+        )
+        return infos[0][4][:2]
+
+    async def request(self, addr, method: str, args=None, timeout=None):
+        """
+        Send a query to `addr` and wait for its reply.
+
+        Parameters
+        ----------
+        addr : tuple
+            Destination `(host, port)`, host names are resolved first.
+        method : str
+            Method name.
+        args : dict, optional
+            Query arguments.
+        timeout : float, optional
+            Seconds to wait, defaults to the client timeout.
+
+        Raises
+        ------
+        RPCError
+            The server answered with an error.
+
+        Returns
+        -------
+        any
+            Result of the query.
+        """
+        if self._proto is None:
+            await self.connect()
+        addr = await self._resolve(addr)
+        tid, future = self.router.open(addr)
+        message = {"t": tid, "y": "q", "q": method, "a": args or {}}
+        self._proto.send(message, addr)
+        timeout = self.timeout if timeout is None else timeout
+        return await _wait(self.router, tid, future, timeout, addr)
+
+    async def close(self):
+        """Close the socket."""
+        if self._proto is not None:
+            self._proto.transport.close()
+            self._proto = None
+        self.router.fail(ConnectionError("Client closed"))
+
+    async def __aenter__(self):
+        """Open the socket as an async context manager."""
+        return await self.connect()
+
+    async def __aexit__(self, *_):
+        """Close the socket."""
+        await self.close()
+
+
+class ClientPool:
+    """Pool of reusable pipelined TCP connections keyed by address."""
+
+    def __init__(self, size=1, **kwargs):
+        """
+        Construct the ClientPool.
+
+        Parameters
+        ----------
+        size : int, optional
+            Maximum connections opened to each address.
+        **kwargs : dict
+            Keyword arguments passed to `RPCClient`.
+        """
+        self.size = size
+        self.kwargs = kwargs
+        self.clients = {}
+        self._locks = {}
+
+    async def acquire(self, addr) -> RPCClient:
+        """
+        Return the least busy open connection to `addr`.
+
+        A new connection is only opened if every existing connection has
+        outstanding requests and the pool is not full. Connecting to one
+        address does not hold up callers for other addresses.
+
+        Parameters
+        ----------
+        addr : tuple
+            Server `(host, port)`.
+
+        Returns
+        -------
+        RPCClient
+            Connected client.
+        """
+        addr = tuple(addr[:2])
+        lock = self._locks.get(addr)
+        if lock is None:
+            lock = self._locks[addr] = asyncio.Lock()
+        async with lock:
+            clients = [c for c in self.clients.get(addr, []) if not c.closed]
+            idle = min(clients, key=lambda c: len(c.router), default=None)
+            if idle is None or (len(idle.router) and len(clients) < self.size):
+                idle = await RPCClient(*addr, **self.kwargs).connect()
+                clients.append(idle)
+            self.clients[addr] = clients
+            return idle
+
+    async def request(self, addr, method: str, args=None, timeout=None):
+        """
+        Send a query over a pooled connection.
+
+        Parameters
+        ----------
+        addr : tuple
+            Server `(host, port)`.
+        method : str
+            Method name.
+        args : dict, optional
+            Query arguments.
+        timeout : float, optional
+            Seconds to wait for the reply.
+
+        Returns
+        -------
+        any
+            Result of the query.
+        """
+        client = await self.acquire(addr)
+        return await client.request(method, args, timeout)
+
+    async def close(self):
+        """Close every pooled connection."""
+        clients, self.clients = self.clients, {}
+        for group in clients.values():
+            for client in group:
+                await client.close()
+
+    async def __aenter__(self):
+        """Use the pool as an async context manager."""
+        return self
+
+    async def __aexit__(self, *_):
+        """Close the pool."""
+        await self.close()
@@ -0,0 +1,447 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""
+Decoders specialized for messages of a known shape.
+
+A schema is declared once with plain Python types and compiled into a
+parser for exactly that shape. Keys are matched as pre-encoded byte
+prefixes in canonical order and every value is parsed by code written
+for its declared type, so there is no dispatch on the input:
+
+    >>> announce = Schema({"interval": int, "peers": bytes,
+    ...                    "complete": Optional(int)})
+    >>> announce.loads(b"d8:completei5e8:intervali1800e5:peers0:e")
+    {'complete': 5, 'interval': 1800, 'peers': b''}
+
+Schemas are made of `int`, `str`, `bytes`, `ANY`, a one item list for a
+list of that item, and dicts of those, with `Optional` marking members
+that may be missing. Any input that does not match, including extra
+or unsorted keys, is decoded by the generic decoder instead. `bytes`
+members are always returned as bytes, the text strings of the generic
+decoder being encoded back where the schema declares them.
+
+Classes
+-------
+* Schema
+* Optional
+
+Constants
+---------
+* ANY
+* ANNOUNCE_RESPONSE
+* KRPC_PING
+* KRPC_GET_PEERS
+* KRPC_GET_PEERS_RESPONSE
+* KRPC_ANNOUNCE_PEER
+* TORRENT_INFO
+"""
+
+from pyben.core import decode, encode_str
+from pyben.exceptions import DecodeError
+
+ANY = type("Any", (), {"__repr__": lambda self: "ANY"})()
+
+
+class Optional:
+    """Marks a dict member that may be missing."""
+
+    __slots__ = ("spec",)
+
+    def __init__(self, spec):
+        """
+        Construct the Optional marker.
+
+        Parameters
+        ----------
+        spec : any
+            Schema of the member when present.
+        """
+        self.spec = spec
+
+    def __repr__(self) -> str:
+        """Return the marker as it is written in schemas."""
+        return f"Optional({self.spec!r})"
+
+
+class _Mismatch(Exception):
+    """Input does not have the shape of the schema."""
+
+
+CHECK_INT = (
+    "digits.isdigit() or digits[:1] == b'-' and digits[1:].isdigit()"
+)
+
+
+def _binary(value, spec):
+    """
+    Restore the `bytes` members of a value from the generic decoder.
+
+    Parameters
+    ----------
+    value : any
+        Value decoded without the schema.
+    spec : any
+        Schema of the value, members of another shape are left as is.
+
+    Returns
+    -------
+    any
+        `value` with text strings encoded where `spec` declares bytes.
+    """
+    if spec is bytes:
+        return value.encode("utf-8") if value.__class__ is str else value
+    if isinstance(spec, list) and len(spec) == 1:
+        if value.__class__ is list:
+            value[:] = [_binary(item, spec[0]) for item in value]
+    elif isinstance(spec, dict) and value.__class__ is dict:
+        for key, member in spec.items():
+            if isinstance(member, Optional):
+                member = member.spec
+            if key in value:
+                value[key] = _binary(value[key], member)
+    return value
+
+
+class _Compiler:
+    """Generate the source of a parser for one schema."""
+
+    def __init__(self):
+        """Construct the _Compiler."""
+        self.lines = ["def parse(bits, pos):", "    size = len(bits)"]
+        self.consts = {}
+        self.count = 0
+
+    def emit(self, depth: int, line: str):
+        """Add a line indented `depth` levels below the function body."""
+        self.lines.append("    " * (depth + 1) + line)
+
+    def const(self, value) -> str:
+        """Store a constant in the namespace and return its name."""
+        name = f"K{len(self.consts)}"
+        self.consts[name] = value
+        return name
+
+    def expect(self, depth: int, lead: bytes):
+        """Check and consume the leading byte of a container."""
+        self.emit(depth, f"if bits[pos] != {lead[0]}:")
+        self.emit(depth + 1, "raise _Mismatch")
+        self.emit(depth, "pos += 1")
+
+    def value(self, spec, dst: str, depth: int):
+        """
+        Emit code parsing one value of `spec` into `dst`.
+
+        Parameters
+        ----------
+        spec : any
+            Schema of the value.
+        dst : str
+            Assignment target in the generated code.
+        depth : int
+            Indentation level.
+        """
+        emit = self.emit
+        if spec is int:
+            emit(depth, "if bits[pos] != 105:")
+            emit(depth + 1, "raise _Mismatch")
+            emit(depth, "end = bits.index(b'e', pos)")
+            emit(depth, "digits = bits[pos + 1 : end]")
+            emit(depth, f"if not ({CHECK_INT}):")
+            emit(depth + 1, "raise _Mismatch")
+            emit(depth, f"{dst} = int(digits)")
+            emit(depth, "pos = end + 1")
+        elif spec is str or spec is bytes:
+            emit(depth, "colon = bits.find(b':', pos, pos + 32)")
+            emit(depth, "digits = bits[pos:colon]")
+            emit(depth, "if colon < 0 or not digits.isdigit():")
+            emit(depth + 1, "raise _Mismatch")
+            emit(depth, "pos = colon + 1 + int(digits)")
+            emit(depth, "if pos > size:")
+            emit(depth + 1, "raise _Mismatch")
+            decoded = ".decode('utf-8')" if spec is str else ""
+            emit(depth, f"{dst} = bits[colon + 1 : pos]{decoded}")
+        elif spec is ANY:
+            emit(depth, f"{dst}, pos = decode(bits, pos)")
+        elif isinstance(spec, list) and len(spec) == 1:
+            self.count += 1
+            items, item = f"l{self.count}", f"v{self.count}"
+            self.expect(depth, b"l")
+            emit(depth, f"{items} = []")
+            emit(depth, "while bits[pos] != 101:")
+            self.value(spec[0], item, depth + 1)
+            emit(depth + 1, f"{items}.append({item})")
+            emit(depth, "pos += 1")
+            emit(depth, f"{dst} = {items}")
+        elif isinstance(spec, dict):
+            self.members(spec, dst, depth)
+        else:
+            raise TypeError(spec)
+
+    def members(self, spec: dict, dst: str, depth: int):
+        """Emit code parsing a dict with the members of `spec`."""
+        self.count += 1
+        result = f"d{self.count}"
+        self.expect(depth, b"d")
+        self.emit(depth, f"{result} = {{}}")
+        for key in sorted(spec, key=lambda key: key.encode("utf-8")):
+            member, prefix = spec[key], encode_str(key)
+            optional = isinstance(member, Optional)
+            name = self.const(prefix)
+            self.emit(depth, f"if bits.startswith({name}, pos):")
+            self.emit(depth + 1, f"pos += {len(prefix)}")
+            if optional:
+                member = member.spec
+            self.value(member, f"{result}[{key!r}]", depth + 1)
+            if not optional:
+                self.emit(depth, "else:")
+                self.emit(depth + 1, "raise _Mismatch")
+        self.emit(depth, "if bits[pos] != 101:")
+        self.emit(depth + 1, "raise _Mismatch")
+        self.emit(depth, "pos += 1")
+        self.emit(depth, f"{dst} = {result}")
+
+    def compile(self, spec):
+        """
+        Compile the parser for `spec`.
+
+        Returns
+        -------
+        tuple
+            `(parse, source)`
+        """
+        self.value(spec, "result", 0)
+        self.emit(0, "return result, pos")
+        source = "\n".join(self.lines) + "\n"
+        namespace = {"_Mismatch": _Mismatch, "decode": decode}
+        namespace.update(self.consts)
+        # The source is built only from validated schema keys and names.
+        code = compile(source, "<pyben.schema>", "exec")
+        exec(code, namespace)  # pylint: disable=exec-used
+        return namespace["parse"], source
+
+
+class Schema:
+    """
+    Decoder compiled for one message shape.
+
+    `matched` and `fallbacks` count the inputs decoded by the specialized
+    parser and by the generic decoder.
+    """
+
+    def __init__(self, spec, name: str = None):
+        """
+        Compile a schema.
+
+        Parameters
+        ----------
+        spec : any
+            Shape of the messages, see the module documentation.
+        name : str, optional
+            Label used in `repr`.
+
+        Raises
+        ------
+        TypeError
+            `spec` contains an unsupported type.
+        """
+        self.spec = spec
+        self.name = name
+        self._parse, self.source = _Compiler().compile(spec)
+        self.matched = self.fallbacks = 0
+
+    def __repr__(self) -> str:
+        """Return the schema name or specification."""
+        return f"Schema({self.name or self.spec!r})"
+
+    def match(self, bits, pos: int = 0) -> tuple:
+        """
+        Decode a value that must have the shape of the schema.
+
+        Parameters
+        ----------
+        bits : bytes
+            Bencoded data.
+        pos : int, optional
+            Offset of the value.
+
+        Raises
+        ------
+        DecodeError
+            The value does not match the schema or is malformed.
+
+        Returns
+        -------
+        tuple
+            `(value, end)`
+        """
+        if bits.__class__ is not bytes:
+            bits = bytes(bits)
+        try:
+            return self._parse(bits, pos)
+        except (_Mismatch, IndexError, ValueError) as err:
+            raise DecodeError(bits[pos:pos + 32]) from err
+
+    def decode(self, bits, pos: int = 0) -> tuple:
+        """
+        Decode a value, using the generic decoder if it doesn't match.
+
+        The `bytes` members of the schema found in a fallback result are
+        returned as bytes as well.
+
+        Parameters
+        ----------
+        bits : bytes
+            Bencoded data.
+        pos : int, optional
+            Offset of the value.
+
+        Raises
+        ------
+        DecodeError
+            Malformed data.
+
+        Returns
+        -------
+        tuple
+            `(value, end)`
+        """
+        if bits.__class__ is not bytes:
+            bits = bytes(bits)
+        try:
+            result = self._parse(bits, pos)
+        except (_Mismatch, IndexError, ValueError):
+            self.fallbacks += 1
+            value, end = decode(bits, pos)
+            return _binary(value, self.spec), end
+        self.matched += 1
+        return result
+
+    def loads(self, bits):
+        """
+        Decode the first value of `bits`, see `decode`.
+
+        Parameters
+        ----------
+        bits : bytes
+            Bencoded data.
+
+        Returns
+        -------
+        any
+            Decoded value.
+        """
+        return self.decode(bits)[0]
+
+    def validate(self, bits) -> bool:
+        """
+        Check if `bits` holds a value matching the schema.
+
+        Parameters
+        ----------
+        bits : bytes
+            Bencoded data.
+
+        Returns
+        -------
+        bool
+            True if the specialized parser accepts the value.
+        """
+        try:
+            self.match(bits)
+        except DecodeError:
+            return False
+        return True
+
+
+ANNOUNCE_RESPONSE = Schema(
+    {
+        "complete": Optional(int),
+        "incomplete": Optional(int),
+        "interval": int,
+        "min interval": Optional(int),
+        "peers": bytes,
+        "peers6": Optional(bytes),
+    },
+    "announce response",
+)
+
+KRPC_PING = Schema(
+    {
+        "a": Optional({"id": bytes}),
+        "q": Optional(str),
+        "r": Optional({"id": bytes}),
+        "t": bytes,
+        "v": Optional(bytes),
+        "y": str,
+    },
+    "krpc ping",
+)
+
+KRPC_GET_PEERS = Schema(
+    {
+        "a": {"id": bytes, "info_hash": bytes},
+        "q": str,
+        "t": bytes,
+        "v": Optional(bytes),
+        "y": str,
+    },
+    "krpc get_peers",
+)
+
+KRPC_GET_PEERS_RESPONSE = Schema(
+    {
+        "ip": Optional(bytes),
+        "r": {
+            "id": bytes,
+            "nodes": Optional(bytes),
+            "nodes6": Optional(bytes),
+            "token": Optional(bytes),
+            "values": Optional([bytes]),
+        },
+        "t": bytes,
+        "v": Optional(bytes),
+        "y": str,
+    },
+    "krpc get_peers response",
+)
+
+KRPC_ANNOUNCE_PEER = Schema(
+    {
+        "a": {
+            "id": bytes,
+            "implied_port": Optional(int),
+            "info_hash": bytes,
+            "port": int,
+            "token": bytes,
+        },
+        "q": str,
+        "t": bytes,
+        "v": Optional(bytes),
+        "y": str,
+    },
+    "krpc announce_peer",
+)
+
+TORRENT_INFO = Schema(
+    {
+        "files": Optional([{"length": int, "path": [str]}]),
+        "length": Optional(int),
+        "name": str,
+        "piece length": int,
+        "pieces": bytes,
+        "private": Optional(int),
+        "source": Optional(str),
+    },
+    "torrent info",
+)
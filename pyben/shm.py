@@ -0,0 +1,357 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""
+Shared memory transport for decode results of worker processes.
+
+Byte strings in a decoded value are copied into one
+`multiprocessing.shared_memory` block and replaced by `(offset, length)`
+references, so only a small skeleton is pickled back to the parent:
+
+    >>> for path, meta in pyben.shm.load_many_shared(paths, workers=8):
+    ...     print(path, meta["info"]["name"])
+
+Shared memory needs Python 3.8 or later, it is imported on first use so
+the rest of the package still works on 3.7.
+
+Classes
+-------
+* SharedResult
+* SharedView
+
+Functions
+---------
+* share
+* load_many_shared
+"""
+
+from functools import partial
+
+from pyben.parallel import _load_chunk, imap_chunks
+
+MIN_SHARED = 64
+
+
+def _shared_memory(*args, **kwargs):
+    """Open or create a `multiprocessing.shared_memory` block."""
+    from multiprocessing import shared_memory
+
+    return shared_memory.SharedMemory(*args, **kwargs)
+
+
+def _strip(value, payloads: list, offset: int, threshold: int):
+    """
+    Replace large byte strings in `value` with `(offset, length)` tuples.
+
+    Decoded data never contains tuples, so they can mark references.
+
+    Parameters
+    ----------
+    value : any
+        Decoded data.
+    payloads : list
+        Byte strings moved out of the value, appended in offset order.
+    offset : int
+        Offset of the next payload.
+    threshold : int
+        Smallest byte string moved out of the value.
+
+    Returns
+    -------
+    tuple
+        `(skeleton, offset)`
+    """
+    if isinstance(value, (bytes, bytearray)) and len(value) >= threshold:
+        payloads.append(value)
+        return (offset, len(value)), offset + len(value)
+    if isinstance(value, dict):
+        skeleton = {}
+        for key, item in value.items():
+            skeleton[key], offset = _strip(item, payloads, offset, threshold)
+        return skeleton, offset
+    if isinstance(value, list):
+        skeleton = []
+        for item in value:
+            item, offset = _strip(item, payloads, offset, threshold)
+            skeleton.append(item)
+        return skeleton, offset
+    return value, offset
+
+
+def _fill(skeleton, buf, convert):
+    """
+    Rebuild a value from its skeleton and the shared buffer.
+
+    Parameters
+    ----------
+    skeleton : any
+        Value with `(offset, length)` references.
+    buf : memoryview
+        Shared memory buffer.
+    convert : callable
+        Applied to every referenced slice, e.g. `bytes`.
+
+    Returns
+    -------
+    any
+        Rebuilt value.
+    """
+    if isinstance(skeleton, tuple):
+        start, length = skeleton
+        return convert(buf[start:start + length])
+    if isinstance(skeleton, dict):
+        return {key: _fill(val, buf, convert) for key, val in skeleton.items()}
+    if isinstance(skeleton, list):
+        return [_fill(val, buf, convert) for val in skeleton]
+    return skeleton
+
+
+class SharedResult:
+    """Picklable handle to a decoded value held in shared memory."""
+
+    __slots__ = ("name", "size", "skeleton")
+
+    def __init__(self, name, size, skeleton):
+        """
+        Construct the SharedResult.
+
+        Parameters
+        ----------
+        name : str or None
+            Shared memory block name, None when nothing was shared.
+        size : int
+            Bytes used in the block.
+        skeleton : any
+            Value with byte strings replaced by references.
+        """
+        self.name = name
+        self.size = size
+        self.skeleton = skeleton
+
+    def __reduce__(self):
+        """Pickle the handle, never the shared bytes."""
+        return SharedResult, (self.name, self.size, self.skeleton)
+
+    def load(self):
+        """
+        Copy the value out of shared memory and release the block.
+
+        Returns
+        -------
+        any
+            The decoded value.
+        """
+        if self.name is None:
+            return self.skeleton
+        shm = _shared_memory(self.name)
+        try:
+            with shm.buf[:self.size] as buf:
+                return _fill(self.skeleton, buf, bytes)
+        finally:
+            shm.close()
+            shm.unlink()
+            self.name = None
+
+    def view(self):
+        """
+        Attach to the block without copying the byte strings.
+
+        Returns
+        -------
+        SharedView
+            Context manager whose `value` holds memoryviews.
+        """
+        return SharedView(self)
+
+    def discard(self):
+        """Release the block without reading it."""
+        if self.name is not None:
+            shm = _shared_memory(self.name)
+            shm.close()
+            shm.unlink()
+            self.name = None
+
+
+class SharedView:
+    """Zero-copy view of a `SharedResult`, released on close."""
+
+    def __init__(self, result: SharedResult):
+        """
+        Construct the SharedView.
+
+        Parameters
+        ----------
+        result : SharedResult
+            Handle to view. The block is released when the view closes.
+        """
+        self._result = result
+        self._views = []
+        self._shm = None
+        if result.name is None:
+            self.value = result.skeleton
+            return
+        self._shm = _shared_memory(result.name)
+        self.value = _fill(result.skeleton, self._shm.buf, self._slice)
+
+    def _slice(self, view):
+        """Keep track of exported slices so they can be released."""
+        self._views.append(view)
+        return view
+
+    def close(self):
+        """Release every view and the shared block."""
+        for view in self._views:
+            view.release()
+        self._views.clear()
+        self.value = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+            self._result.name = None
+
+    def __enter__(self):
+        """Return the view."""
+        return self
+
+    def __exit__(self, *_):
+        """Close the view."""
+        self.close()
+
+
+def share(value, threshold: int = MIN_SHARED) -> SharedResult:
+    """
+    Move the byte strings of a decoded value into shared memory.
+
+    The block is released by whoever calls `load`, `view` or `discard`
+    on the result, normally the parent process. Blocks that are never
+    released are removed by the resource tracker when the program exits.
+
+    Parameters
+    ----------
+    value : any
+        Decoded data.
+    threshold : int, optional
+        Smallest byte string moved into shared memory.
+
+    Returns
+    -------
+    SharedResult
+        Picklable handle to the value.
+    """
+    payloads = []
+    skeleton, size = _strip(value, payloads, 0, threshold)
+    if not size:
+        return SharedResult(None, 0, value)
+    return _to_block(skeleton, payloads, size)
+
+
+def _to_block(skeleton, payloads: list, size: int) -> SharedResult:
+    """
+    Copy stripped byte strings into a new shared memory block.
+
+    Parameters
+    ----------
+    skeleton : any
+        Value returned by `_strip`.
+    payloads : list
+        Byte strings collected by `_strip`.
+    size : int
+        Total length of the payloads.
+
+    Returns
+    -------
+    SharedResult
+        Handle to the block.
+    """
+    shm = _shared_memory(create=True, size=size)
+    try:
+        offset = 0
+        for payload in payloads:
+            shm.buf[offset:offset + len(payload)] = payload
+            offset += len(payload)
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    shm.close()
+    return SharedResult(shm.name, size, skeleton)
+
+
+def _share_chunk(paths: list, threshold: int = MIN_SHARED) -> list:
+    """
+    Decode a chunk of paths, sharing the results in a single block.
+
+    Parameters
+    ----------
+    paths : list
+        Paths to decode.
+    threshold : int, optional
+        Passed to `share`.
+
+    Returns
+    -------
+    list
+        One `SharedResult` of `[path, result_or_exception]` pairs.
+    """
+    # Pairs are stripped one by one and kept as lists, since `_strip`
+    # marks references with tuples and doesn't descend into them.
+    payloads, size, skeleton = [], 0, []
+    for path, result in _load_chunk(paths):
+        result, size = _strip(result, payloads, size, threshold)
+        skeleton.append([path, result])
+    if not size:
+        return [SharedResult(None, 0, skeleton)]
+    return [_to_block(skeleton, payloads, size)]
+
+
+def load_many_shared(paths, workers=None, executor="process", **kwargs):
+    """
+    Decode files in worker processes, returning results by shared memory.
+
+    Each chunk of results travels in one shared block, so the cost of
+    creating blocks is amortized over `chunksize` files.
+
+    Parameters
+    ----------
+    paths : iterable
+        Paths to decode.
+    workers : int, optional
+        Number of workers, defaults to `os.cpu_count()`.
+    executor : str or Executor, optional
+        "process", "thread" or an existing `concurrent.futures.Executor`.
+    **kwargs : dict
+        `threshold` passed to `share`, plus `ordered`, `chunksize` and
+        `backlog`, see `pyben.parallel.imap_chunks`.
+
+    Yields
+    ------
+    tuple
+        `(path, result_or_exception)` for every path.
+    """
+    threshold = kwargs.pop("threshold", MIN_SHARED)
+    # Forked workers inherit a running tracker instead of starting their
+    # own, so blocks unlinked by the parent are not reported as leaked.
+    from multiprocessing import resource_tracker
+
+    resource_tracker.ensure_running()
+    results = imap_chunks(
+        partial(_share_chunk, threshold=threshold),
+        paths,
+        workers=workers,
+        executor=executor,
+        **kwargs,
+    )
+    for result in results:
+        for path, value in result.load():
+            yield path, value
@@ -0,0 +1,442 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""
+Output sinks used by the encoder.
+
+Sinks are objects with a `write` method. Open files, sockets wrapped by
+`BufferList`, `HashSink` and `TeeSink` can all be combined, so a single
+encode pass can write a torrent file and hash its `info` dictionary.
+
+Classes
+-------
+* BufferList
+* HashSink
+* TeeSink
+
+Functions
+---------
+* encode_to
+* writev
+"""
+
+import hashlib
+import os
+
+from pyben.bencode import benencode_into
+from pyben.spans import SPAN_TYPES, encode_spans
+
+COALESCE_THRESHOLD = 8192
+
+try:
+    IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, ValueError, OSError):  # pragma: nocover
+    IOV_MAX = 1024
+
+
+class BufferList:
+    """
+    Collect encoded output as a list of buffer references.
+
+    Fragments smaller than `threshold` are coalesced into a single
+    bytearray, larger ones are stored by reference and never copied.
+    """
+
+    def __init__(self, threshold: int = COALESCE_THRESHOLD):
+        """
+        Construct the BufferList.
+
+        Parameters
+        ----------
+        threshold : int, optional
+            Minimum size of a fragment kept by reference.
+        """
+        self.threshold = threshold
+        self.buffers = []
+        self._pending = bytearray()
+
+    def write(self, data) -> int:
+        """
+        Append a fragment to the buffer list.
+
+        Parameters
+        ----------
+        data : bytes
+            Encoded fragment.
+
+        Returns
+        -------
+        int
+            Number of bytes written.
+        """
+        size = len(data)
+        if size >= self.threshold:
+            self._coalesce()
+            self.buffers.append(data)
+        else:
+            self._pending += data
+        return size
+
+    def _coalesce(self):
+        """Move pending small fragments into the buffer list."""
+        if self._pending:
+            self.buffers.append(self._pending)
+            self._pending = bytearray()
+
+    def getbuffers(self) -> list:
+        """
+        Return the collected buffers.
+
+        Returns
+        -------
+        list
+            Buffers in output order.
+        """
+        self._coalesce()
+        return self.buffers
+
+    def getvalue(self) -> bytes:
+        """
+        Join the collected buffers into a single bytes object.
+
+        Returns
+        -------
+        bytes
+            Encoded data.
+        """
+        return b"".join(self.getbuffers())
+
+    def writeto(self, target) -> int:
+        """
+        Flush the collected buffers to a file, socket or file-like.
+
+        Parameters
+        ----------
+        target : any
+            Socket, file object, file descriptor or object with `write`.
+
+        Returns
+        -------
+        int
+            Number of bytes written.
+        """
+        return writev(target, self.getbuffers())
+
+
+def _send_all(send, buffers: list) -> int:
+    """
+    Call a vectored `send` until every buffer has been written.
+
+    Parameters
+    ----------
+    send : callable
+        `os.writev` or `socket.sendmsg` like callable.
+    buffers : list
+        Buffers to write.
+
+    Returns
+    -------
+    int
+        Number of bytes written.
+    """
+    views = [memoryview(buf).cast("B") for buf in buffers]
+    total, index = 0, 0
+    while index < len(views):
+        sent = send(views[index:index + IOV_MAX])
+        total += sent
+        while index < len(views) and sent >= len(views[index]):
+            sent -= len(views[index])
+            index += 1
+        if sent:
+            views[index] = views[index][sent:]
+    return total
+
+
+def writev(target, buffers: list) -> int:
+    """
+    Write a list of buffers with a single vectored system call.
+
+    Sockets use `socket.sendmsg`, objects backed by a file descriptor use
+    `os.writev`, anything else falls back to one `write` per buffer.
+
+    Parameters
+    ----------
+    target : any
+        Socket, file object, file descriptor or object with `write`.
+    buffers : list
+        Buffers to write.
+
+    Returns
+    -------
+    int
+        Number of bytes written.
+    """
+    if hasattr(target, "sendmsg"):
+        return _send_all(target.sendmsg, buffers)
+
+    if isinstance(target, int):
+        return _send_all(lambda bufs: os.writev(target, bufs), buffers)
+
+    try:
+        fileno = target.fileno()
+    except (AttributeError, OSError, ValueError):
+        fileno = None
+
+    if fileno is None or not hasattr(os, "writev"):
+        total = 0
+        for buf in buffers:
+            target.write(buf)
+            total += len(buf)
+        return total
+
+    if hasattr(target, "flush"):
+        target.flush()
+    total = _send_all(lambda bufs: os.writev(fileno, bufs), buffers)
+    if hasattr(target, "seekable") and target.seekable():
+        target.seek(os.lseek(fileno, 0, os.SEEK_CUR))
+    return total
+
+
+class HashSink:
+    """Sink that feeds every fragment to one or more hashlib objects."""
+
+    def __init__(self, *algorithms):
+        """
+        Construct the HashSink.
+
+        Parameters
+        ----------
+        *algorithms : str or hashlib object
+            Algorithm names passed to `hashlib.new`, or hash objects.
+        """
+        algorithms = algorithms or ("sha1",)
+        self.hashers = {}
+        for algorithm in algorithms:
+            if isinstance(algorithm, str):
+                algorithm = hashlib.new(algorithm)
+            self.hashers[algorithm.name] = algorithm
+
+    def write(self, data) -> int:
+        """
+        Update every hash object with `data`.
+
+        Parameters
+        ----------
+        data : bytes
+            Encoded fragment.
+
+        Returns
+        -------
+        int
+            Number of bytes written.
+        """
+        for hasher in self.hashers.values():
+            hasher.update(data)
+        return len(data)
+
+    def digests(self) -> dict:
+        """
+        Return the digest of each hash object.
+
+        Returns
+        -------
+        dict
+            Mapping of algorithm name to digest bytes.
+        """
+        return {name: h.digest() for name, h in self.hashers.items()}
+
+    def hexdigests(self) -> dict:
+        """
+        Return the hex digest of each hash object.
+
+        Returns
+        -------
+        dict
+            Mapping of algorithm name to hex digest.
+        """
+        return {name: h.hexdigest() for name, h in self.hashers.items()}
+
+
+class TeeSink:
+    """Sink that fans every fragment out to several other sinks."""
+
+    def __init__(self, *sinks):
+        """
+        Construct the TeeSink.
+
+        Parameters
+        ----------
+        *sinks : any
+            Objects with a `write` method.
+        """
+        self.sinks = sinks
+
+    def write(self, data) -> int:
+        """
+        Write `data` to every sink.
+
+        Parameters
+        ----------
+        data : bytes
+            Encoded fragment.
+
+        Returns
+        -------
+        int
+            Number of bytes written.
+        """
+        for sink in self.sinks:
+            sink.write(data)
+        return len(data)
+
+
+def _normalize_taps(taps) -> dict:
+    """
+    Convert tap keys to tuples so "info" and ("info",) are the same path.
+
+    Parameters
+    ----------
+    taps : dict
+        Mapping of key path to sink.
+
+    Returns
+    -------
+    dict
+        Mapping of tuple key path to sink.
+    """
+    normal = {}
+    for path, sink in taps.items():
+        if not isinstance(path, tuple):
+            path = (path,)
+        normal[path] = sink
+    return normal
+
+
+def encode_to(val, sink, taps=None):
+    """
+    Encode data into a sink, tapping the output of chosen key paths.
+
+    Every fragment for the value found at a path in `taps` is also
+    written to the sink mapped to that path. This makes it possible to
+    hash the `info` dictionary while writing the torrent file. Containers
+    returned by `spans.decode_spans` are encoded with `encode_spans` so
+    unmodified subtrees are copied from their source.
+
+        >>> hasher = HashSink("sha1", "sha256")
+        >>> encode_to(meta, fd, taps={"info": hasher})
+        >>> hasher.hexdigests()["sha1"]
+
+    Parameters
+    ----------
+    val : any
+        Data for encoding.
+    sink : any
+        Object with a `write` method receiving the full output.
+    taps : dict, optional
+        Mapping of key path (tuple of keys or list indexes) to sink.
+    """
+    leaf = encode_spans if isinstance(val, SPAN_TYPES) else benencode_into
+    if not taps:
+        leaf(val, sink.write)
+        return
+    taps = _normalize_taps(taps)
+    branches = set()
+    for path in taps:
+        branches.update(path[:i] for i in range(len(path)))
+    _encode_tapped(val, sink.write, (taps, branches, leaf), ())
+
+
+def _encode_tapped(val, write, plan, path):
+    """
+    Encode data following the key paths that lead to a tap.
+
+    Parameters
+    ----------
+    val : any
+        Data for encoding.
+    write : callable
+        Output for the encoded fragments.
+    plan : tuple
+        Mapping of tuple key path to sink, the set of key paths with a
+        tap somewhere beneath them and the encoder used for other values.
+    path : tuple
+        Key path of `val`.
+    """
+    taps, branches, leaf = plan
+    if path in taps:
+        write = _tee(write, taps[path].write)
+
+    if path not in branches:
+        leaf(val, write)
+
+    elif isinstance(val, dict):
+        write(b"d")
+        for key, value in val.items():
+            benencode_into(key, write)
+            _encode_next(value, write, plan, path + (key,))
+        write(b"e")
+
+    elif isinstance(val, (list, tuple)):
+        write(b"l")
+        for index, value in enumerate(val):
+            _encode_next(value, write, plan, path + (index,))
+        write(b"e")
+
+    else:
+        leaf(val, write)
+
+
+def _encode_next(val, write, plan, path):
+    """
+    Encode a container member, descending only if it leads to a tap.
+
+    Parameters
+    ----------
+    val : any
+        Data for encoding.
+    write : callable
+        Output for the encoded fragments.
+    plan : tuple
+        Taps, branches and leaf encoder, see `_encode_tapped`.
+    path : tuple
+        Key path of `val`.
+    """
+    taps, branches, leaf = plan
+    if path in taps or path in branches:
+        _encode_tapped(val, write, plan, path)
+    else:
+        leaf(val, write)
+
+
+def _tee(first, second):
+    """
+    Combine two write callables into one.
+
+    Parameters
+    ----------
+    first : callable
+        First output.
+    second : callable
+        Second output.
+
+    Returns
+    -------
+    callable
+        Function writing to both outputs.
+    """
+
+    def write(data):
+        first(data)
+        second(data)
+
+    return write
@@ -0,0 +1,287 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""
+Span preserving decoding and re-encoding.
+
+Containers decoded by `decode_spans` remember the slice of the source
+they were decoded from and whether they have been modified since. When
+they are encoded again, unmodified containers are copied from the source
+byte for byte and only the modified subtrees are re-encoded.
+
+    >>> meta = pyben.loads(data, spans=True)
+    >>> meta["announce"] = "http://tracker.example/announce"
+    >>> pyben.dumps(meta)  # "info" is copied from `data` untouched
+
+Classes
+-------
+* SpanDict
+* SpanList
+
+Functions
+---------
+* decode_spans
+* dumps_spans
+* encode_spans
+"""
+
+from pyben.bencode import benencode_into
+from pyben.core import _decode
+from pyben.exceptions import DecodeError
+
+DICT_MUTATORS = (
+    "__setitem__",
+    "__delitem__",
+    "__ior__",
+    "clear",
+    "pop",
+    "popitem",
+    "setdefault",
+    "update",
+)
+
+LIST_MUTATORS = (
+    "__setitem__",
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+    "append",
+    "clear",
+    "extend",
+    "insert",
+    "pop",
+    "remove",
+    "reverse",
+    "sort",
+)
+
+
+def _mutator(base, name):
+    """
+    Wrap a container method so calling it marks the container dirty.
+
+    Parameters
+    ----------
+    base : type
+        `dict` or `list`.
+    name : str
+        Name of the mutating method.
+
+    Returns
+    -------
+    callable
+        Wrapped method.
+    """
+    method = getattr(base, name)
+
+    def mutate(self, *args, **kwargs):
+        self.dirty = True
+        return method(self, *args, **kwargs)
+
+    mutate.__name__ = name
+    mutate.__doc__ = method.__doc__
+    return mutate
+
+
+def _rebuild(cls, items, state):
+    """
+    Recreate a span container for `copy` and `pickle`.
+
+    Parameters
+    ----------
+    cls : type
+        `SpanDict` or `SpanList`.
+    items : any
+        Contents of the container.
+    state : tuple
+        Source, start, end and dirty flag.
+
+    Returns
+    -------
+    any
+        The span container.
+    """
+    container = cls(items)
+    container.source, container.start, container.end, container.dirty = state
+    return container
+
+
+class SpanDict(dict):
+    """Dictionary remembering the span of source data it was decoded from."""
+
+    __slots__ = ("source", "start", "end", "dirty")
+
+    def __init__(self, *args, **kwargs):
+        """Construct a SpanDict with no source span."""
+        super().__init__(*args, **kwargs)
+        self.source, self.start, self.end = None, 0, 0
+        self.dirty = True
+
+    def __reduce__(self):
+        """Keep the span state when copied or pickled."""
+        state = (self.source, self.start, self.end, self.dirty)
+        return _rebuild, (type(self), dict(self), state)
+
+
+class SpanList(list):
+    """List remembering the span of source data it was decoded from."""
+
+    __slots__ = ("source", "start", "end", "dirty")
+
+    def __init__(self, *args, **kwargs):
+        """Construct a SpanList with no source span."""
+        super().__init__(*args, **kwargs)
+        self.source, self.start, self.end = None, 0, 0
+        self.dirty = True
+
+    def __reduce__(self):
+        """Keep the span state when copied or pickled."""
+        state = (self.source, self.start, self.end, self.dirty)
+        return _rebuild, (type(self), list(self), state)
+
+
+for _name in DICT_MUTATORS:
+    setattr(SpanDict, _name, _mutator(dict, _name))
+
+for _name in LIST_MUTATORS:
+    setattr(SpanList, _name, _mutator(list, _name))
+
+del _name
+
+SPAN_TYPES = (SpanDict, SpanList)
+
+
+def decode_spans(bits: bytes):
+    """
+    Decode bencoded data into span tracking containers.
+
+    Parameters
+    ----------
+    bits : bytes
+        Bencode encoded data.
+
+    Raises
+    ------
+    DecodeError
+        Malformed data.
+
+    Returns
+    -------
+    any
+        Decoded data with `SpanDict` and `SpanList` containers.
+    """
+    bits = bytes(bits)
+    try:
+        return _decode(bits, 0, None, containers=(SpanList, SpanDict))[0]
+    except (IndexError, TypeError, ValueError) as err:
+        raise DecodeError(bits) from err
+
+
+def _mark_clean(val, clean: dict) -> bool:
+    """
+    Record which containers can be copied from their source unchanged.
+
+    Parameters
+    ----------
+    val : any
+        Decoded data.
+    clean : dict
+        Filled with `id(container) -> bool` for every span container.
+
+    Returns
+    -------
+    bool
+        True if `val` and everything beneath it is unmodified.
+    """
+    if isinstance(val, dict):
+        children = val.values()
+    elif isinstance(val, (list, tuple)):
+        children = val
+    else:
+        return True
+
+    result = isinstance(val, SPAN_TYPES) and not val.dirty
+    for child in children:
+        if not _mark_clean(child, clean):
+            result = False
+    if isinstance(val, SPAN_TYPES):
+        clean[id(val)] = result
+    return result
+
+
+def encode_spans(val, write):
+    """
+    Encode data, copying unmodified span containers from their source.
+
+    Parameters
+    ----------
+    val : any
+        Data for encoding, usually returned by `decode_spans`.
+    write : callable
+        Called once per encoded fragment.
+    """
+    clean = {}
+    _mark_clean(val, clean)
+    _encode(val, write, clean)
+
+
+def _encode(val, write, clean: dict):
+    """
+    Encode data using the clean map built by `_mark_clean`.
+
+    Parameters
+    ----------
+    val : any
+        Data for encoding.
+    write : callable
+        Called once per encoded fragment.
+    clean : dict
+        Mapping of `id(container) -> bool`.
+    """
+    if clean.get(id(val)):
+        write(memoryview(val.source)[val.start:val.end])
+
+    elif isinstance(val, dict):
+        write(b"d")
+        for key, value in val.items():
+            benencode_into(key, write)
+            _encode(value, write, clean)
+        write(b"e")
+
+    elif isinstance(val, (list, tuple)):
+        write(b"l")
+        for elem in val:
+            _encode(elem, write, clean)
+        write(b"e")
+
+    else:
+        benencode_into(val, write)
+
+
+def dumps_spans(val) -> bytes:
+    """
+    Encode data, copying unmodified span containers from their source.
+
+    Parameters
+    ----------
+    val : any
+        Data for encoding, usually returned by `decode_spans`.
+
+    Returns
+    -------
+    bytes
+        Bencoded data.
+    """
+    out = bytearray()
+    encode_spans(val, out.extend)
+    return bytes(out)
@@ -0,0 +1,190 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""
+Incremental decoding of bencoded streams.
+
+Data can be fed in arbitrary pieces, e.g. as it arrives from a socket.
+The decoder scans the structure of the buffered data as it grows and
+only decodes a value once all of its bytes have arrived, so partial
+messages are never parsed twice.
+
+    >>> decoder = IncrementalDecoder()
+    >>> decoder.decode(b"d1:ai1e")
+    ... []
+    >>> decoder.decode(b"ei2e")
+    ... [{'a': 1}, 2]
+
+Classes
+-------
+* IncrementalDecoder
+"""
+
+from pyben.bencode import bendecode
+from pyben.exceptions import DecodeError
+
+MAX_HEADER = 20
+
+
+class IncrementalDecoder:
+    """Decoder that frames and decodes values from a stream of bytes."""
+
+    def __init__(self, max_size: int = None):
+        """
+        Construct the IncrementalDecoder.
+
+        Parameters
+        ----------
+        max_size : int, optional
+            Largest accepted value in bytes, larger values raise a
+            `DecodeError` instead of being buffered.
+        """
+        self.max_size = max_size
+        self.buffer = bytearray()
+        self._start = 0
+        self._pos = 0
+        self._depth = 0
+
+    def __len__(self) -> int:
+        """Return the number of buffered bytes not yet framed."""
+        return len(self.buffer) - self._start
+
+    @property
+    def remainder(self) -> bytes:
+        """Return the buffered bytes that are not part of a complete value."""
+        return bytes(self.buffer[self._start:])
+
+    def __iter__(self):
+        """Decode every complete value currently buffered."""
+        frame = self.next_frame()
+        while frame is not None:
+            yield bendecode(frame)[0]
+            frame = self.next_frame()
+
+    def feed(self, data):
+        """
+        Append data to the buffer.
+
+        Parameters
+        ----------
+        data : bytes
+            Next piece of the stream.
+        """
+        if self._start:
+            del self.buffer[:self._start]
+            self._pos -= self._start
+            self._start = 0
+        self.buffer += data
+
+    def decode(self, data=b"") -> list:
+        """
+        Append data to the buffer and decode every complete value.
+
+        Parameters
+        ----------
+        data : bytes
+            Next piece of the stream.
+
+        Returns
+        -------
+        list
+            Decoded values, possibly empty.
+        """
+        self.feed(data)
+        return list(self)
+
+    def next_frame(self) -> bytes:
+        """
+        Return the raw bytes of the next complete value.
+
+        Raises
+        ------
+        DecodeError
+            Malformed data or value larger than `max_size`.
+
+        Returns
+        -------
+        bytes or None
+            The encoded value or None if it has not fully arrived.
+        """
+        end = self._scan()
+        if end is None:
+            if self.max_size is not None and len(self) > self.max_size:
+                raise DecodeError(bytes(self.buffer[self._start:self._pos]))
+            return None
+        frame = bytes(self.buffer[self._start:end])
+        self._start = self._pos = end
+        return frame
+
+    def close(self):
+        """
+        Check the stream ended on a value boundary.
+
+        Raises
+        ------
+        DecodeError
+            Data of an incomplete value is still buffered.
+        """
+        if len(self):
+            raise DecodeError(self.remainder)
+
+    def _scan(self) -> int:
+        """
+        Advance the scanner over the buffered data.
+
+        Returns
+        -------
+        int or None
+            End offset of the next complete value, if there is one.
+        """
+        buf, pos, depth = self.buffer, self._pos, self._depth
+        size = len(buf)
+        while pos < size:
+            lead = buf[pos]
+            if lead == 0x65:  # e
+                if not depth:
+                    raise DecodeError(bytes(buf[pos:]))
+                depth -= 1
+                pos += 1
+            elif lead in (0x64, 0x6C):  # d l
+                depth += 1
+                pos += 1
+            elif lead == 0x69:  # i
+                end = buf.find(b"e", pos + 1)
+                if end < 0:
+                    break
+                pos = end + 1
+            elif 0x30 <= lead <= 0x39:
+                colon = buf.find(b":", pos, pos + MAX_HEADER)
+                if colon < 0:
+                    if size - pos >= MAX_HEADER:
+                        raise DecodeError(bytes(buf[pos:pos + MAX_HEADER]))
+                    break
+                try:
+                    length = int(buf[pos:colon])
+                except ValueError as err:
+                    raise DecodeError(bytes(buf[pos:colon])) from err
+                end = colon + 1 + length
+                limit = self.max_size
+                if limit is not None and end - self._start > limit:
+                    raise DecodeError(bytes(buf[pos:colon]))
+                if end > size:
+                    break
+                pos = end
+            else:
+                raise DecodeError(bytes(buf[pos:pos + MAX_HEADER]))
+            if not depth:
+                self._pos, self._depth = pos, depth
+                return pos
+        self._pos, self._depth = pos, depth
+        return None
@@ -0,0 +1,471 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""
+Compact torrent metainfo model.
+
+`Metainfo` keeps only the encoded torrent and decodes each field the
+first time it is read, so holding many torrents costs little more than
+their file sizes:
+
+    >>> meta = Metainfo.load("ubuntu.torrent")
+    >>> meta.name, meta.length, meta.infohash.hex()
+    >>> meta.pieces[0]  # first 20 byte digest, sliced from the buffer
+
+Piece hashes are exposed as `PieceHashes`, a sequence of fixed size
+digests backed by a view of the encoded torrent instead of a copy.
+
+Classes
+-------
+* Metainfo
+* PieceHashes
+"""
+
+import hashlib
+from collections.abc import Sequence
+
+from pyben.core import decode
+from pyben.exceptions import DecodeError, FilePathError
+
+_UNSET = object()
+
+
+def _skip(bits: bytes, pos: int) -> int:
+    """
+    Return the offset after the value at `pos` without decoding it.
+
+    Parameters
+    ----------
+    bits : bytes
+        Bencoded data.
+    pos : int
+        Offset of the value.
+
+    Returns
+    -------
+    int
+        Offset after the value.
+    """
+    depth = 0
+    while True:
+        lead = bits[pos]
+        if lead in (0x64, 0x6C):  # d l
+            depth += 1
+            pos += 1
+            continue
+        if lead == 0x65:  # e
+            depth -= 1
+            pos += 1
+        elif lead == 0x69:  # i
+            pos = bits.index(b"e", pos) + 1
+        else:
+            colon = bits.index(b":", pos)
+            digits = bits[pos:colon]
+            if not digits.isdigit():
+                raise DecodeError(digits)
+            pos = colon + 1 + int(digits)
+        if depth <= 0:
+            if depth < 0 or pos > len(bits):
+                raise DecodeError(bits[pos:pos + 32])
+            return pos
+
+
+def _members(bits: bytes, pos: int, text: bool = True) -> dict:
+    """
+    Locate the values of the dictionary at `pos`.
+
+    Parameters
+    ----------
+    bits : bytes
+        Bencoded data.
+    pos : int
+        Offset of the dictionary.
+    text : bool, optional
+        Decode utf-8 keys to `str`, otherwise all keys are `bytes`.
+
+    Returns
+    -------
+    dict
+        Mapping of each key to the `(start, end)` span of its value.
+    """
+    if bits[pos:pos + 1] != b"d":
+        raise DecodeError(bits[pos:pos + 32])
+    spans = {}
+    pos += 1
+    while bits[pos] != 0x65:
+        colon = bits.index(b":", pos)
+        digits = bits[pos:colon]
+        if not digits.isdigit():
+            raise DecodeError(digits)
+        start = colon + 1 + int(digits)
+        key = bits[colon + 1:start]
+        if text:
+            try:
+                key = key.decode("utf-8")
+            except UnicodeDecodeError:
+                pass
+        end = _skip(bits, start)
+        spans[key] = (start, end)
+        pos = end
+    return spans
+
+
+class PieceHashes(Sequence):
+    """
+    Read-only sequence of fixed size piece digests.
+
+    Backed by a memoryview of the buffer holding the concatenated
+    digests, indexing returns the digest at that position as `bytes`
+    and slicing returns another `PieceHashes` over the same buffer.
+    """
+
+    __slots__ = ("_view", "size")
+
+    def __init__(self, blob, size: int = 20):
+        """
+        Construct the PieceHashes.
+
+        Parameters
+        ----------
+        blob : bytes-like
+            Concatenated digests.
+        size : int, optional
+            Digest size, 20 for v1 pieces and 32 for v2 piece layers.
+
+        Raises
+        ------
+        ValueError
+            The length of `blob` is not a multiple of `size`.
+        """
+        view = memoryview(blob).cast("B")
+        if len(view) % size:
+            raise ValueError(f"{len(view)} is not a multiple of {size}")
+        self._view = view
+        self.size = size
+
+    def __len__(self) -> int:
+        """Return the number of digests."""
+        return len(self._view) // self.size
+
+    def __getitem__(self, index):
+        """Return the digest at `index`, or the digests of a slice."""
+        size = self.size
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[num] for num in range(start, stop, step)]
+            stop = max(start, stop)
+            return PieceHashes(self._view[start * size:stop * size], size)
+        count = len(self)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError(index)
+        return self._view[index * size:(index + 1) * size].tobytes()
+
+    def __iter__(self):
+        """Iterate over the digests."""
+        view, size = self._view, self.size
+        for start in range(0, len(view), size):
+            yield view[start:start + size].tobytes()
+
+    def __eq__(self, other) -> bool:
+        """Compare digests with another PieceHashes."""
+        if not isinstance(other, PieceHashes):
+            return NotImplemented
+        return self.size == other.size and self._view == other._view
+
+    def __reduce__(self):
+        """Pickle a copy of the digests instead of the view."""
+        return PieceHashes, (self.tobytes(), self.size)
+
+    def __repr__(self) -> str:
+        """Return the number and size of the digests."""
+        return f"PieceHashes({len(self)} x {self.size} bytes)"
+
+    def tobytes(self) -> bytes:
+        """Return the concatenated digests."""
+        return self._view.tobytes()
+
+
+class Metainfo:
+    """
+    Torrent metainfo decoded on demand from its encoded form.
+
+    Every field is read from the encoded torrent the first time it is
+    used and then kept in a slot. Works with v1, v2 and hybrid torrents.
+    """
+
+    __slots__ = (
+        "raw",
+        "_top",
+        "_info",
+        "_name",
+        "_length",
+        "_piece_length",
+        "_files",
+        "_trackers",
+        "_infohash",
+        "_infohash_v2",
+        "_pieces",
+    )
+
+    def __init__(self, raw):
+        """
+        Construct the Metainfo.
+
+        Parameters
+        ----------
+        raw : bytes-like
+            Encoded torrent.
+
+        Raises
+        ------
+        DecodeError
+            `raw` is not a dictionary with an info dictionary.
+        """
+        self.raw = bytes(raw)
+        self._name = _UNSET
+        self._length = _UNSET
+        self._piece_length = _UNSET
+        self._files = _UNSET
+        self._trackers = _UNSET
+        self._infohash = _UNSET
+        self._infohash_v2 = _UNSET
+        self._pieces = _UNSET
+        try:
+            self._top = _members(self.raw, 0)
+            self._info = _members(self.raw, self._top["info"][0])
+        except (IndexError, KeyError, ValueError) as err:
+            raise DecodeError(self.raw[:32]) from err
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a torrent file.
+
+        Parameters
+        ----------
+        path : str
+            Path to the torrent file.
+
+        Raises
+        ------
+        FilePathError
+            The file cannot be read.
+
+        Returns
+        -------
+        Metainfo
+            Metainfo of the torrent.
+        """
+        try:
+            with open(path, "rb") as _fd:
+                return cls(_fd.read())
+        except (FileNotFoundError, IsADirectoryError, PermissionError) as err:
+            raise FilePathError(path) from err
+
+    @classmethod
+    def loads(cls, data):
+        """
+        Wrap an encoded torrent, see `Metainfo`.
+
+        Parameters
+        ----------
+        data : bytes-like
+            Encoded torrent.
+
+        Returns
+        -------
+        Metainfo
+            Metainfo of the torrent.
+        """
+        return cls(data)
+
+    def _value(self, spans: dict, key, default=None):
+        """Decode the value of `key` from its span."""
+        if key not in spans:
+            return default
+        return decode(self.raw, spans[key][0])[0]
+
+    def get(self, key, default=None):
+        """
+        Decode a top-level field.
+
+        Parameters
+        ----------
+        key : str
+            Field name, e.g. "comment".
+        default : any, optional
+            Returned when the field is missing.
+
+        Returns
+        -------
+        any
+            Decoded value.
+        """
+        return self._value(self._top, key, default)
+
+    def info_get(self, key, default=None):
+        """
+        Decode a field of the info dictionary.
+
+        Parameters
+        ----------
+        key : str
+            Field name, e.g. "source".
+        default : any, optional
+            Returned when the field is missing.
+
+        Returns
+        -------
+        any
+            Decoded value.
+        """
+        return self._value(self._info, key, default)
+
+    @property
+    def info_bytes(self) -> memoryview:
+        """Encoded info dictionary, as hashed for the infohash."""
+        start, end = self._top["info"]
+        return memoryview(self.raw)[start:end]
+
+    @property
+    def meta_version(self) -> int:
+        """Metainfo version, 2 for v2 and hybrid torrents."""
+        return self.info_get("meta version", 1)
+
+    @property
+    def name(self) -> str:
+        """Suggested name of the file or directory."""
+        if self._name is _UNSET:
+            self._name = self.info_get("name")
+        return self._name
+
+    @property
+    def piece_length(self) -> int:
+        """Number of bytes per piece."""
+        if self._piece_length is _UNSET:
+            self._piece_length = self.info_get("piece length")
+        return self._piece_length
+
+    @property
+    def files(self) -> tuple:
+        """`(path, length)` pairs, path being a tuple of components."""
+        if self._files is _UNSET:
+            self._files = tuple(self._iter_files())
+        return self._files
+
+    def _iter_files(self):
+        """
+        Yield `(path, length)` for v1, v2 and single-file layouts.
+
+        BEP 47 padding files of hybrid torrents are left out.
+        """
+        files = self.info_get("files")
+        if files is not None:
+            for entry in files:
+                if "p" in entry.get("attr", ""):
+                    continue
+                yield tuple(entry.get("path", ())), entry.get("length", 0)
+            return
+        length = self.info_get("length")
+        if length is not None:
+            yield (self.name,), length
+            return
+        stack = [((), self.info_get("file tree", {}))]
+        while stack:
+            path, node = stack.pop()
+            for key, child in reversed(list(node.items())):
+                if key == "":
+                    yield path, child.get("length", 0)
+                else:
+                    stack.append((path + (key,), child))
+
+    @property
+    def length(self) -> int:
+        """Total size of the payload in bytes."""
+        if self._length is _UNSET:
+            self._length = sum(length for _, length in self.files)
+        return self._length
+
+    @property
+    def trackers(self) -> tuple:
+        """Tracker urls of every tier, `announce` when there are none."""
+        if self._trackers is _UNSET:
+            tiers = self.get("announce-list") or []
+            urls = [url for tier in tiers for url in tier]
+            if not urls and "announce" in self._top:
+                urls = [self.get("announce")]
+            self._trackers = tuple(urls)
+        return self._trackers
+
+    @property
+    def infohash(self) -> bytes:
+        """SHA-1 digest of the info dictionary."""
+        if self._infohash is _UNSET:
+            self._infohash = hashlib.sha1(self.info_bytes).digest()
+        return self._infohash
+
+    @property
+    def infohash_v2(self):
+        """SHA-256 digest of the info dictionary, None for v1 torrents."""
+        if self._infohash_v2 is _UNSET:
+            self._infohash_v2 = None
+            if self.meta_version == 2:
+                self._infohash_v2 = hashlib.sha256(self.info_bytes).digest()
+        return self._infohash_v2
+
+    @property
+    def pieces(self):
+        """V1 piece digests as `PieceHashes`, None for v2-only torrents."""
+        if self._pieces is _UNSET:
+            self._pieces = None
+            if "pieces" in self._info:
+                self._pieces = PieceHashes(self._blob(self._info["pieces"]))
+        return self._pieces
+
+    def _blob(self, span: tuple) -> memoryview:
+        """Return a view of the contents of the string at `span`."""
+        start, end = span
+        colon = self.raw.index(b":", start)
+        return memoryview(self.raw)[colon + 1:end]
+
+    def piece_layers(self) -> dict:
+        """
+        Return the v2 piece layers.
+
+        Returns
+        -------
+        dict
+            Mapping of each file's `pieces root` to its `PieceHashes`.
+        """
+        if "piece layers" not in self._top:
+            return {}
+        start = self._top["piece layers"][0]
+        return {
+            root: PieceHashes(self._blob(span), 32)
+            for root, span in _members(self.raw, start, False).items()
+        }
+
+    def __reduce__(self):
+        """Pickle only the encoded torrent."""
+        return type(self), (self.raw,)
+
+    def to_dict(self) -> dict:
+        """Decode the complete torrent."""
+        return decode(self.raw)[0]
+
+    def __repr__(self) -> str:
+        """Return the name and infohash."""
+        return f"Metainfo({self.name!r}, {self.infohash.hex()})"
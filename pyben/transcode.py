@@ -0,0 +1,669 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""
+Streaming conversion between bencoded data and JSON.
+
+The input is parsed in chunks and JSON is written while parsing, so no
+decoded tree is ever built. The output matches
+`json.dump(pyben.load(path, to_json=True), out, indent=indent)`:
+
+    >>> with open("big.torrent", "rb") as src:
+    ...     to_json_stream(src, sys.stdout, indent=4)
+
+Strings are emitted as JSON text when they are valid utf-8 and as hex
+otherwise. Strings longer than `chunk_size` are checked in a first pass
+and emitted in a second one when the input is seekable, so memory use
+stays constant for inputs of any size.
+
+`from_json` goes the other way, encoding a JSON document or the output
+of `pyben.load(path, to_json=True)` straight to bencode. Strings found
+at the key paths in `binary_keys` are turned back from hex into bytes:
+
+    >>> with open("meta.json") as src, open("meta.torrent", "wb") as out:
+    ...     from_json(src, out)
+
+Functions
+---------
+* from_json
+* to_json_stream
+"""
+
+import binascii
+import codecs
+import io
+import json
+import re
+from json.decoder import scanstring
+
+from pyben.core import STR_CACHE, encode_into
+from pyben.exceptions import DecodeError, EncodeError
+
+CHUNK_SIZE = 1 << 16
+FLUSH_SIZE = 1 << 16
+MAX_HEADER = 32
+
+DEFAULT_BINARY_KEYS = (
+    "pieces",
+    "pieces root",
+    "peers",
+    "peers6",
+    "nodes",
+    "nodes6",
+    "info_hash",
+    "id",
+    "target",
+    "token",
+    ("piece layers", "*"),
+)
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(\.\d+)?([eE][-+]?\d+)?")
+LITERAL = re.compile(r"[a-z]+")
+LITERALS = {"true": b"i1e", "false": b"i0e"}
+
+
+class _Source:
+    """Chunked reader over a binary stream."""
+
+    def __init__(self, stream, chunk_size: int):
+        """
+        Construct the _Source.
+
+        Parameters
+        ----------
+        stream : BinaryIO
+            Stream of bencoded data.
+        chunk_size : int
+            Bytes read at a time.
+        """
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buf = b""
+        self.pos = 0
+        try:
+            self.seekable = stream.seekable()
+        except AttributeError:
+            self.seekable = False
+
+    def _fill(self):
+        """Read the next chunk, dropping consumed bytes."""
+        data = self.stream.read(self.chunk_size)
+        if not data:
+            raise DecodeError(self.buf[self.pos:self.pos + MAX_HEADER])
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+
+    def peek(self) -> int:
+        """Return the next byte without consuming it."""
+        while self.pos >= len(self.buf):
+            self._fill()
+        return self.buf[self.pos]
+
+    def until(self, delim: bytes) -> bytes:
+        """Consume and return the bytes before `delim`, and `delim`."""
+        while True:
+            end = self.buf.find(delim, self.pos, self.pos + MAX_HEADER)
+            if end >= 0:
+                token = self.buf[self.pos:end]
+                self.pos = end + 1
+                return token
+            if len(self.buf) - self.pos >= MAX_HEADER:
+                raise DecodeError(self.buf[self.pos:self.pos + MAX_HEADER])
+            self._fill()
+
+    def chunks(self, size: int):
+        """Consume `size` bytes, yielding them in pieces."""
+        while size:
+            if self.pos >= len(self.buf):
+                self._fill()
+            piece = self.buf[self.pos:self.pos + size]
+            self.pos += len(piece)
+            size -= len(piece)
+            yield piece
+
+    def tell(self) -> int:
+        """Return the stream offset of the next byte."""
+        return self.stream.tell() - (len(self.buf) - self.pos)
+
+    def seek(self, offset: int):
+        """Move to a stream offset, discarding buffered data."""
+        self.stream.seek(offset)
+        self.buf, self.pos = b"", 0
+
+
+class _Output:
+    """Buffered text or binary writer."""
+
+    def __init__(self, out, empty=""):
+        """Store the output stream and the empty value for joining."""
+        self.out = out
+        self.empty = empty
+        self.parts = []
+        self.size = 0
+
+    def write(self, text: str):
+        """Buffer data, flushing it every `FLUSH_SIZE` items."""
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= FLUSH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered data."""
+        self.out.write(self.empty.join(self.parts))
+        self.parts.clear()
+        self.size = 0
+
+
+def _is_utf8(pieces) -> bool:
+    """Check every piece of a string decodes as utf-8."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        for piece in pieces:
+            decoder.decode(piece)
+        decoder.decode(b"", True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _emit_text(pieces, write):
+    """Write utf-8 pieces as the body of a JSON string."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for piece in pieces:
+        write(json.dumps(decoder.decode(piece))[1:-1])
+    write(json.dumps(decoder.decode(b"", True))[1:-1])
+
+
+def _emit_string(src: _Source, size: int, write):
+    """
+    Write a bencoded string of `size` bytes as a JSON string.
+
+    Parameters
+    ----------
+    src : _Source
+        Input positioned at the first byte of the string.
+    size : int
+        Length of the string.
+    write : callable
+        Output writer.
+    """
+    write('"')
+    if size <= src.chunk_size or not src.seekable:
+        data = b"".join(src.chunks(size))
+        try:
+            text = data.decode("utf-8")
+        except UnicodeDecodeError:
+            write(data.hex())
+        else:
+            write(json.dumps(text)[1:-1])
+    else:
+        start = src.tell()
+        text = _is_utf8(src.chunks(size))
+        src.seek(start)
+        if text:
+            _emit_text(src.chunks(size), write)
+        else:
+            for piece in src.chunks(size):
+                write(piece.hex())
+    write('"')
+
+
+def _read_int(src: _Source) -> int:
+    """Consume an integer token after its leading `i`."""
+    digits = src.until(b"e")
+    if not (
+        digits.isdigit() or digits[:1] == b"-" and digits[1:].isdigit()
+    ):
+        raise DecodeError(digits)
+    return int(digits)
+
+
+def _read_length(src: _Source) -> int:
+    """Consume a string length header."""
+    digits = src.until(b":")
+    if not digits.isdigit():
+        raise DecodeError(digits)
+    return int(digits)
+
+
+def to_json_stream(source, out, indent=None, chunk_size=CHUNK_SIZE):
+    """
+    Convert one bencoded value to JSON text while reading it.
+
+    Parameters
+    ----------
+    source : str or BinaryIO or bytes
+        Path, binary stream or bencoded bytes.
+    out : TextIO
+        Stream the JSON text is written to.
+    indent : int or str, optional
+        Indentation as in `json.dump`, compact output if None.
+    chunk_size : int, optional
+        Bytes read at a time.
+
+    Raises
+    ------
+    DecodeError
+        Malformed or truncated data.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    if not hasattr(source, "read"):
+        with open(source, "rb") as _fd:
+            to_json_stream(_fd, out, indent, chunk_size)
+        return
+
+    if isinstance(indent, int):
+        indent = " " * indent
+    item_sep = "," if indent is not None else ", "
+    src = _Source(source, chunk_size)
+    output = _Output(out)
+    write = output.write
+    # stack entries are [closing bracket, item count, expecting key]
+    stack = []
+    while True:
+        lead = src.peek()
+        if lead == 0x65 and stack:  # e
+            src.pos += 1
+            closing, count, expect_key = stack.pop()
+            if not expect_key:
+                raise DecodeError(b"e")
+            if count and indent is not None:
+                write("\n" + indent * len(stack))
+            write(closing)
+        else:
+            if stack:
+                frame = stack[-1]
+                if frame[2]:
+                    if frame[1]:
+                        write(item_sep)
+                    if indent is not None:
+                        write("\n" + indent * len(stack))
+                    frame[1] += 1
+                    if frame[0] == "}" and not 0x30 <= lead <= 0x39:
+                        raise DecodeError(bytes([lead]))
+            if lead in (0x64, 0x6C):  # d l
+                src.pos += 1
+                write("{" if lead == 0x64 else "[")
+                stack.append(["}" if lead == 0x64 else "]", 0, True])
+                continue
+            if lead == 0x69:  # i
+                src.pos += 1
+                write(str(_read_int(src)))
+            else:
+                _emit_string(src, _read_length(src), write)
+
+        if not stack:
+            break
+        frame = stack[-1]
+        if frame[0] == "}":
+            if frame[2]:
+                write(": ")
+            frame[2] = not frame[2]
+    output.flush()
+
+
+class _KeyPaths:
+    """Matcher for the key paths of binary strings."""
+
+    def __init__(self, binary_keys):
+        """
+        Compile key paths into a trie.
+
+        Parameters
+        ----------
+        binary_keys : iterable
+            Key names matched at any depth, or tuples of path components
+            where `*` matches any key or list item.
+        """
+        self.anywhere = set()
+        trie = {}
+        for entry in binary_keys:
+            if isinstance(entry, str):
+                self.anywhere.add(entry)
+                continue
+            node = trie
+            for comp in entry:
+                node = node.setdefault(comp, {})
+            node[None] = True
+        self.root = (trie,) if trie else ()
+
+    @staticmethod
+    def step(states: tuple, comp) -> tuple:
+        """Return the trie nodes reached from `states` through `comp`."""
+        if not states:
+            return states
+        comps = ("*",) if comp == "*" else (comp, "*")
+        return tuple(
+            node[name] for node in states for name in comps if name in node
+        )
+
+    def binary(self, states: tuple, comp) -> bool:
+        """Check if the string reached through `comp` holds bytes."""
+        return comp in self.anywhere or any(None in node for node in states)
+
+    @staticmethod
+    def binary_keys(states: tuple) -> bool:
+        """Check if the keys of the dict at `states` hold bytes."""
+        return any(None in node.get("*", ()) for node in states)
+
+
+def _encode_text(text: str, binary: bool) -> bytes:
+    """Encode a string, converting it from hex when `binary` is set."""
+    if binary:
+        try:
+            raw = binascii.unhexlify(text)
+        except ValueError:
+            pass
+        else:
+            return b"%d:%s" % (len(raw), raw)
+    return STR_CACHE(text)
+
+
+def _encode_json(val, states: tuple, binary: bool, paths, write):
+    """
+    Encode a JSON-ready value, converting binary strings from hex.
+
+    Parameters
+    ----------
+    val : any
+        Value to encode.
+    states : tuple
+        Trie nodes matching the path of `val`.
+    binary : bool
+        True if `val` is a binary string.
+    paths : _KeyPaths
+        Key path matcher.
+    write : callable
+        Called once per encoded fragment.
+    """
+    kind = val.__class__
+    if kind is str:
+        write(_encode_text(val, binary))
+    elif not states and not paths.anywhere:
+        encode_into(val, write)
+    elif kind is dict:
+        keys_binary = paths.binary_keys(states)
+        write(b"d")
+        for key, item in val.items():
+            if key.__class__ is str:
+                write(_encode_text(key, keys_binary))
+            else:
+                encode_into(key, write)
+            child = paths.step(states, key)
+            _encode_json(item, child, paths.binary(child, key), paths, write)
+        write(b"e")
+    elif kind is list or kind is tuple:
+        child = paths.step(states, "*")
+        binary = paths.binary(child, "*")
+        write(b"l")
+        for item in val:
+            _encode_json(item, child, binary, paths, write)
+        write(b"e")
+    else:
+        encode_into(val, write)
+
+
+class _TextSource:
+    """Chunked reader over a JSON text stream."""
+
+    def __init__(self, stream, chunk_size: int):
+        """
+        Construct the _TextSource.
+
+        Parameters
+        ----------
+        stream : TextIO or BinaryIO
+            Stream of JSON text, binary streams are read as utf-8.
+        chunk_size : int
+            Characters read at a time.
+        """
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """
+        Read more text, at least doubling what is left in the buffer.
+
+        Returns
+        -------
+        bool
+            False at the end of the stream.
+        """
+        size = max(self.chunk_size, len(self.buf) - self.pos)
+        while not self.eof:
+            data = self.stream.read(size)
+            self.eof = not data
+            if isinstance(data, (bytes, bytearray)):
+                data = self.decoder.decode(data, self.eof)
+            if data:
+                self.buf = self.buf[self.pos:] + data
+                self.pos = 0
+                return True
+        return False
+
+    def error(self, msg: str):
+        """Return a JSONDecodeError at the current position."""
+        return json.JSONDecodeError(msg, self.buf, self.pos)
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character."""
+        while True:
+            self.pos = WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise self.error("Expecting value")
+
+    def finish(self):
+        """Check that only whitespace follows the document."""
+        while True:
+            self.pos = WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                raise self.error("Extra data")
+            if not self.fill():
+                return
+
+    def expect(self, char: str):
+        """Consume `char` or raise JSONDecodeError."""
+        if self.peek() != char:
+            raise self.error(f"Expecting {char!r} delimiter")
+        self.pos += 1
+
+    def string(self) -> str:
+        """Consume a string starting at the opening quote."""
+        while True:
+            try:
+                text, end = scanstring(self.buf, self.pos + 1)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            self.pos = end
+            return text
+
+    def token(self, pattern):
+        """Consume a number or literal and return its match object."""
+        while True:
+            match = pattern.match(self.buf, self.pos)
+            if match and match.end() < len(self.buf) or not self.fill():
+                break
+        if not match or not match.group():
+            raise self.error("Expecting value")
+        self.pos = match.end()
+        return match
+
+
+def _encode_scalar(src: _TextSource, binary: bool, write):
+    """Encode the string, number or literal at the current position."""
+    char = src.peek()
+    if char == '"':
+        write(_encode_text(src.string(), binary))
+    elif char == "-" or char.isdigit():
+        match = src.token(NUMBER)
+        if match.group(1) or match.group(2):
+            raise EncodeError(match.group())
+        write(b"i%de" % int(match.group()))
+    else:
+        literal = src.token(LITERAL).group()
+        if literal not in LITERALS:
+            raise EncodeError(literal)
+        write(LITERALS[literal])
+
+
+def _member(src: _TextSource, frame: list, paths, write) -> tuple:
+    """
+    Start the next member of a container.
+
+    For objects the key is read and encoded, leaving the source at the
+    member value.
+
+    Parameters
+    ----------
+    src : _TextSource
+        JSON input.
+    frame : list
+        `[is_dict, states, keys_binary]` of the container.
+    paths : _KeyPaths
+        Key path matcher.
+    write : callable
+        Called once per encoded fragment.
+
+    Returns
+    -------
+    tuple
+        `(states, binary)` for the member value.
+    """
+    is_dict, states, keys_binary = frame
+    comp = "*"
+    if is_dict:
+        if src.peek() != '"':
+            raise src.error("Expecting property name enclosed in quotes")
+        comp = src.string()
+        write(_encode_text(comp, keys_binary))
+        src.expect(":")
+    child = paths.step(states, comp)
+    return child, paths.binary(child, comp)
+
+
+def _encode_stream(src: _TextSource, paths, write):
+    """
+    Encode one JSON value from a text stream.
+
+    Parameters
+    ----------
+    src : _TextSource
+        JSON input.
+    paths : _KeyPaths
+        Key path matcher.
+    write : callable
+        Called once per encoded fragment.
+    """
+    stack = []
+    states, binary = paths.root, False
+    while True:
+        char = src.peek()
+        if char in "{[":
+            src.pos += 1
+            is_dict = char == "{"
+            write(b"d" if is_dict else b"l")
+            if src.peek() == ("}" if is_dict else "]"):
+                src.pos += 1
+                write(b"e")
+            else:
+                keys_binary = is_dict and paths.binary_keys(states)
+                frame = [is_dict, states, keys_binary]
+                stack.append(frame)
+                states, binary = _member(src, frame, paths, write)
+                continue
+        else:
+            _encode_scalar(src, binary, write)
+
+        while stack:
+            frame = stack[-1]
+            char = src.peek()
+            src.pos += 1
+            if char == ",":
+                states, binary = _member(src, frame, paths, write)
+                break
+            if char != ("}" if frame[0] else "]"):
+                src.pos -= 1
+                raise src.error("Expecting ',' delimiter")
+            stack.pop()
+            write(b"e")
+        else:
+            return
+
+
+def from_json(
+    source,
+    out=None,
+    binary_keys=DEFAULT_BINARY_KEYS,
+    chunk_size=CHUNK_SIZE,
+):
+    """
+    Encode JSON data to bencode without building a decoded tree.
+
+    Strings at the key paths in `binary_keys` are converted from hex back
+    into bytes, reversing `load(to_json=True)`. Strings that are not valid
+    hex are encoded as text, since `to_json` leaves utf-8 data alone.
+
+    Parameters
+    ----------
+    source : any
+        JSON-ready value, or a text or binary stream holding one JSON
+        document which is then parsed incrementally.
+    out : BinaryIO, optional
+        Stream the bencoded data is written to.
+    binary_keys : iterable, optional
+        Key names matched at any depth, or tuples of path components such
+        as `("info", "pieces")`. A `*` component matches any key or list
+        item, and a trailing `*` on an object also matches its keys.
+    chunk_size : int, optional
+        Characters read at a time from a stream.
+
+    Raises
+    ------
+    EncodeError
+        The JSON holds `null` or a non-integral number.
+    JSONDecodeError
+        Malformed JSON text, or text after the document.
+
+    Returns
+    -------
+    bytes or None
+        Bencoded data when `out` is None.
+    """
+    paths = _KeyPaths(binary_keys)
+    if out is None:
+        parts = []
+        write = parts.append
+    else:
+        output = _Output(out, b"")
+        write = output.write
+    if hasattr(source, "read"):
+        src = _TextSource(source, chunk_size)
+        _encode_stream(src, paths, write)
+        src.finish()
+    else:
+        _encode_json(source, paths.root, False, paths, write)
+    if out is None:
+        return b"".join(parts)
+    output.flush()
+    return None
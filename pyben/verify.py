@@ -0,0 +1,488 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""
+Verification of downloaded data against torrent metainfo.
+
+Payload files are memory-mapped and pieces are hashed in a thread pool,
+`hashlib` releases the GIL while hashing so the work runs in parallel:
+
+    >>> result = verify(pyben.load("ubuntu.torrent"), "downloads")
+    >>> result.verified, result.pieces, f"{result.mbps:.0f} MB/s"
+
+V1 pieces may span file boundaries and padding files are treated as
+zeros. V2-only torrents are checked per file against their `piece
+layers` and `pieces root` merkle hashes.
+
+Classes
+-------
+* VerifyResult
+
+Functions
+---------
+* verify
+* merkle_root
+* pieces_root
+"""
+
+import hashlib
+import mmap
+import os
+import time
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from pyben.torrent import Metainfo, PieceHashes
+
+BLOCK_SIZE = 1 << 14
+ZERO_HASH = bytes(32)
+BATCH = 16
+
+
+def merkle_root(leaves: list, count: int) -> bytes:
+    """
+    Compute a BEP 52 merkle root.
+
+    Parameters
+    ----------
+    leaves : list
+        SHA-256 digests of the 16 KiB blocks.
+    count : int
+        Number of leaves of the tree, a power of two. Missing leaves are
+        zero hashes.
+
+    Returns
+    -------
+    bytes
+        Root digest.
+    """
+    layer = list(leaves) + [ZERO_HASH] * (count - len(leaves))
+    while len(layer) > 1:
+        layer = [
+            hashlib.sha256(layer[num] + layer[num + 1]).digest()
+            for num in range(0, len(layer), 2)
+        ]
+    return layer[0]
+
+
+def block_hashes(data) -> list:
+    """
+    Hash data in 16 KiB blocks.
+
+    Parameters
+    ----------
+    data : bytes-like
+        Data to hash.
+
+    Returns
+    -------
+    list
+        SHA-256 digest of every block.
+    """
+    return [
+        hashlib.sha256(data[start:start + BLOCK_SIZE]).digest()
+        for start in range(0, len(data), BLOCK_SIZE)
+    ]
+
+
+def _pow2(num: int) -> int:
+    """Return the smallest power of two not below `num`."""
+    return 1 << max(num - 1, 0).bit_length()
+
+
+def pieces_root(layer, piece_length: int) -> bytes:
+    """
+    Compute the `pieces root` of a file from its piece layer.
+
+    Parameters
+    ----------
+    layer : Sequence
+        Merkle roots of the pieces of the file.
+    piece_length : int
+        Number of bytes per piece.
+
+    Returns
+    -------
+    bytes
+        Root digest, the layer is padded with roots of zero pieces.
+    """
+    width = _pow2(len(layer))
+    padding = merkle_root([], piece_length // BLOCK_SIZE)
+    return merkle_root(list(layer) + [padding] * (width - len(layer)), width)
+
+
+class VerifyResult:
+    """Outcome of a verification run."""
+
+    __slots__ = ("bitfield", "pieces", "verified", "size", "seconds")
+
+    def __init__(self, bitfield, pieces, verified, size, seconds):
+        """
+        Construct the VerifyResult.
+
+        Parameters
+        ----------
+        bitfield : bytearray
+            One bit per piece, most significant bit first as sent in the
+            BitTorrent bitfield message.
+        pieces : int
+            Number of pieces.
+        verified : int
+            Number of pieces that matched.
+        size : int
+            Bytes read and hashed.
+        seconds : float
+            Duration of the run.
+        """
+        self.bitfield = bitfield
+        self.pieces = pieces
+        self.verified = verified
+        self.size = size
+        self.seconds = seconds
+
+    @property
+    def complete(self) -> bool:
+        """True if every piece matched."""
+        return self.verified == self.pieces
+
+    @property
+    def mbps(self) -> float:
+        """Hashing throughput in megabytes per second."""
+        return self.size / 1e6 / self.seconds if self.seconds else 0.0
+
+    def __contains__(self, index: int) -> bool:
+        """Check if piece `index` matched."""
+        return bool(self.bitfield[index >> 3] & (0x80 >> (index & 7)))
+
+    def __repr__(self) -> str:
+        """Return the counts and throughput."""
+        return (
+            f"VerifyResult({self.verified}/{self.pieces} pieces, "
+            f"{self.mbps:.1f} MB/s)"
+        )
+
+
+class _Payload:
+    """Read-only memory maps of the payload files."""
+
+    def __init__(self, stack: ExitStack):
+        """Construct the _Payload, maps are closed with `stack`."""
+        self.stack = stack
+        self.maps = {}
+
+    def open(self, path):
+        """Map `path`, None for a missing or empty file."""
+        if path is None or path in self.maps:
+            return
+        try:
+            with open(path, "rb") as _fd:
+                mapped = mmap.mmap(_fd.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            mapped = None
+        else:
+            self.stack.callback(mapped.close)
+        self.maps[path] = mapped
+
+    def update(self, digest, path, offset: int, length: int) -> bool:
+        """
+        Feed a file range to a hash object.
+
+        Returns
+        -------
+        bool
+            False if the range is not on disk.
+        """
+        if path is None:
+            digest.update(bytes(length))
+            return True
+        mapped = self.maps.get(path)
+        if mapped is None or offset + length > len(mapped):
+            return False
+        with memoryview(mapped) as view, view[offset:offset + length] as part:
+            digest.update(part)
+        return True
+
+    def read(self, path, offset: int, length: int):
+        """Return a copy of a file range, None if it is not on disk."""
+        mapped = self.maps.get(path)
+        if mapped is None or offset + length > len(mapped):
+            return None
+        return mapped[offset:offset + length]
+
+
+def _join(directory, name, components) -> str:
+    """Build the path of a payload file."""
+    return os.path.join(directory, name, *components)
+
+
+def _v1_files(info: dict, directory) -> list:
+    """
+    List the files of the v1 piece stream.
+
+    Returns
+    -------
+    list
+        `(path, length)` pairs, path is None for padding files.
+    """
+    name = info["name"]
+    if "files" not in info:
+        return [(os.path.join(directory, name), info["length"])]
+    files = []
+    for entry in info["files"]:
+        if "p" in entry.get("attr", ""):
+            files.append((None, entry["length"]))
+        else:
+            path = _join(directory, name, entry["path"])
+            files.append((path, entry["length"]))
+    return files
+
+
+def _v2_files(info: dict, directory) -> list:
+    """
+    List the files of a v2 file tree in order.
+
+    Returns
+    -------
+    list
+        `(path, length, pieces_root)` triples.
+    """
+    tree, name = info["file tree"], info["name"]
+    files, stack = [], [((), tree)]
+    while stack:
+        components, node = stack.pop()
+        for key, child in reversed(list(node.items())):
+            if key == "":
+                root = child.get("pieces root")
+                files.append((components, child["length"], root))
+            else:
+                stack.append((components + (key,), child))
+    single = len(tree) == 1 and "" in tree.get(name, {})
+    return [
+        (
+            os.path.join(directory, *components)
+            if single
+            else _join(directory, name, components),
+            length,
+            root,
+        )
+        for components, length, root in files
+    ]
+
+
+def _feed(payload, stream, start: int, end: int, digest) -> bool:
+    """
+    Hash a range of the v1 stream, reading across file boundaries.
+
+    Parameters
+    ----------
+    payload : _Payload
+        Mapped payload files.
+    stream : tuple
+        `(files, starts, total)`, the `(path, length)` pairs of the
+        concatenated files with their offsets and total length.
+    start, end : int
+        Range of the stream.
+    digest : hashlib object
+        Receives the data.
+
+    Returns
+    -------
+    bool
+        False if part of the range is not on disk.
+    """
+    files, starts, _ = stream
+    num = bisect_right(starts, start) - 1
+    while start < end:
+        path, length = files[num]
+        offset = start - starts[num]
+        size = min(length - offset, end - start)
+        if size and not payload.update(digest, path, offset, size):
+            return False
+        start += size
+        num += 1
+    return True
+
+
+def _check_v1(payload, stream, piece_length, pieces, batch):
+    """
+    Hash a batch of v1 pieces.
+
+    `stream` is `(files, starts, total)` as taken by `_feed`.
+
+    Returns
+    -------
+    list
+        `(index, matched, size)` for every piece of the batch.
+    """
+    total = stream[2]
+    results = []
+    for index in batch:
+        start = index * piece_length
+        end = min(start + piece_length, total)
+        digest = hashlib.sha1()
+        matched = _feed(payload, stream, start, end, digest)
+        matched = matched and digest.digest() == pieces[index]
+        results.append((index, matched, end - start))
+    return results
+
+
+def _trusted_layers(meta: dict, piece_length: int) -> dict:
+    """
+    Collect the piece layers that hash to their `pieces root`.
+
+    Layers beyond the end of a file are padded with the root of a piece
+    of zero hashes, layers that don't match their key are dropped.
+
+    Returns
+    -------
+    dict
+        Mapping of each `pieces root` to its `PieceHashes`.
+    """
+    layers = {}
+    for root, layer in meta.get("piece layers", {}).items():
+        try:
+            hashes = PieceHashes(layer, 32)
+        except ValueError:
+            continue
+        if hashes and pieces_root(hashes, piece_length) == root:
+            layers[root] = hashes
+    return layers
+
+
+def _check_v2(payload, piece_length, layers, batch):
+    """
+    Hash a batch of v2 pieces.
+
+    Returns
+    -------
+    list
+        `(index, matched, size)` for every piece of the batch.
+    """
+    results = []
+    for index, path, length, root, piece in batch:
+        offset = piece * piece_length
+        size = min(piece_length, length - offset)
+        data = payload.read(path, offset, size)
+        matched = False
+        if data is not None:
+            leaves = block_hashes(data)
+            if length <= piece_length:
+                matched = merkle_root(leaves, _pow2(len(leaves))) == root
+            else:
+                count = piece_length // BLOCK_SIZE
+                expected = layers.get(root)
+                matched = (
+                    expected is not None
+                    and piece < len(expected)
+                    and merkle_root(leaves, count) == expected[piece]
+                )
+        results.append((index, matched, size))
+    return results
+
+
+def _batches(items, size: int = BATCH):
+    """Split a sequence into lists of `size` items."""
+    return [items[num:num + size] for num in range(0, len(items), size)]
+
+
+def _submit_v1(pool, payload, info: dict, directory) -> tuple:
+    """
+    Queue the v1 piece checks of a torrent.
+
+    Returns
+    -------
+    tuple
+        `(count, jobs)`, the number of pieces and their futures.
+    """
+    files = _v1_files(info, directory)
+    starts, total = [], 0
+    for path, length in files:
+        payload.open(path)
+        starts.append(total)
+        total += length
+    stream = (files, starts, total)
+    pieces = PieceHashes(info["pieces"])
+    jobs = [
+        pool.submit(
+            _check_v1, payload, stream, info["piece length"], pieces, batch
+        )
+        for batch in _batches(range(len(pieces)))
+    ]
+    return len(pieces), jobs
+
+
+def _submit_v2(pool, payload, meta: dict, directory) -> tuple:
+    """
+    Queue the v2 piece checks of a torrent.
+
+    Returns
+    -------
+    tuple
+        `(count, jobs)`, the number of pieces and their futures.
+    """
+    info = meta["info"]
+    piece_length = info["piece length"]
+    layers = _trusted_layers(meta, piece_length)
+    units = []
+    for path, length, root in _v2_files(info, directory):
+        payload.open(path)
+        for piece in range(-(-length // piece_length)):
+            units.append((len(units), path, length, root, piece))
+    jobs = [
+        pool.submit(_check_v2, payload, piece_length, layers, batch)
+        for batch in _batches(units)
+    ]
+    return len(units), jobs
+
+
+def verify(meta, directory, workers=None) -> VerifyResult:
+    """
+    Check downloaded data against the piece hashes of a torrent.
+
+    Parameters
+    ----------
+    meta : dict or Metainfo
+        Torrent as returned by `pyben.load`, or a `Metainfo`.
+    directory : str
+        Directory the torrent was downloaded to.
+    workers : int, optional
+        Hashing threads, defaults to `os.cpu_count()`.
+
+    Returns
+    -------
+    VerifyResult
+        Bitfield of matching pieces and throughput.
+    """
+    if isinstance(meta, Metainfo):
+        meta = meta.to_dict()
+    began = time.perf_counter()
+    with ExitStack() as stack:
+        payload = _Payload(stack)
+        pool = stack.enter_context(
+            ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+        )
+        if "pieces" in meta["info"]:
+            count, jobs = _submit_v1(pool, payload, meta["info"], directory)
+        else:
+            count, jobs = _submit_v2(pool, payload, meta, directory)
+        bitfield = bytearray((count + 7) // 8)
+        verified = size = 0
+        for job in jobs:
+            for index, matched, hashed in job.result():
+                size += hashed
+                if matched:
+                    verified += 1
+                    bitfield[index >> 3] |= 0x80 >> (index & 7)
+    seconds = time.perf_counter() - began
+    return VerifyResult(bitfield, count, verified, size, seconds)
@@ -50,6 +50,31 @@ def testmeta():
     return meta
 
 
+def payload(root, files: dict) -> dict:
+    """
+    Write random payload files below `root / "payload"`.
+
+    Parameters
+    ----------
+    root : pathlib.Path
+        Parent of the payload directory.
+    files : dict
+        Size of each file, keyed by its "/" separated relative path.
+
+    Returns
+    -------
+    dict
+        Contents of each file, in the order of `files`.
+    """
+    contents = {}
+    for name, size in files.items():
+        path = root / "payload" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        contents[name] = os.urandom(size)
+        path.write_bytes(contents[name])
+    return contents
+
+
 def testfile():
     """Create testing file."""
     parent = os.path.dirname(os.path.abspath(__file__))
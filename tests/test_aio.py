@@ -0,0 +1,112 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""Testing functions for Pyben aio module."""
+
+import asyncio
+import os
+
+import pytest
+
+import pyben
+from tests import context
+
+
+def feed_reader(*chunks):
+    """Return a StreamReader that yields `chunks` and then EOF."""
+    reader = asyncio.StreamReader()
+    for chunk in chunks:
+        reader.feed_data(chunk)
+    reader.feed_eof()
+    return reader
+
+
+def test_aload_adump(tmp_path):
+    """Test coroutine load and dump."""
+    path = tmp_path / "async.torrent"
+    meta = context.testmeta()
+
+    async def main():
+        await pyben.adump(meta, path)
+        return await pyben.aload(path)
+
+    assert asyncio.run(main()) == pyben.loads(pyben.dumps(meta))
+
+
+def test_read_bencoded_split():
+    """Test reading values split across reads."""
+    data = pyben.dumps({"t": "aa", "y": "q"}) + pyben.dumps([1, 2])
+
+    async def main():
+        reader = feed_reader(data[:5], data[5:13], data[13:])
+        first = await pyben.read_bencoded(reader, read_size=3)
+        second = await pyben.read_bencoded(reader, read_size=3)
+        with pytest.raises(asyncio.IncompleteReadError):
+            await pyben.read_bencoded(reader)
+        return first, second
+
+    assert asyncio.run(main()) == ({"t": "aa", "y": "q"}, [1, 2])
+
+
+def test_iter_bencoded_offload():
+    """Test iterating values with large values decoded off-loop."""
+    items = [{"pieces": os.urandom(4096)}, 5, "done"]
+    data = b"".join(pyben.dumps(item) for item in items)
+
+    async def main():
+        reader = feed_reader(data)
+        return [
+            val async for val in pyben.iter_bencoded(reader, offload_size=100)
+        ]
+
+    assert asyncio.run(main()) == items
+
+
+def test_iter_bencoded_truncated():
+    """Test a stream ending mid value raises IncompleteReadError."""
+
+    async def main():
+        reader = feed_reader(b"i1ed3:foo")
+        return [val async for val in pyben.iter_bencoded(reader)]
+
+    with pytest.raises(asyncio.IncompleteReadError) as err:
+        asyncio.run(main())
+    assert err.value.partial == b"d3:foo"
+
+
+def test_write_bencoded_roundtrip():
+    """Test writing and reading values over a socket connection."""
+    meta = context.testmeta()
+    meta["pieces"] = os.urandom(1 << 19)
+
+    async def main():
+        received = []
+
+        async def handle(reader, writer):
+            received.extend([val async for val in pyben.iter_bencoded(reader)])
+            writer.close()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        await pyben.write_bencoded(writer, meta, high_water=4096)
+        await pyben.write_bencoded(writer, ["second"])
+        writer.write_eof()
+        await reader.read()
+        writer.close()
+        await writer.wait_closed()
+        server.close()
+        await server.wait_closed()
+        return received
+
+    assert asyncio.run(main()) == [pyben.loads(pyben.dumps(meta)), ["second"]]
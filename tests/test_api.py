@@ -15,6 +15,8 @@
 
 import json
 import os
+import subprocess
+import sys
 
 import pytest
 
@@ -261,3 +263,126 @@ def test_loadinto_exception(tempfile):
         pyben.loadinto(os.path.dirname(tempfile), [])
     except pyben.FilePathError:
         assert True
+
+
+def test_iterloads_concatenated():
+    """Test decoding every value of concatenated data."""
+    values = [{"t": "aa", "y": "q"}, 1, "text", [b"\xff"]]
+    encoded = b"".join(pyben.dumps(value) for value in values)
+    assert list(pyben.iterloads(encoded)) == values
+    assert not list(pyben.iterloads(b""))
+
+
+def test_iterloads_to_json():
+    """Test json conversion of concatenated values."""
+    encoded = pyben.dumps({"id": b"\xff"}) + pyben.dumps(b"\xfe")
+    assert list(pyben.iterloads(encoded, to_json=True)) == [{"id": "ff"}, "fe"]
+
+
+def test_iterloads_truncated():
+    """Test a truncated final value raises DecodeError."""
+    gen = pyben.iterloads(b"i1ed1:a")
+    assert next(gen) == 1
+    with pytest.raises(pyben.DecodeError):
+        next(gen)
+
+
+@pytest.mark.parametrize("read_size", [1, 7, 1 << 16])
+def test_dump_many_iterload(tmp_path, read_size):
+    """Test writing and streaming back an append-only log."""
+    path = tmp_path / "log.bencode"
+    messages = [
+        {"t": str(num), "y": "r", "r": {"id": b"\xaa" * 20}}
+        for num in range(50)
+    ]
+    assert pyben.dump_many(messages[:20], path) == 20
+    assert pyben.dump_many(messages[20:], path, append=True) == 30
+    assert list(pyben.iterload(path, read_size=read_size)) == messages
+    with open(path, "rb") as _fd:
+        assert list(pyben.iterload(_fd, read_size=read_size)) == messages
+
+
+def test_iterload_truncated(tmp_path):
+    """Test a truncated log raises DecodeError at the end."""
+    path = tmp_path / "log.bencode"
+    pyben.dump_many([1, 2], path)
+    with open(path, "ab") as _fd:
+        _fd.write(b"d1:a")
+    gen = pyben.iterload(path)
+    assert [next(gen), next(gen)] == [1, 2]
+    with pytest.raises(pyben.DecodeError):
+        next(gen)
+
+
+def test_iterload_missing(tmp_path):
+    """Test a missing path raises FilePathError."""
+    with pytest.raises(pyben.FilePathError):
+        list(pyben.iterload(tmp_path / "missing"))
+
+
+class Info:
+    """Typed torrent info used by the hook tests."""
+
+    def __init__(self, name, length):
+        """Store the fields."""
+        self.name = name
+        self.length = length
+
+
+def info_hook(obj):
+    """Build Info objects from info dictionaries."""
+    if "piece length" in obj:
+        return Info(obj["name"], obj["length"])
+    return obj
+
+
+def test_loads_object_hook():
+    """Test loads builds typed objects during decoding."""
+    meta = pyben.loads(pyben.dumps(context.testmeta()), object_hook=info_hook)
+    assert isinstance(meta["info"], Info)
+    assert meta["info"].name == "ubuntu.iso"
+
+
+def test_loads_object_pairs_hook():
+    """Test pairs hooks take priority and keep duplicate keys."""
+    data = b"d1:ai1e1:ai2ee"
+    assert pyben.loads(data, object_pairs_hook=list) == [("a", 1), ("a", 2)]
+    hooks = {"object_pairs_hook": list, "object_hook": dict}
+    assert pyben.loads(data, **hooks) == [("a", 1), ("a", 2)]
+    assert pyben.loads(b"d1:a1:\xffe", True, object_pairs_hook=list) == [
+        ("a", "ff")
+    ]
+
+
+def test_load_object_hook(tmp_path):
+    """Test load passes hooks for paths, files and cached reads."""
+    path = tmp_path / "meta.torrent"
+    pyben.dump(context.testmeta(), path)
+    assert isinstance(pyben.load(path, object_hook=info_hook)["info"], Info)
+    with open(path, "rb") as _fd:
+        meta = pyben.load(_fd, object_hook=info_hook)
+    assert isinstance(meta["info"], Info)
+    cache = pyben.DecodeCache()
+    assert isinstance(pyben.load(path, cache=cache)["info"], dict)
+    meta = pyben.load(path, cache=cache, object_hook=info_hook)
+    assert isinstance(meta["info"], Info)
+    assert len(cache) == 2
+
+
+def test_lazy_submodules():
+    """Test optional submodules are imported on first access only."""
+    code = (
+        "import sys, pyben; heavy = ('asyncio', 'numpy', 'pyben.export');"
+        "print(*[name in sys.modules for name in heavy]);"
+        "pyben.export_columns; pyben.rpc;"
+        "print(*[name in sys.modules for name in heavy[::2]])"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, check=True, cwd=root
+    ).stdout.split()
+    assert out == [b"False"] * 3 + [b"True"] * 2
+    assert set(pyben.__all__) <= set(dir(pyben))
+    assert pyben.make_torrent is pyben.create.make_torrent
+    with pytest.raises(AttributeError):
+        getattr(pyben, "missing")
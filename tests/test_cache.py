@@ -0,0 +1,207 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""Testing functions for Pyben cache module."""
+
+import copy as copy_module
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import pyben
+from pyben.cache import DecodeCache, copy_tree, default_cache, freeze
+from pyben.classes import Bendecoder
+from pyben.spans import SpanDict, SpanList
+from tests import context
+
+
+@pytest.fixture
+def torrent(tmp_path):
+    """Pytest Fixture providing the path to a torrent file."""
+    path = str(tmp_path / "meta.torrent")
+    pyben.dump(context.testmeta(), path)
+    return path
+
+
+def test_cache_hit(torrent):
+    """Test a second load returns the cached result."""
+    cache = DecodeCache()
+    first = pyben.load(torrent, cache=cache)
+    second = pyben.load(torrent, cache=cache)
+    assert first is second
+    assert first == context.testmeta()
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+    assert stats["bytes"] > 0
+
+
+def test_cache_copy_mode(torrent):
+    """Test copy mode returns independent containers."""
+    cache = DecodeCache(mode="copy")
+    first = pyben.load(torrent, cache=cache)
+    first["info"]["name"] = "changed"
+    second = pyben.load(torrent, cache=cache)
+    assert second == context.testmeta()
+    assert second is not first
+
+
+def test_cache_shared_read_only(torrent):
+    """Test shared mode results cannot be modified."""
+    cache = DecodeCache()
+    first = pyben.load(torrent, cache=cache)
+    with pytest.raises(TypeError):
+        first["info"]["name"] = "changed"
+    with pytest.raises(TypeError):
+        first.pop("info")
+    with pytest.raises(TypeError):
+        first["announce list"].append(["http://other"])
+    assert pyben.load(torrent, cache=cache) == context.testmeta()
+    assert pyben.dumps(first) == pyben.dumps(context.testmeta())
+    copies = [copy_module.deepcopy(first), pickle.loads(pickle.dumps(first))]
+    for copy in copies:
+        copy["info"]["name"] = "changed"
+        assert copy["info"].__class__ is dict
+
+
+@pytest.mark.parametrize("mode", ["shared", "copy"])
+def test_cache_keeps_spans(torrent, mode):
+    """Test span containers keep their type and span through the cache."""
+    cache = DecodeCache(mode=mode)
+    with open(torrent, "rb") as fd:
+        data = fd.read()
+    for _ in range(2):
+        meta = pyben.load(torrent, spans=True, cache=cache)
+        assert isinstance(meta, SpanDict)
+        assert isinstance(meta["announce list"], SpanList)
+        assert not meta.dirty and (meta.start, meta.end) == (0, len(data))
+        assert pyben.dumps(meta) == data
+    assert cache.stats()["hits"] == 1
+
+
+def test_cache_invalidated_on_change(torrent):
+    """Test a modified file is decoded again."""
+    cache = DecodeCache()
+    pyben.load(torrent, cache=cache)
+    meta = context.testmeta()
+    meta["info"]["name"] = "other name"
+    pyben.dump(meta, torrent)
+    stat = os.stat(torrent)
+    os.utime(torrent, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert pyben.load(torrent, cache=cache)["info"]["name"] == "other name"
+    assert cache.stats()["misses"] == 2
+
+
+def test_cache_variants(torrent):
+    """Test different decodings of one file are cached separately."""
+    cache = DecodeCache()
+    raw = pyben.load(torrent, cache=cache)
+    json = pyben.load(torrent, to_json=True, cache=cache)
+    assert raw is not json
+    assert len(cache) == 2
+
+
+def test_cache_evicts_by_count(tmp_path):
+    """Test the least recently used entry is evicted first."""
+    cache = DecodeCache(maxsize=2)
+    paths = []
+    for num in range(3):
+        path = str(tmp_path / f"{num}.torrent")
+        pyben.dump({"num": num}, path)
+        paths.append(path)
+    pyben.load(paths[0], cache=cache)
+    pyben.load(paths[1], cache=cache)
+    pyben.load(paths[0], cache=cache)
+    pyben.load(paths[2], cache=cache)
+    keys = [key[0] for key in cache._entries]
+    assert keys == [os.path.realpath(p) for p in (paths[0], paths[2])]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_evicts_by_bytes(torrent):
+    """Test results larger than the byte limit are never kept."""
+    cache = DecodeCache(maxbytes=64)
+    pyben.load(torrent, cache=cache)
+    assert not cache
+    assert cache.stats()["bytes"] == 0
+
+
+def test_cache_missing_file(tmp_path):
+    """Test a missing file raises FilePathError."""
+    with pytest.raises(pyben.FilePathError):
+        pyben.load(str(tmp_path / "missing"), cache=DecodeCache())
+
+
+def test_cache_default(torrent):
+    """Test cache=True uses the shared default cache."""
+    default_cache().clear()
+    pyben.load(torrent, cache=True)
+    assert pyben.load(torrent, cache=True) is pyben.load(torrent, cache=True)
+    assert default_cache().stats()["hits"] == 2
+    default_cache().clear()
+
+
+def test_cache_bendecoder(torrent):
+    """Test Bendecoder.load with a cache."""
+    cache = DecodeCache()
+    first = Bendecoder.load(torrent, cache=cache)
+    assert Bendecoder.load(torrent, cache=cache) is first
+    assert first == pyben.load(torrent)
+
+
+def test_cache_threads(torrent):
+    """Test concurrent loads through one cache."""
+    cache = DecodeCache()
+    with ThreadPoolExecutor(8) as pool:
+        results = list(
+            pool.map(lambda _: pyben.load(torrent, cache=cache), range(200))
+        )
+    assert all(result == context.testmeta() for result in results)
+    stats = cache.stats()
+    assert stats["hits"] + stats["misses"] == 200
+    assert len(cache) == 1
+
+
+def test_copy_tree():
+    """Test copy_tree copies containers and shares leaves."""
+    data = {"a": [b"x", {"b": 1}]}
+    copy = copy_tree(data)
+    assert copy == data
+    assert copy["a"] is not data["a"]
+    assert copy["a"][0] is data["a"][0]
+    spans = pyben.loads(pyben.dumps(data), spans=True)
+    copy = copy_tree(spans)
+    assert copy.__class__ is SpanDict and copy["a"].__class__ is SpanList
+    assert (copy.source, copy.end, copy.dirty) == (spans.source, 18, False)
+    assert copy["a"] is not spans["a"]
+
+
+def test_freeze():
+    """Test freeze makes read-only copies of every container."""
+    data = {"a": [b"x", {"b": 1}]}
+    frozen = freeze(data)
+    assert frozen == data and frozen["a"][0] is data["a"][0]
+    assert isinstance(frozen["a"][1], dict)
+    with pytest.raises(TypeError):
+        frozen["a"][1]["c"] = 2
+    with pytest.raises(TypeError):
+        frozen["a"] += [1]
+    assert freeze(b"x") == b"x"
+
+
+def test_cache_bad_mode():
+    """Test an unknown mode is rejected."""
+    with pytest.raises(ValueError):
+        DecodeCache(mode="frozen")
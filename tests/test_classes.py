@@ -30,11 +30,14 @@ Example of single file .torrent metadata:
 
 """
 
+import array
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 
-from pyben.classes import Bendecoder, Benencoder
+from pyben.classes import Bendecoder, Benencoder, CoderPool
 from pyben.exceptions import DecodeError, EncodeError
 from tests.context import (data, dicts, ints, lists, rmpath, strings, testfile,
                            testmeta)
@@ -228,3 +231,103 @@ def test_decoder_bits(decoded, encoded):
     decoder = Bendecoder(encoded)
     lst = decoder.decode()
     assert decoded == lst
+
+
+def test_encode_buffer_protocol():
+    """Test encoding buffer-protocol objects with the Benencoder."""
+    buffer = array.array("H", [0x6261, 0x6463])
+    assert Benencoder().encode([buffer]) == b"l4:abcde"
+
+
+def test_encoder_fragment_cache():
+    """Test the Benencoder caches short strings and small ints."""
+    Benencoder.str_cache.clear()
+    hits = Benencoder.str_cache.hits
+    assert Benencoder().encode({"peers": 1}) == b"d5:peersi1ee"
+    assert Benencoder.str_cache.hits == hits + 1
+
+
+def test_shared_instances_threads():
+    """Test one decoder and encoder shared by many threads."""
+    decoder, encoder = Bendecoder(), Benencoder()
+    values = [{"id": num, "list": [num] * num} for num in range(200)]
+
+    def roundtrip(value):
+        return decoder.decode(encoder.encode(value))
+
+    with ThreadPoolExecutor(8) as pool:
+        assert list(pool.map(roundtrip, values)) == values
+    assert not hasattr(decoder, "decoded")
+    assert not hasattr(encoder, "encoded")
+
+
+def test_coder_pool_reuses_instances():
+    """Test the pool hands out at most `size` instances."""
+    pool = CoderPool(Bendecoder, size=2)
+    with pool.acquire() as first:
+        with pool.acquire() as second:
+            assert first is not second
+    with pool.acquire() as third:
+        assert third in (first, second)
+    assert pool.created == 2
+    assert pool.decode(b"li1ee") == [1]
+
+
+def test_coder_pool_blocks_when_exhausted():
+    """Test callers wait for an instance once the pool is full."""
+    pool = CoderPool(Benencoder, size=1)
+    results = []
+
+    def worker():
+        results.append(pool.encode([1]))
+
+    with pool.acquire():
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join(0.1)
+        assert not results
+    thread.join()
+    assert results == [b"li1ee"]
+    assert pool.created == 1
+
+
+def test_coder_pool_factory_failure():
+    """Test failed constructions do not use up the pool."""
+    calls = []
+
+    def factory():
+        calls.append(None)
+        if len(calls) <= 2:
+            raise ValueError("not yet")
+        return Bendecoder()
+
+    pool = CoderPool(factory, size=1)
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            pool.decode(b"i1e")
+    assert pool.created == 0
+    assert pool.decode(b"i1e") == 1
+    assert pool.created == 1
+
+
+def test_coder_pool_factory_kwargs():
+    """Test keyword arguments configure pooled instances."""
+    pool = CoderPool(Benencoder, data={"a": 1})
+    with pool.acquire() as encoder:
+        assert encoder.encode() == b"d1:ai1ee"
+
+
+def test_bendecoder_hooks(tmp_path):
+    """Test decoder hooks on instances and class shortcuts."""
+    data = b"d1:ai1e1:bdee"
+    decoder = Bendecoder(data, object_hook=sorted)
+    assert decoder.decode() == ["a", "b"]
+    assert Bendecoder.loads(data, object_pairs_hook=tuple) == (
+        ("a", 1),
+        ("b", ()),
+    )
+    path = tmp_path / "data.bencode"
+    path.write_bytes(data)
+    assert Bendecoder.load(str(path), object_hook=len) == 2
+    pool = CoderPool(Bendecoder, object_pairs_hook=list)
+    assert pool.decode(data) == [("a", 1), ("b", [])]
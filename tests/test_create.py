@@ -0,0 +1,213 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""Testing functions for Pyben create module."""
+
+import hashlib
+import os
+from io import BytesIO
+
+import pytest
+
+import pyben
+from pyben.create import make_torrent, piece_length_for
+from pyben.exceptions import FilePathError
+from pyben.sinks import HashSink
+from pyben.torrent import Metainfo
+from pyben.verify import verify
+from tests import context
+
+PIECE = 1 << 15
+FILES = {"b/y.bin": 30000, "a.bin": 70000, "b/e.bin": 0, "c.bin": 5}
+
+
+def pieces(stream: bytes) -> bytes:
+    """Hash a v1 piece stream."""
+    return b"".join(
+        hashlib.sha1(stream[start:start + PIECE]).digest()
+        for start in range(0, len(stream), PIECE)
+    )
+
+
+def test_v1(tmp_path):
+    """Test v1 pieces span the sorted files."""
+    contents = context.payload(tmp_path, FILES)
+    meta = make_torrent(tmp_path / "payload", piece_length=PIECE, workers=2)
+    info = meta["info"]
+    order = ["a.bin", "b/e.bin", "b/y.bin", "c.bin"]
+    assert [entry["path"] for entry in info["files"]] == [
+        name.split("/") for name in order
+    ]
+    assert info["pieces"] == pieces(b"".join(contents[n] for n in order))
+    assert "file tree" not in info and "piece layers" not in meta
+    assert verify(meta, tmp_path).complete
+
+
+@pytest.mark.parametrize("version", [2, "hybrid"])
+def test_v2(tmp_path, version):
+    """Test v2 and hybrid torrents verify against the payload."""
+    contents = context.payload(tmp_path, FILES)
+    meta = make_torrent(
+        str(tmp_path / "payload"), piece_length=PIECE, version=version
+    )
+    info = meta["info"]
+    assert info["meta version"] == 2
+    node = info["file tree"]["a.bin"][""]
+    assert node["length"] == 70000
+    assert len(meta["piece layers"][node["pieces root"]]) == 3 * 32
+    assert "pieces root" not in info["file tree"]["b"]["e.bin"][""]
+    result = verify(meta, tmp_path)
+    assert (result.verified, result.pieces) == (5, 5)
+    if version == 2:
+        assert "pieces" not in info
+        return
+    assert [entry.get("attr") for entry in info["files"]] == [
+        None,
+        "p",
+        None,
+        None,
+        "p",
+        None,
+    ]
+    gap = -70000 % PIECE
+    stream = b"".join(
+        [
+            contents["a.bin"],
+            bytes(gap),
+            contents["b/y.bin"],
+            bytes(PIECE - 30000),
+            contents["c.bin"],
+        ]
+    )
+    assert info["pieces"] == pieces(stream)
+    del info["pieces"]
+    assert verify(meta, tmp_path).complete
+
+
+def test_single_file(tmp_path):
+    """Test a single file makes a single file torrent."""
+    data = os.urandom(PIECE * 2 + 3)
+    (tmp_path / "one.iso").write_bytes(data)
+    meta = make_torrent(tmp_path / "one.iso", version="hybrid")
+    info = meta["info"]
+    assert info["name"] == "one.iso" and info["length"] == len(data)
+    assert list(info["file tree"]) == ["one.iso"]
+    assert verify(meta, tmp_path).complete
+    del info["pieces"]
+    assert verify(meta, tmp_path).complete
+
+
+def test_dump(tmp_path):
+    """Test the torrent is streamed to `out` with the tapped info hash."""
+    context.payload(tmp_path, FILES)
+    out, hasher = BytesIO(), HashSink("sha1", "sha256")
+    meta = make_torrent(
+        tmp_path / "payload",
+        out,
+        version="hybrid",
+        announce=[["http://a/announce"], ["udp://b:80"]],
+        comment="test",
+        private=True,
+        source="src",
+        taps={"info": hasher},
+    )
+    assert pyben.loads(out.getvalue()) == meta
+    saved = Metainfo(out.getvalue())
+    assert saved.infohash == hasher.digests()["sha1"]
+    assert saved.infohash_v2 == hasher.digests()["sha256"]
+    assert saved.trackers == ("http://a/announce", "udp://b:80")
+    assert meta["info"]["private"] == 1 and meta["info"]["source"] == "src"
+    assert meta["info"]["piece length"] == piece_length_for(100005)
+
+
+def canonical(value):
+    """Return `value` with the keys of every dict sorted."""
+    if isinstance(value, dict):
+        return {key: canonical(value[key]) for key in sorted(value)}
+    if isinstance(value, list):
+        return [canonical(item) for item in value]
+    return value
+
+
+@pytest.mark.parametrize("version", [1, 2, "hybrid"])
+def test_canonical(tmp_path, version):
+    """Test the metainfo is encoded with sorted keys."""
+    context.payload(tmp_path, FILES)
+    meta = make_torrent(
+        tmp_path / "payload",
+        piece_length=PIECE,
+        version=version,
+        announce="http://a/announce",
+        private=True,
+    )
+    assert pyben.dumps(meta) == pyben.dumps(canonical(meta))
+
+
+def test_several_paths(tmp_path):
+    """Test several paths are shared under one name."""
+    context.payload(tmp_path, FILES)
+    paths = [tmp_path / "payload" / "b", tmp_path / "payload" / "c.bin"]
+    with pytest.raises(ValueError):
+        make_torrent(paths)
+    meta = make_torrent(paths, name="payload")
+    assert [entry["path"] for entry in meta["info"]["files"]] == [
+        ["b", "e.bin"],
+        ["b", "y.bin"],
+        ["c.bin"],
+    ]
+    os.rename(tmp_path / "payload" / "a.bin", tmp_path / "a.bin")
+    assert verify(meta, tmp_path).complete
+
+
+@pytest.mark.parametrize(
+    "announce, tiers",
+    [
+        (["http://a", "http://b"], [["http://a", "http://b"]]),
+        ((["http://a"], ("http://b",)), [["http://a"], ["http://b"]]),
+    ],
+)
+def test_announce_tiers(tmp_path, announce, tiers):
+    """Test a flat list of urls is one tier."""
+    context.payload(tmp_path, FILES)
+    meta = make_torrent(tmp_path / "payload", announce=announce)
+    assert meta["announce"] == "http://a"
+    assert meta["announce-list"] == tiers
+
+
+@pytest.mark.parametrize("announce", [["http://a", ["x"]], [[]], [[1]]])
+def test_announce_invalid(tmp_path, announce):
+    """Test malformed announce tiers are rejected."""
+    context.payload(tmp_path, FILES)
+    with pytest.raises(ValueError):
+        make_torrent(tmp_path / "payload", announce=announce)
+
+
+def test_piece_length_for():
+    """Test automatic piece lengths are clamped powers of two."""
+    assert piece_length_for(0) == 1 << 14
+    assert piece_length_for(1 << 30) == 1 << 20
+    assert piece_length_for(1 << 50) == 1 << 24
+
+
+def test_errors(tmp_path):
+    """Test invalid arguments are rejected."""
+    context.payload(tmp_path, FILES)
+    with pytest.raises(ValueError):
+        make_torrent(tmp_path / "payload", version=3)
+    with pytest.raises(ValueError):
+        make_torrent(tmp_path / "payload", piece_length=3 << 14)
+    with pytest.raises(FilePathError):
+        make_torrent(tmp_path / "missing")
+    (tmp_path / "empty").mkdir()
+    with pytest.raises(ValueError):
+        make_torrent(tmp_path / "empty")
@@ -0,0 +1,165 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""Testing functions for Pyben diskcache module."""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import pyben
+from pyben.classes import Bendecoder
+from pyben.diskcache import DiskCache
+from tests import context
+
+
+@pytest.fixture
+def torrent(tmp_path):
+    """Pytest Fixture providing the path to a torrent file."""
+    path = str(tmp_path / "meta.torrent")
+    pyben.dump(context.testmeta(), path)
+    return path
+
+
+@pytest.mark.parametrize("key", ["stat", "content"])
+def test_diskcache_warm_start(tmp_path, torrent, key):
+    """Test a new cache on the same directory skips decoding."""
+    directory = tmp_path / "cache"
+    cold = DiskCache(directory, key=key)
+    assert pyben.load(torrent, cache=cold) == context.testmeta()
+    warm = DiskCache(directory, key=key)
+    calls = []
+    result = warm.get(torrent, calls.append, variant=(False, False))
+    assert result == context.testmeta()
+    assert not calls
+    assert warm.stats()["hits"] == 1
+
+
+def test_diskcache_variants(tmp_path, torrent):
+    """Test different decodings of one file are stored separately."""
+    cache = DiskCache(tmp_path / "cache")
+    pyben.load(torrent, cache=cache)
+    pyben.load(torrent, to_json=True, cache=cache)
+    Bendecoder.load(torrent, cache=cache)
+    assert cache.stats()["size"] == 3
+
+
+def tag(obj):
+    """Mark a decoded dictionary, used as a module level hook."""
+    obj["tagged"] = 1
+    return obj
+
+
+def test_diskcache_named_hook(tmp_path, torrent):
+    """Test decodings with module level hooks are reused across caches."""
+    directory = tmp_path / "cache"
+    cold = DiskCache(directory)
+    result = pyben.load(torrent, cache=cold, object_hook=tag)
+    assert result["tagged"] == 1
+    warm = DiskCache(directory)
+    assert pyben.load(torrent, cache=warm, object_hook=tag) == result
+    assert warm.stats()["hits"] == 1
+
+
+def test_diskcache_anonymous_hook(tmp_path, torrent):
+    """Test decodings with unnamed hooks are not persisted."""
+    cache = DiskCache(tmp_path / "cache")
+    for _ in range(2):
+        result = pyben.load(torrent, cache=cache, object_hook=lambda d: d)
+        assert result == context.testmeta()
+    assert cache.key(torrent, (False, lambda: None)) is None
+    assert cache.stats()["size"] == 0
+    assert cache.stats()["misses"] == 2
+
+
+def test_diskcache_invalidated_on_change(tmp_path, torrent):
+    """Test a modified file misses the cache."""
+    cache = DiskCache(tmp_path / "cache")
+    pyben.load(torrent, cache=cache)
+    pyben.dump({"changed": 1}, torrent)
+    stat = os.stat(torrent)
+    os.utime(torrent, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert pyben.load(torrent, cache=cache) == {"changed": 1}
+    assert cache.stats()["misses"] == 2
+
+
+def test_diskcache_corrupt_entry(tmp_path, torrent):
+    """Test unreadable entries are discarded and rebuilt."""
+    cache = DiskCache(tmp_path / "cache")
+    pyben.load(torrent, cache=cache)
+    for name in os.listdir(cache.directory):
+        with open(os.path.join(cache.directory, name), "r+b") as _fd:
+            _fd.truncate(10)
+    assert pyben.load(torrent, cache=cache) == context.testmeta()
+    assert cache.stats()["errors"] == 1
+    assert pyben.load(torrent, cache=cache) == context.testmeta()
+    assert cache.hits == 1
+
+
+def test_diskcache_version_mismatch(tmp_path, torrent):
+    """Test entries written by another format version are ignored."""
+    cache = DiskCache(tmp_path / "cache")
+    pyben.load(torrent, cache=cache)
+    for name in os.listdir(cache.directory):
+        with open(os.path.join(cache.directory, name), "r+b") as _fd:
+            _fd.seek(4)
+            _fd.write(b"\xff\xff")
+    pyben.load(torrent, cache=cache)
+    assert (cache.hits, cache.errors) == (0, 1)
+
+
+def test_diskcache_prune(tmp_path):
+    """Test the oldest entries are evicted above the size limit."""
+    cache = DiskCache(tmp_path / "cache", maxbytes=1 << 20)
+    for num in range(5):
+        path = str(tmp_path / f"{num}.torrent")
+        pyben.dump({"num": num, "pad": b"x" * 1000}, path)
+        pyben.load(path, cache=cache)
+        entry = max(cache._entries())[2]
+        os.utime(entry, ns=(num, num))
+    assert cache.stats()["size"] == 5
+    entry_size = cache.size() // 5
+    assert cache.prune(entry_size * 2) == 3
+    assert cache.stats()["size"] == 2
+    cache.clear()
+    assert cache.stats()["size"] == 0
+
+
+def test_diskcache_unmarshallable(tmp_path, torrent):
+    """Test values marshal cannot store are returned but not cached."""
+    cache = DiskCache(tmp_path / "cache")
+    result = pyben.load(torrent, spans=True, cache=cache)
+    assert result == context.testmeta()
+    assert cache.stats()["size"] == 0
+
+
+def test_diskcache_concurrent_writers(tmp_path, torrent):
+    """Test many writers sharing one directory."""
+    directory = tmp_path / "cache"
+
+    def load(_):
+        return pyben.load(torrent, cache=DiskCache(directory))
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(load, range(32)))
+    assert all(result == context.testmeta() for result in results)
+    names = os.listdir(directory)
+    assert len(names) == 1
+    assert names[0].endswith(".pybc")
+
+
+def test_diskcache_bad_key(tmp_path):
+    """Test an unknown key type is rejected."""
+    with pytest.raises(ValueError):
+        DiskCache(tmp_path, key="name")
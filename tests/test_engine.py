@@ -0,0 +1,137 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""Differential tests of the function and class front ends."""
+
+import random
+
+import pytest
+
+from pyben.bencode import bendecode, benencode
+from pyben.classes import Bendecoder, Benencoder
+from pyben.core import decode, encode
+from pyben.exceptions import DecodeError
+from tests import context
+
+
+def make_value(rng, depth=0):
+    """Build a random bencodable value."""
+    kind = rng.randrange(6 if depth < 4 else 3)
+    if kind == 0:
+        return rng.randrange(-(10**12), 10**12)
+    if kind == 1:
+        size = rng.randrange(9)
+        return "".join(rng.choice("abcé丂 :e") for _ in range(size))
+    if kind == 2:
+        return rng.randbytes(rng.randrange(40))
+    if kind == 3:
+        return [make_value(rng, depth + 1) for _ in range(rng.randrange(5))]
+    return {
+        f"k{rng.randrange(100)}": make_value(rng, depth + 1)
+        for _ in range(rng.randrange(5))
+    }
+
+
+def corpus():
+    """Return the shared test data plus random values."""
+    rng = random.Random(1729)
+    values = [decoded for decoded, _ in context.data()]
+    values.append(context.testmeta())
+    values.extend(make_value(rng) for _ in range(300))
+    return values
+
+
+@pytest.mark.parametrize("value", corpus())
+def test_front_ends_agree(value):
+    """Test both front ends encode and decode identically."""
+    encoded = benencode(value)
+    assert Benencoder().encode(value) == encoded
+    assert Benencoder.dumps(value) == encoded
+    decoded, end = bendecode(encoded)
+    assert end == len(encoded)
+    assert Bendecoder().decode(encoded) == decoded
+    assert Bendecoder.loads(encoded) == decoded
+    assert benencode(decoded) == encoded
+
+
+def test_unicode_byte_length():
+    """Test the class encoder uses the utf-8 byte length of strings."""
+    text = "丂七丆"
+    assert Benencoder().encode(text) == b"9:" + text.encode("utf-8")
+    assert Benencoder().encode(text) == benencode(text)
+
+
+def test_decode_offset():
+    """Test decoding a value in the middle of a buffer."""
+    assert decode(b"xxli1e3:abce", 2) == ([1, "abc"], 12)
+
+
+def test_decode_deep_nesting():
+    """Test deep nesting never hits the recursion limit."""
+    depth = 100000
+    value, end = decode(b"l" * depth + b"e" * depth)
+    assert end == 2 * depth
+    for _ in range(depth - 1):
+        value = value[0]
+    assert value == []
+
+
+def test_decode_bytes_like():
+    """Test decoding memoryview and bytearray input."""
+    assert decode(memoryview(b"d1:a2:\xff\xffe")) == ({"a": b"\xff\xff"}, 9)
+    assert decode(bytearray(b"3:abc")) == ("abc", 5)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [b"", b"i12", b"ie", b"5:abc", b"li1e", b"d1:ae", b"dli1ee1:ae", b"x"],
+)
+def test_decode_errors(data):
+    """Test malformed data raises DecodeError in both front ends."""
+    with pytest.raises(DecodeError):
+        bendecode(data)
+    with pytest.raises(DecodeError):
+        Bendecoder().decode(data)
+
+
+def test_object_pairs_hook_keeps_duplicates():
+    """Test pairs hooks see members in order, duplicates included."""
+    data = b"d1:bi1e1:ai2e1:bd1:cdeee"
+    value, end = decode(data, object_pairs_hook=tuple)
+    assert value == (("b", 1), ("a", 2), ("b", (("c", ()),)))
+    assert end == len(data)
+
+
+def test_object_hook_innermost_first():
+    """Test object hooks replace dicts bottom up and skip lists."""
+    seen = []
+
+    def hook(obj):
+        seen.append(dict(obj))
+        return len(obj)
+
+    value, _ = decode(b"d1:ald1:xi1eee1:bdee", object_hook=hook)
+    assert value == 2
+    assert seen == [{"x": 1}, {}, {"a": [1], "b": 0}]
+
+
+def test_hooks_match_front_ends():
+    """Test hooks give the same results through every front end."""
+    rng = random.Random(7)
+    for _ in range(50):
+        value = make_value(rng)
+        data = encode(value)
+        expected = decode(data, object_pairs_hook=list)[0]
+        decoder = Bendecoder(object_pairs_hook=list)
+        assert decoder.decode(data) == expected
+        assert Bendecoder.loads(data, object_pairs_hook=list) == expected
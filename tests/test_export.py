@@ -0,0 +1,145 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""Testing functions for Pyben export module."""
+
+import hashlib
+import io
+import json
+from array import array
+
+import pytest
+
+import pyben
+from pyben import export
+from tests import context
+
+
+@pytest.fixture
+def torrents(tmp_path):
+    """Pytest Fixture providing torrent files with multiple layouts."""
+    paths = []
+    for num in range(12):
+        meta = context.testmeta()
+        info = meta["info"]
+        info["pieces"] = bytes([200 + num]) * 20 * (num + 1)
+        if num % 2:
+            del info["length"]
+            info["files"] = [{"length": num, "path": ["a"]}] * num
+        else:
+            info["length"] = num * 1000
+        path = tmp_path / f"{num}.torrent"
+        pyben.dump(meta, path)
+        paths.append(str(path))
+    return paths
+
+
+def test_export_ndjson(torrents, tmp_path):
+    """Test every torrent becomes one JSON line."""
+    out = tmp_path / "out.ndjson"
+    assert pyben.export_ndjson(torrents, str(out), workers=2) == 12
+    lines = out.read_text(encoding="utf-8").splitlines()
+    for path, line in zip(torrents, lines):
+        meta = pyben.load(path, to_json=True)
+        assert json.loads(line) == {"path": path, "meta": meta}
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_export_ndjson_fields(torrents, tmp_path, executor):
+    """Test selected fields and errors in NDJSON output."""
+    missing = str(tmp_path / "missing.torrent")
+    out = io.StringIO()
+    count = pyben.export_ndjson(
+        torrents + [missing],
+        out,
+        fields=["name", "infohash", "piece_count"],
+        executor=executor,
+        chunksize=5,
+    )
+    assert count == 13
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    raw = pyben.load(torrents[3])
+    digest = hashlib.sha1(pyben.dumps(raw["info"])).hexdigest()
+    assert records[3] == {
+        "path": torrents[3],
+        "name": "ubuntu.iso",
+        "infohash": digest,
+        "piece_count": 4,
+    }
+    assert records[-1]["path"] == missing
+    assert "FilePathError" in records[-1]["error"]
+
+
+def test_export_columns_array(torrents):
+    """Test columns without NumPy use array.array."""
+    cols = pyben.export_columns(torrents, workers=3, use_numpy=False)
+    assert cols["path"] == torrents
+    assert isinstance(cols["total_length"], array)
+    assert list(cols["total_length"]) == [
+        num * num if num % 2 else num * 1000 for num in range(12)
+    ]
+    counts = [num if num % 2 else 1 for num in range(12)]
+    assert list(cols["file_count"]) == counts
+    assert list(cols["piece_count"]) == list(range(1, 13))
+    assert all(len(digest) == 20 for digest in cols["infohash"])
+
+
+def test_export_columns_errors(torrents, tmp_path):
+    """Test failures are raised or collected."""
+    missing = str(tmp_path / "missing.torrent")
+    with pytest.raises(pyben.FilePathError):
+        pyben.export_columns([missing], use_numpy=False)
+    errors = []
+    cols = pyben.export_columns(
+        [missing] + torrents, ["private"], use_numpy=False, errors=errors
+    )
+    assert errors[0][0] == missing
+    assert cols["path"] == torrents
+    assert list(cols["private"]) == [1] * 12
+    with pytest.raises(KeyError):
+        pyben.export_columns(torrents, ["unknown"])
+
+
+def test_export_columns_numpy(torrents):
+    """Test columns with NumPy."""
+    numpy = pytest.importorskip("numpy")
+    cols = pyben.export_columns(torrents, use_numpy=True)
+    assert cols["total_length"].dtype == numpy.int64
+    assert cols["infohash"].dtype == numpy.dtype("V20")
+    for path, digest in zip(cols["path"], cols["infohash"]):
+        info = pyben.dumps(pyben.load(path)["info"])
+        assert bytes(digest) == hashlib.sha1(info).digest()
+
+
+def test_export_digest_trailing_nul():
+    """Test digests ending in NUL bytes keep their length."""
+    numpy = pytest.importorskip("numpy")
+    digest = b"\xaa" * 18 + b"\0\0"
+    column = export._column("bytes", [digest, b"\0" * 20], numpy)
+    assert [bytes(item) for item in column] == [digest, b"\0" * 20]
+
+
+def test_export_skips_padding_files(tmp_path):
+    """Test padding files of hybrid torrents are not counted."""
+    (tmp_path / "payload").mkdir()
+    (tmp_path / "payload" / "a.bin").write_bytes(bytes(100000))
+    (tmp_path / "payload" / "b.bin").write_bytes(bytes(50000))
+    path = str(tmp_path / "hybrid.torrent")
+    pyben.make_torrent(
+        tmp_path / "payload", path, piece_length=1 << 15, version="hybrid"
+    )
+    cols = pyben.export_columns(
+        [path], ["total_length", "file_count"], use_numpy=False
+    )
+    assert list(cols["total_length"]) == [150000]
+    assert list(cols["file_count"]) == [2]
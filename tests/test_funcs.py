@@ -13,12 +13,14 @@
 #####################################################################
 """Pytest tests for functions in pyben package."""
 
+import array
+
 import pytest
 
-from pyben.bencode import (bencode_dict, bencode_int, bencode_list,
-                           bencode_str, bendecode, bendecode_dict,
-                           bendecode_int, bendecode_list, bendecode_str,
-                           benencode)
+from pyben.bencode import (FragmentCache, bencode_dict, bencode_int,
+                           bencode_list, bencode_str, bendecode,
+                           bendecode_dict, bendecode_int, bendecode_list,
+                           bendecode_str, benencode, cache_clear, cache_info)
 from pyben.exceptions import DecodeError, EncodeError
 from tests import context
 
@@ -179,3 +181,79 @@ def test_decode_unicode():
     data = benencode(text)
     result, _ = bendecode(data)
     assert result == text
+
+
+@pytest.mark.parametrize(
+    "buffer",
+    [
+        memoryview(b"abcdefgh"),
+        bytearray(b"abcdefgh"),
+        array.array("B", b"abcdefgh"),
+        array.array("I", b"abcdefgh"),
+        memoryview(b"abcdefgh").cast("H"),
+    ],
+)
+def test_bencode_buffer_protocol(buffer):
+    """Test encoding buffer-protocol objects as byte strings."""
+    assert benencode(buffer) == b"8:abcdefgh"
+    assert benencode([buffer]) == b"l8:abcdefghe"
+
+
+def test_bencode_buffer_non_contiguous():
+    """Test encoding a non-contiguous buffer."""
+    view = memoryview(b"aXbXcX")[::2]
+    assert benencode(view) == b"3:abc"
+
+
+def test_bencode_numpy_array():
+    """Test encoding NumPy arrays as byte strings."""
+    numpy = pytest.importorskip("numpy")
+    arr = numpy.arange(4, dtype=numpy.uint32)
+    assert benencode({"pieces": arr}) == (
+        b"d6:pieces16:" + arr.tobytes() + b"e"
+    )
+
+
+def test_bencode_float_error():
+    """Test floats are rejected rather than treated as bytes."""
+    with pytest.raises(EncodeError):
+        benencode(1.5)
+
+
+def test_fragment_cache_hits():
+    """Test common keys and small ints are served from the caches."""
+    cache_clear()
+    reply = {"interval": 1800, "complete": 0, "incomplete": 3, "peers": b""}
+    assert benencode(reply) == (
+        b"d8:intervali1800e8:completei0e10:incompletei3e5:peers0:e"
+    )
+    benencode(reply)
+    info = cache_info()
+    assert info["str"]["hits"] == 8
+    assert info["int"]["hits"] == 5
+    assert info["int"]["misses"] == 1
+    assert 0 < info["int"]["hit_rate"] < 1
+
+
+def test_fragment_cache_exact_types():
+    """Test bools and str subclasses never share int/str cache entries."""
+
+    class Text(str):
+        """String subclass."""
+
+    cache_clear()
+    assert benencode(1) == b"i1e"
+    assert benencode(True) == bencode_int(True)
+    assert benencode(Text("id")) == b"2:id"
+    assert cache_info()["str"]["hits"] == 0
+
+
+def test_fragment_cache_bounded():
+    """Test the caches never grow past maxsize or cache large values."""
+    cache = FragmentCache(bencode_int, int, 100, maxsize=8, preload=[0])
+    for num in range(50):
+        assert cache(num) == bencode_int(num)
+    assert len(cache.table) <= 8
+    assert 0 in cache.table
+    cache(10**6)
+    assert 10**6 not in cache.table
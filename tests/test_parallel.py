@@ -0,0 +1,136 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""Testing functions for Pyben parallel module."""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import pyben
+from tests import context
+
+
+@pytest.fixture
+def torrents(tmp_path):
+    """Pytest Fixture providing a directory of torrent files."""
+    paths = []
+    for num in range(40):
+        meta = context.testmeta()
+        meta["info"]["length"] = num
+        path = tmp_path / f"{num}.torrent"
+        pyben.dump(meta, path)
+        paths.append(str(path))
+    return paths
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_load_many_ordered(torrents, executor):
+    """Test results come back in input order."""
+    results = list(
+        pyben.load_many(torrents, workers=2, executor=executor, chunksize=3)
+    )
+    assert [path for path, _ in results] == torrents
+    assert [meta["info"]["length"] for _, meta in results] == list(range(40))
+
+
+def test_load_many_unordered(torrents):
+    """Test unordered results cover every path."""
+    results = dict(
+        pyben.load_many(iter(torrents), workers=4, ordered=False, chunksize=1)
+    )
+    assert sorted(results) == sorted(torrents)
+    assert all(isinstance(meta, dict) for meta in results.values())
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_load_many_errors(torrents, tmp_path, executor):
+    """Test errors are returned next to their path."""
+    missing = str(tmp_path / "missing.torrent")
+    paths = [torrents[0], missing]
+    results = dict(pyben.load_many(paths, workers=2, executor=executor))
+    assert isinstance(results[missing], pyben.FilePathError)
+    assert str(results[missing]) == str(pyben.FilePathError(missing))
+    assert isinstance(results[torrents[0]], dict)
+
+
+def test_load_many_executor_instance(torrents):
+    """Test an existing executor is used and left running."""
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = list(pyben.load_many(torrents, executor=pool, backlog=1))
+        assert len(results) == len(torrents)
+        assert pool.submit(sum, [1, 2]).result() == 3
+
+
+def test_load_many_unknown_option(torrents):
+    """Test misspelled options are rejected instead of ignored."""
+    with pytest.raises(TypeError):
+        pyben.load_many(torrents, chunk_size=7)
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Pytest Fixture providing a nested torrent store."""
+    for num in range(12):
+        folder = tmp_path / f"shard{num % 3}" / f"sub{num % 2}"
+        folder.mkdir(parents=True, exist_ok=True)
+        meta = context.testmeta()
+        meta["info"]["length"] = num
+        pyben.dump(meta, folder / f"{num}.torrent")
+    (tmp_path / "notes.txt").write_text("not a torrent")
+    (tmp_path / "broken.torrent").write_bytes(b"d4:spam")
+    return tmp_path
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_scan_recursive(store, executor):
+    """Test scanning a nested directory."""
+    records = list(pyben.scan(store, workers=2, executor=executor))
+    assert len(records) == 13
+    lengths = sorted(
+        meta["info"]["length"]
+        for _, _, meta in records
+        if isinstance(meta, dict)
+    )
+    assert lengths == list(range(12))
+    for path, stat, _ in records:
+        assert stat.st_size == os.path.getsize(path)
+
+
+def test_scan_errors(store):
+    """Test malformed files are yielded with their exception."""
+    records = {path: meta for path, _, meta in pyben.scan(store)}
+    broken = str(store / "broken.torrent")
+    assert isinstance(records[broken], Exception)
+
+
+def test_scan_flat_pattern(store):
+    """Test non recursive scanning with a pattern."""
+    records = list(pyben.scan(store, pattern="*.txt", recursive=False))
+    assert len(records) == 1
+    assert records[0][0].endswith("notes.txt")
+
+
+def test_scan_fields(store):
+    """Test selecting fields from every decoded file."""
+    fields = ["announce", ("info", "length"), ("info", "missing")]
+    for path, _, meta in pyben.scan(store / "shard0", fields=fields):
+        assert set(meta) == {"announce", ("info", "length")}
+        assert path.endswith(f"{meta[('info', 'length')]}.torrent")
+
+
+def test_scan_unknown_option(store):
+    """Test a misspelled scan option is rejected."""
+    with pytest.raises(TypeError):
+        list(pyben.scan(store, field=["info"]))
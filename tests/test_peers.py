@@ -0,0 +1,111 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""Testing functions for Pyben peers module."""
+
+from functools import partial
+
+import pytest
+
+import pyben
+from pyben.exceptions import DecodeError, EncodeError
+from pyben.peers import (compact_array, compact_hook, pack_compact,
+                         unpack_compact)
+
+NODE = bytes(range(20))
+
+CASES = [
+    ("peers", [("10.0.0.1", 6881), ("255.1.2.3", 80)]),
+    ("peers6", [("2001:db8::1", 51413), ("::1", 1)]),
+    ("nodes", [(NODE, "192.168.1.9", 6881), (NODE[::-1], "1.2.3.4", 0)]),
+    ("nodes6", [(NODE, "fe80::2", 65535)]),
+]
+
+
+@pytest.mark.parametrize("kind, items", CASES)
+def test_roundtrip(kind, items):
+    """Test packing and unpacking every kind of compact list."""
+    data = pack_compact(items, kind)
+    assert unpack_compact(data, kind) == items
+    raw = unpack_compact(data, kind, text=False)
+    assert pack_compact(raw, kind) == data
+
+
+def test_layout():
+    """Test the packed layout of peers and nodes."""
+    assert pack_compact([("1.2.3.4", 0x1AE1)]) == b"\x01\x02\x03\x04\x1a\xe1"
+    data = pack_compact([(NODE, b"\x7f\0\0\1", 80)], "nodes")
+    assert data == NODE + b"\x7f\0\0\1\0P"
+    assert unpack_compact(b"") == []
+
+
+def test_errors():
+    """Test malformed lists and records are rejected."""
+    with pytest.raises(DecodeError):
+        unpack_compact(b"\x01\x02\x03\x04\x1a")
+    with pytest.raises(ValueError):
+        unpack_compact(b"", "peers4")
+    with pytest.raises(EncodeError):
+        pack_compact([("1.2.3", 80)])
+    with pytest.raises(EncodeError):
+        pack_compact([("1.2.3.4", 1 << 16)])
+    with pytest.raises(EncodeError):
+        pack_compact([("1.2.3.4",)])
+
+
+def test_hook():
+    """Test the decode hook unpacks tracker and DHT replies."""
+    peers = [("10.0.0.1", 6881), ("10.0.0.2", 6882)]
+    reply = {
+        "interval": 1800,
+        "peers": pack_compact(peers),
+        "peers6": pack_compact([("::1", 80)], "peers6"),
+    }
+    decoded = pyben.loads(pyben.dumps(reply), object_hook=compact_hook)
+    assert decoded == {**reply, "peers": peers, "peers6": [("::1", 80)]}
+    dht = {
+        "r": {
+            "id": NODE,
+            "nodes": pack_compact([(NODE, "1.2.3.4", 5)], "nodes"),
+            "values": [pack_compact([peer]) for peer in peers]
+            + [pack_compact([("::1", 80)], "peers6")],
+        },
+        "t": b"aa",
+        "y": "r",
+    }
+    hook = partial(compact_hook, text=False)
+    decoded = pyben.loads(pyben.dumps(dht), object_hook=hook)["r"]
+    assert decoded["nodes"] == [(NODE, b"\1\2\3\4", 5)]
+    assert decoded["values"][0] == (b"\n\0\0\1", 6881)
+    assert decoded["values"][2] == (b"\0" * 15 + b"\1", 80)
+
+
+def test_hook_leaves_other_members():
+    """Test non-compact peer lists are left unchanged."""
+    reply = {"peers": [{"ip": "1.2.3.4", "port": 80}], "values": [b"x"]}
+    assert compact_hook(dict(reply)) == reply
+    text = {"peers": "AAAAAA"}
+    assert compact_hook(text) == {"peers": [("65.65.65.65", 16705)]}
+
+
+def test_array():
+    """Test NumPy structured views and packing arrays."""
+    numpy = pytest.importorskip("numpy")
+    data = pack_compact(CASES[0][1])
+    peers = compact_array(data)
+    assert peers["ip"].tolist() == [0x0A000001, 0xFF010203]
+    assert peers["port"].tolist() == [6881, 80]
+    assert pack_compact(peers) == data
+    nodes = compact_array(pack_compact(CASES[2][1], "nodes"), "nodes")
+    assert bytes(nodes["id"][1]) == NODE[::-1]
+    assert pack_compact(numpy.sort(peers, order="port")) == data[6:] + data[:6]
@@ -0,0 +1,162 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""Testing functions for Pyben recordlog module."""
+
+import os
+
+import pytest
+
+from pyben.recordlog import RecordLog
+
+
+@pytest.fixture
+def path(tmp_path):
+    """Pytest Fixture providing the path of a record log."""
+    return str(tmp_path / "resume.dat")
+
+
+def state(num: int) -> dict:
+    """Return resume state for torrent `num`."""
+    return {"uploaded": num * 1024, "bitfield": bytes([200 + num % 50]) * 8}
+
+
+def test_put_get(path):
+    """Test storing and reading records."""
+    with RecordLog(path) as log:
+        log.put("a" * 40, state(1))
+        log[b"\xaa" * 20] = state(2)
+        assert log.get("a" * 40) == state(1)
+        assert log[b"\xaa" * 20] == state(2)
+        assert log.get("missing", 0) == 0
+        assert len(log) == 2
+        assert "a" * 40 in log
+
+
+def test_reopen(path):
+    """Test records survive closing and reopening the log."""
+    with RecordLog(path) as log:
+        for num in range(100):
+            log.put(f"hash{num}", state(num))
+        log.put("hash5", {"updated": 1})
+        log.put(b"hash7", state(7))
+    with RecordLog(path) as log:
+        assert len(log) == 101
+        assert log["hash5"] == {"updated": 1}
+        assert log[b"hash7"] == state(7)
+        assert log.stale == 1
+        assert [key for key, _ in log.items()][:2] == ["hash0", "hash1"]
+
+
+def test_delete(path):
+    """Test deleted keys stay deleted after reopening."""
+    with RecordLog(path) as log:
+        log.put("a", 1)
+        log.put("b", 2)
+        del log["a"]
+        with pytest.raises(KeyError):
+            log.delete("a")
+    with RecordLog(path) as log:
+        assert log.keys() == ["b"]
+
+
+def test_compact(path):
+    """Test compaction drops stale records."""
+    with RecordLog(path) as log:
+        for num in range(50):
+            log.put("key", state(num))
+            log.put(f"other{num}", num)
+        log.delete("other0")
+        log.flush()
+        before = os.path.getsize(path)
+        log.compact()
+        assert log.stale == 0
+        assert os.path.getsize(path) < before
+        assert log["key"] == state(49)
+        assert len(log) == 50
+        log.put("after", 1)
+    with RecordLog(path) as log:
+        assert log["after"] == 1
+        assert log["other49"] == 49
+        assert "other0" not in log
+
+
+def test_recover_unindexed_records(path):
+    """Test records missing from the index are recovered."""
+    with RecordLog(path) as log:
+        log.put("a", 1)
+        log.flush()
+        size = os.path.getsize(log.index_path)
+        log.put("b", [2])
+        log.put("c", 3)
+        del log["a"]
+    os.truncate(path + ".idx", size)
+    with RecordLog(path) as log:
+        assert log.keys() == ["b", "c"]
+        assert log["b"] == [2]
+    with RecordLog(path) as log:
+        assert log.keys() == ["b", "c"]
+
+
+def test_recover_torn_record(path):
+    """Test a partially written record is truncated."""
+    with RecordLog(path) as log:
+        log.put("a", 1)
+        log.put("b", "x" * 100)
+    size = os.path.getsize(path)
+    os.truncate(path, size - 10)
+    with RecordLog(path) as log:
+        assert log.keys() == ["a"]
+        log.put("c", 3)
+    with RecordLog(path) as log:
+        assert log.keys() == ["a", "c"]
+        assert log["c"] == 3
+
+
+def test_recover_torn_index(path):
+    """Test a partially written index entry is ignored."""
+    with RecordLog(path) as log:
+        log.put("a", 1)
+        log.put("b", 2)
+    os.truncate(path + ".idx", os.path.getsize(path + ".idx") - 1)
+    with RecordLog(path) as log:
+        assert log.keys() == ["a", "b"]
+
+
+def test_index_from_other_generation(path):
+    """Test an index that does not belong to the data file is rebuilt."""
+    with RecordLog(path) as log:
+        log.put("a", 1)
+    other = path + "2"
+    with RecordLog(other) as log:
+        log.put("zzz", 9)
+    os.replace(other + ".idx", path + ".idx")
+    with RecordLog(path) as log:
+        assert log.keys() == ["a"]
+        assert log["a"] == 1
+
+
+def test_raw(path):
+    """Test reading the encoded bytes of a record."""
+    with RecordLog(path, sync=True) as log:
+        log.put("a", {"x": 1})
+        assert log.raw("a") == b"d1:xi1ee"
+
+
+def test_bad_key(path):
+    """Test only str and bytes keys are accepted."""
+    with RecordLog(path) as log:
+        with pytest.raises(TypeError):
+            log.put(1, 1)
+        with pytest.raises(TypeError):
+            log.put("a", None)
@@ -0,0 +1,272 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""Testing functions for Pyben rpc module against a loopback server."""
+
+import asyncio
+import socket
+
+import pytest
+
+import pyben
+from pyben.exceptions import RPCError
+from pyben.rpc import ClientPool, RPCClient, RPCServer, UDPClient
+
+
+def make_server():
+    """Return a server with a few test handlers."""
+    server = RPCServer()
+
+    @server.route("ping")
+    def ping(args, _):
+        return {"id": args["id"]}
+
+    @server.route("echo")
+    async def echo(args, _):
+        await asyncio.sleep(args["delay"] / 1000)
+        return args["value"]
+
+    @server.route("fail")
+    def fail(args, _):
+        raise RPCError(args.get("code", 201), "nope")
+
+    @server.route("crash")
+    def crash(*_):
+        raise ValueError("boom")
+
+    @server.route("unencodable")
+    def unencodable(*_):
+        return {1.5}
+
+    return server
+
+
+def run(coro):
+    """Run a coroutine to completion."""
+    return asyncio.run(coro)
+
+
+def test_tcp_ping():
+    """Test a single TCP query."""
+
+    async def main():
+        async with make_server() as server:
+            host, port = await server.start_tcp()
+            async with RPCClient(host, port) as client:
+                return await client.request("ping", {"id": b"\x00\x01ab"})
+
+    assert run(main()) == {"id": "\x00\x01ab"}
+
+
+def test_tcp_pipelining():
+    """Test many outstanding requests on one connection reply out of order."""
+
+    async def main():
+        async with make_server() as server:
+            host, port = await server.start_tcp()
+            async with RPCClient(host, port) as client:
+                calls = [
+                    client.request("echo", {"delay": (50 - i) % 7, "value": i})
+                    for i in range(50)
+                ]
+                return await asyncio.gather(*calls)
+
+    assert run(main()) == list(range(50))
+
+
+def test_concurrent_first_requests():
+    """Test concurrent first requests share one new connection."""
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        opened = []
+        async with make_server() as server:
+            host, port = await server.start_tcp()
+            udp = await server.start_udp()
+            for name in ("create_connection", "create_datagram_endpoint"):
+                method = getattr(loop, name)
+
+                async def counted(*args, _method=method, _name=name, **kw):
+                    opened.append(_name)
+                    await asyncio.sleep(0.01)
+                    return await _method(*args, **kw)
+
+                setattr(loop, name, counted)
+            client, dgram = RPCClient(host, port), UDPClient(("127.0.0.1", 0))
+            calls = [client.request("ping", {"id": i}) for i in range(5)]
+            calls += [dgram.request(udp, "ping", {"id": i}) for i in range(5)]
+            results = await asyncio.gather(*calls)
+            await client.close()
+            await dgram.close()
+        return sorted(opened), [result["id"] for result in results]
+
+    opened, ids = run(main())
+    assert opened == ["create_connection", "create_datagram_endpoint"]
+    assert ids == list(range(5)) * 2
+
+
+@pytest.mark.parametrize(
+    "method, code",
+    [("fail", 201), ("crash", 202), ("unencodable", 202), ("missing", 204)],
+)
+def test_tcp_errors(method, code):
+    """Test error replies raise RPCError with the KRPC code."""
+
+    async def main():
+        async with make_server() as server:
+            host, port = await server.start_tcp()
+            async with RPCClient(host, port) as client:
+                with pytest.raises(RPCError) as err:
+                    await client.request(method)
+                assert await client.request("ping", {"id": "x"}) == {"id": "x"}
+                return err.value.code
+
+    assert run(main()) == code
+
+
+def test_tcp_protocol_error():
+    """Test malformed input gets a protocol error and the socket closes."""
+
+    async def main():
+        async with make_server() as server:
+            host, port = await server.start_tcp()
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(b"x")
+            reply = await reader.read()
+            writer.close()
+            return pyben.loads(reply)
+
+    assert run(main())["e"][0] == 203
+
+
+def test_tcp_timeout():
+    """Test timeouts drop the transaction."""
+
+    async def main():
+        async with make_server() as server:
+            host, port = await server.start_tcp()
+            async with RPCClient(host, port) as client:
+                with pytest.raises(asyncio.TimeoutError):
+                    await client.request(
+                        "echo", {"delay": 200, "value": 1}, timeout=0.01
+                    )
+                return len(client.router)
+
+    assert run(main()) == 0
+
+
+def test_udp_requests():
+    """Test UDP queries and errors."""
+
+    async def main():
+        async with make_server() as server:
+            addr = await server.start_udp()
+            async with UDPClient(("127.0.0.1", 0)) as client:
+                calls = [
+                    client.request(addr, "echo", {"delay": i % 3, "value": i})
+                    for i in range(20)
+                ]
+                results = await asyncio.gather(*calls)
+                with pytest.raises(RPCError):
+                    await client.request(addr, "missing")
+                return results
+
+    assert run(main()) == list(range(20))
+
+
+def test_udp_hostname():
+    """Test replies are matched when the query was sent to a host name."""
+
+    async def main():
+        async with make_server() as server:
+            _, port = await server.start_udp()
+            async with UDPClient(("127.0.0.1", 0)) as client:
+                addr = ("localhost", port)
+                return await client.request(addr, "ping", {"id": "a"}, 2)
+
+    assert run(main()) == {"id": "a"}
+
+
+def test_clients_built_outside_loop():
+    """Test clients constructed before the event loop runs."""
+    client, dgram, pool = RPCClient("127.0.0.1", 0), UDPClient(), ClientPool()
+
+    async def main():
+        async with make_server() as server:
+            addr = await server.start_tcp()
+            client.address = addr
+            await client.connect()
+            udp = await server.start_udp()
+            await dgram.connect()
+            results = [
+                await client.request("ping", {"id": 1}),
+                await dgram.request(udp, "ping", {"id": 2}),
+                await pool.request(addr, "ping", {"id": 3}),
+            ]
+            for item in (client, dgram, pool):
+                await item.close()
+            return results
+
+    assert run(main()) == [{"id": 1}, {"id": 2}, {"id": 3}]
+
+
+def test_udp_ignores_garbage():
+    """Test malformed datagrams are ignored by the server."""
+
+    async def main():
+        async with make_server() as server:
+            addr = await server.start_udp()
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.sendto(b"not bencode", addr)
+            sock.close()
+            async with UDPClient(("127.0.0.1", 0)) as client:
+                return await client.request(addr, "ping", {"id": "a"})
+
+    assert run(main()) == {"id": "a"}
+
+
+def test_pool_reuses_connections():
+    """Test the pool reuses idle connections and grows when busy."""
+
+    async def main():
+        async with make_server() as server:
+            addr = await server.start_tcp()
+            async with ClientPool(size=3) as pool:
+                for num in range(5):
+                    await pool.request(addr, "ping", {"id": num})
+                single = len(pool.clients[addr])
+                calls = [
+                    pool.request(addr, "echo", {"delay": 20, "value": i})
+                    for i in range(10)
+                ]
+                results = await asyncio.gather(*calls)
+                return single, len(pool.clients[addr]), results
+
+    single, grown, results = run(main())
+    assert single == 1
+    assert 1 < grown <= 3
+    assert results == list(range(10))
+
+
+def test_pool_reconnects():
+    """Test the pool replaces closed connections."""
+
+    async def main():
+        async with make_server() as server:
+            addr = await server.start_tcp()
+            async with ClientPool() as pool:
+                await pool.request(addr, "ping", {"id": 1})
+                await pool.clients[addr][0].close()
+                return await pool.request(addr, "ping", {"id": 2})
+
+    assert run(main()) == {"id": 2}
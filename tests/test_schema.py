@@ -0,0 +1,141 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""Testing functions for Pyben schema module."""
+
+import pytest
+
+import pyben
+from pyben.exceptions import DecodeError
+from pyben.schema import (ANNOUNCE_RESPONSE, ANY, KRPC_ANNOUNCE_PEER,
+                          KRPC_GET_PEERS_RESPONSE, KRPC_PING, TORRENT_INFO,
+                          Optional, Schema)
+
+RESPONSE = {
+    "r": {
+        "id": b"i" * 20,
+        "token": b"tok",
+        "values": [b"\x01\x02\x03\x04\x1a\xe1"] * 3,
+    },
+    "t": b"aa",
+    "y": "r",
+}
+
+
+def test_decode_matches():
+    """Test matching messages use the specialized parser."""
+    schema = Schema(KRPC_GET_PEERS_RESPONSE.spec)
+    data = pyben.dumps(RESPONSE)
+    assert schema.decode(data) == (RESPONSE, len(data))
+    assert (schema.matched, schema.fallbacks) == (1, 0)
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        {**RESPONSE, "z": 1},
+        {"y": "r", "t": b"aa", "r": RESPONSE["r"]},
+        {**RESPONSE, "r": {"token": b"tok"}},
+        {**RESPONSE, "t": 5},
+        [1, 2],
+    ],
+)
+def test_decode_falls_back(message):
+    """Test other shapes are decoded by the generic decoder."""
+    schema = Schema(KRPC_GET_PEERS_RESPONSE.spec)
+    data = pyben.dumps(message)
+    assert schema.loads(data) == message
+    assert (schema.matched, schema.fallbacks) == (0, 1)
+    assert not schema.validate(data)
+    with pytest.raises(DecodeError):
+        schema.match(data)
+
+
+def test_fallback_keeps_bytes():
+    """Test bytes members stay bytes when decoding falls back."""
+    message = {"r": {"id": b"i" * 20}, "ro": 1, "t": b"aa", "y": "r"}
+    value = KRPC_PING.loads(pyben.dumps(message))
+    assert value == message
+    assert value["t"].__class__ is bytes and value["y"].__class__ is str
+    info = {"files": [{"path": ["a"]}], "name": "x", "pieces": b"ab"}
+    value = TORRENT_INFO.loads(pyben.dumps(info))
+    assert value == info and value["files"][0]["path"] == ["a"]
+
+
+@pytest.mark.parametrize(
+    "data", [b"d1:ai1e", b"d1:ai1x", b"d1:a5:abe", b"d1:ai-e"]
+)
+def test_malformed(data):
+    """Test malformed input raises DecodeError after falling back."""
+    schema = Schema({"a": int})
+    with pytest.raises(DecodeError):
+        schema.decode(data)
+
+
+def test_types():
+    """Test every kind of schema member."""
+    schema = Schema(
+        {
+            "any": ANY,
+            "bin": bytes,
+            "int": int,
+            "list": [[int]],
+            "opt": Optional(str),
+            "text": str,
+        }
+    )
+    value = {
+        "any": {"x": [b"\xff"]},
+        "bin": b"abc",
+        "int": -4,
+        "list": [[1, 2], []],
+        "text": "é",
+    }
+    data = pyben.dumps(value)
+    assert schema.loads(data) == value
+    assert schema.validate(data)
+    assert not schema.validate(pyben.dumps({**value, "text": b"\xff"}))
+    assert schema.match(data + b"i1e") == (value, len(data))
+
+
+def test_unsupported_spec():
+    """Test unknown schema members are rejected when compiling."""
+    with pytest.raises(TypeError):
+        Schema({"a": float})
+    with pytest.raises(TypeError):
+        Schema([int, str])
+
+
+def test_builtin_schemas():
+    """Test the built-in schemas accept their messages."""
+    announce = {"complete": 3, "interval": 1800, "peers": b"\x7f\0\0\1\0P"}
+    assert ANNOUNCE_RESPONSE.validate(pyben.dumps(announce))
+    query = {
+        "a": {
+            "id": b"i" * 20,
+            "info_hash": b"h" * 20,
+            "port": 6881,
+            "token": b"tok",
+        },
+        "q": "announce_peer",
+        "t": b"aa",
+        "y": "q",
+    }
+    assert KRPC_ANNOUNCE_PEER.validate(pyben.dumps(query))
+    info = {
+        "files": [{"length": 3, "path": ["a", "b"]}],
+        "name": "x",
+        "piece length": 16384,
+        "pieces": b"\xaa" * 20,
+    }
+    assert TORRENT_INFO.validate(pyben.dumps(info))
@@ -0,0 +1,125 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""Testing functions for Pyben shm module."""
+
+import pickle
+
+import pytest
+
+import pyben
+from pyben.shm import (SharedResult, _share_chunk, load_many_shared,
+                       share)
+from tests import context
+
+shared_memory = pytest.importorskip("multiprocessing.shared_memory")
+
+
+@pytest.fixture
+def torrents(tmp_path):
+    """Pytest Fixture providing paths to torrent files."""
+    paths = []
+    for num in range(12):
+        meta = context.testmeta()
+        meta["info"]["pieces"] = bytes([num + 200]) * 2000
+        path = str(tmp_path / f"{num}.torrent")
+        pyben.dump(meta, path)
+        paths.append(path)
+    return paths
+
+
+def test_share_roundtrip():
+    """Test a shared value is rebuilt and its block released."""
+    meta = context.testmeta()
+    meta["info"]["pieces"] = b"\xff" * 200
+    result = share(meta)
+    name = result.name
+    assert name is not None
+    assert isinstance(result.skeleton["info"]["pieces"], tuple)
+    clone = pickle.loads(pickle.dumps(result))
+    assert clone.load() == meta
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name)
+
+
+def test_share_small_values_inline():
+    """Test values without large byte strings skip shared memory."""
+    data = {"a": [1, "two", b"3"]}
+    result = share(data)
+    assert result.name is None
+    assert result.load() is data
+
+
+def test_share_skeleton_is_small():
+    """Test only the skeleton is pickled."""
+    data = {"blob": b"x" * 100000, "list": [b"y" * 5000, 1]}
+    result = share(data)
+    assert len(pickle.dumps(result)) < 200
+    assert result.load() == data
+
+
+def test_shared_view():
+    """Test zero copy views of a shared value."""
+    data = {"blob": b"x" * 1000, "name": "file"}
+    result = share(data)
+    with result.view() as view:
+        assert isinstance(view.value["blob"], memoryview)
+        assert view.value["blob"] == data["blob"]
+        assert view.value["name"] == "file"
+    assert result.name is None
+
+
+def test_shared_discard():
+    """Test discarding a result releases its block."""
+    result = share({"blob": b"x" * 1000})
+    name = result.name
+    result.discard()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name)
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_load_many_shared(torrents, executor):
+    """Test decoding in workers with shared memory results."""
+    results = list(load_many_shared(torrents, workers=2, executor=executor))
+    assert [path for path, _ in results] == torrents
+    for num, (_, meta) in enumerate(results):
+        assert meta["info"]["pieces"] == bytes([num + 200]) * 2000
+        assert meta["announce"] == context.testmeta()["announce"]
+
+
+def test_share_chunk_uses_block(torrents):
+    """Test chunk results move their large byte strings to shared memory."""
+    (result,) = _share_chunk(torrents[:3])
+    assert result.name is not None
+    assert result.size == 3 * 2000
+    assert len(pickle.dumps(result)) < 3 * 2000
+    pairs = result.load()
+    assert [path for path, _ in pairs] == torrents[:3]
+    assert pairs[2][1]["info"]["pieces"] == bytes([202]) * 2000
+
+
+def test_load_many_shared_errors(tmp_path):
+    """Test errors are returned in place of results."""
+    path = str(tmp_path / "missing.torrent")
+    (result,) = load_many_shared([path], workers=1, executor="thread")
+    assert isinstance(result[1], pyben.FilePathError)
+
+
+def test_shared_result_threshold():
+    """Test the threshold controls which strings are shared."""
+    result = share({"a": b"x" * 10, "b": b"y" * 100}, threshold=50)
+    assert result.skeleton["a"] == b"x" * 10
+    assert result.skeleton["b"] == (0, 100)
+    assert isinstance(result, SharedResult)
+    result.discard()
@@ -0,0 +1,179 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""Testing functions for Pyben sinks module."""
+
+import hashlib
+import io
+import os
+import socket
+import threading
+
+import pytest
+
+import pyben
+from pyben.sinks import BufferList, HashSink, TeeSink, encode_to, writev
+from tests import context
+
+
+@pytest.fixture
+def bigmeta():
+    """Pytest Fixture providing metadata with a large pieces value."""
+    meta = context.testmeta()
+    meta["info"]["pieces"] = os.urandom(1 << 18)
+    return meta
+
+
+@pytest.mark.parametrize("decoded, encoded", context.data())
+def test_benencode_into(decoded, encoded):
+    """Test encoding fragments matches benencode."""
+    buffers = BufferList()
+    pyben.benencode_into(decoded, buffers.write)
+    assert buffers.getvalue() == encoded
+
+
+def test_bufferlist_by_reference(bigmeta):
+    """Test large values are stored by reference, not copied."""
+    buffers = BufferList()
+    pyben.benencode_into(bigmeta, buffers.write)
+    assert any(buf is bigmeta["info"]["pieces"] for buf in buffers.buffers)
+    assert buffers.getvalue() == pyben.dumps(bigmeta)
+
+
+def test_bufferlist_coalesce():
+    """Test small fragments are coalesced into one buffer."""
+    buffers = BufferList()
+    pyben.benencode_into(context.testmeta(), buffers.write)
+    assert len(buffers.getbuffers()) == 1
+
+
+def test_dump_vectored_path(bigmeta, tmp_path):
+    """Test vectored dump to a path."""
+    path = tmp_path / "vectored.torrent"
+    pyben.dump(bigmeta, path, vectored=True)
+    assert path.read_bytes() == pyben.dumps(bigmeta)
+
+
+def test_dump_vectored_file(bigmeta, tmp_path):
+    """Test vectored dump to an open file keeps the file position."""
+    path = tmp_path / "vectored.torrent"
+    with open(path, "wb") as _fd:
+        _fd.write(b"prefix")
+        pyben.dump(bigmeta, _fd, vectored=True)
+        assert _fd.tell() == len(pyben.dumps(bigmeta)) + 6
+        _fd.write(b"suffix")
+    expected = b"prefix" + pyben.dumps(bigmeta) + b"suffix"
+    assert path.read_bytes() == expected
+
+
+def test_dump_vectored_fd(bigmeta, tmp_path):
+    """Test vectored dump to a file descriptor leaves it open."""
+    path = tmp_path / "vectored.torrent"
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT)
+    try:
+        pyben.dump(bigmeta, fd, vectored=True)
+        os.write(fd, b"suffix")
+    finally:
+        os.close(fd)
+    assert path.read_bytes() == pyben.dumps(bigmeta) + b"suffix"
+
+
+def test_dump_vectored_bytesio(bigmeta):
+    """Test vectored dump falls back to write for in-memory buffers."""
+    buffer = io.BytesIO()
+    pyben.dump(bigmeta, buffer, vectored=True)
+    assert buffer.getvalue() == pyben.dumps(bigmeta)
+
+
+def test_dump_vectored_socket(bigmeta):
+    """Test vectored dump through socket.sendmsg."""
+    left, right = socket.socketpair()
+    expected = pyben.dumps(bigmeta)
+    with left, right:
+        chunks = []
+
+        def reader():
+            while True:
+                chunk = right.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+        pyben.dump(bigmeta, left, vectored=True)
+        left.shutdown(socket.SHUT_WR)
+        thread.join()
+    assert b"".join(chunks) == expected
+
+
+def test_writev_descriptor(tmp_path):
+    """Test writev with a raw file descriptor."""
+    path = tmp_path / "raw.bin"
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT)
+    try:
+        total = writev(fd, [b"abc", memoryview(b"def"), bytearray(b"g")])
+    finally:
+        os.close(fd)
+    assert total == 7
+    assert path.read_bytes() == b"abcdefg"
+
+
+@pytest.mark.parametrize("vectored", [False, True])
+def test_dump_hashes_info(bigmeta, tmp_path, vectored):
+    """Test hashing the info dictionary while dumping."""
+    path = tmp_path / "hashed.torrent"
+    hasher = HashSink("sha1", "sha256")
+    pyben.dump(bigmeta, path, vectored=vectored, taps={"info": hasher})
+    info = pyben.dumps(bigmeta["info"])
+    assert path.read_bytes() == pyben.dumps(bigmeta)
+    assert hasher.digests()["sha1"] == hashlib.sha1(info).digest()
+    assert hasher.hexdigests()["sha256"] == hashlib.sha256(info).hexdigest()
+
+
+def test_encode_to_nested_taps():
+    """Test taps on nested dictionary and list paths."""
+    meta = context.testmeta()
+    outer, inner, item = HashSink("md5"), HashSink("md5"), HashSink("md5")
+    buffer = io.BytesIO()
+    taps = {
+        ("info",): outer,
+        ("info", "name"): inner,
+        ("announce list", 0, 1): item,
+    }
+    encode_to(meta, buffer, taps=taps)
+    assert buffer.getvalue() == pyben.dumps(meta)
+    expected = {
+        outer: meta["info"],
+        inner: meta["info"]["name"],
+        item: meta["announce list"][0][1],
+    }
+    for sink, value in expected.items():
+        digest = hashlib.md5(pyben.dumps(value)).digest()
+        assert sink.digests()["md5"] == digest
+
+
+def test_tee_sink():
+    """Test TeeSink writes to every sink."""
+    first, second = io.BytesIO(), BufferList()
+    encode_to(context.testmeta(), TeeSink(first, second))
+    assert first.getvalue() == second.getvalue() == pyben.dumps(
+        context.testmeta()
+    )
+
+
+def test_hash_sink_objects():
+    """Test HashSink accepts hashlib objects."""
+    sink = HashSink(hashlib.sha1())
+    sink.write(b"abc")
+    assert sink.digests() == {"sha1": hashlib.sha1(b"abc").digest()}
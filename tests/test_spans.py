@@ -0,0 +1,137 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""Testing functions for Pyben spans module."""
+
+import copy
+import pickle
+
+import pytest
+
+import pyben
+from pyben.exceptions import DecodeError
+from pyben.spans import SpanDict, SpanList, decode_spans, encode_spans
+from tests import context
+
+# keys are deliberately out of sorted order
+UNSORTED = b"d4:zzzzi1e4:infod6:pieces4:abcd4:name3:fooe4:listli1ei2eee"
+
+
+@pytest.mark.parametrize("decoded, encoded", context.data())
+def test_decode_spans(decoded, encoded):
+    """Test span decoding matches regular decoding."""
+    assert decode_spans(encoded) == decoded
+
+
+@pytest.mark.parametrize("encoded", [item[1] for item in context.data()])
+def test_dumps_spans_roundtrip(encoded):
+    """Test unmodified span containers re-encode byte for byte."""
+    assert pyben.dumps(pyben.loads(encoded, spans=True)) == encoded
+
+
+def test_spans_clean_copy():
+    """Test unmodified containers are copied from the source."""
+    meta = pyben.loads(UNSORTED, spans=True)
+    fragments = []
+    encode_spans(meta, fragments.append)
+    assert len(fragments) == 1
+    assert fragments[0].obj is meta.source
+
+
+def test_spans_setitem():
+    """Test modified dictionary only re-encodes the dirty path."""
+    meta = pyben.loads(UNSORTED, spans=True)
+    meta["zzzz"] = 2
+    fragments = []
+    encode_spans(meta, fragments.append)
+    info = pyben.dumps(meta["info"])
+    views = [bytes(f) for f in fragments if isinstance(f, memoryview)]
+    assert info in views
+    assert b"".join(fragments) == UNSORTED.replace(b"i1e", b"i2e", 1)
+
+
+@pytest.mark.parametrize(
+    "mutate",
+    [
+        lambda m: m["list"].append(3),
+        lambda m: m["list"].extend([3]),
+        lambda m: m["list"].insert(2, 3),
+        lambda m: m["info"].update({"length": 3}),
+        lambda m: m["info"].setdefault("length", 3),
+        lambda m: m["info"].pop("name"),
+        lambda m: m["info"].__delitem__("name"),
+        lambda m: m["list"].__setitem__(0, 5),
+        lambda m: m["list"].reverse(),
+    ],
+)
+def test_spans_nested_mutation(mutate):
+    """Test nested mutations are always encoded."""
+    meta = pyben.loads(UNSORTED, spans=True)
+    plain = pyben.loads(UNSORTED)
+    mutate(meta)
+    mutate(plain)
+    assert pyben.dumps(meta) == pyben.benencode(plain)
+
+
+def test_spans_moved_subtree():
+    """Test clean subtrees are copied even inside new containers."""
+    meta = pyben.loads(UNSORTED, spans=True)
+    new = {"wrapped": [meta["info"]]}
+    info = pyben.dumps(pyben.loads(UNSORTED)["info"])
+    assert pyben.dumps(new) == b"d7:wrappedl" + info + b"ee"
+
+
+def test_spans_dump_file(tmp_path):
+    """Test span round trip through load and dump."""
+    path = tmp_path / "spans.torrent"
+    path.write_bytes(UNSORTED)
+    meta = pyben.load(path, spans=True)
+    meta["info"]["name"] = "bar"
+    pyben.dump(meta, path)
+    assert path.read_bytes() == UNSORTED.replace(b"3:foo", b"3:bar")
+
+
+def test_spans_copy_and_pickle():
+    """Test copies and pickles keep their span state."""
+    meta = pyben.loads(UNSORTED, spans=True)
+    for other in (copy.copy(meta), pickle.loads(pickle.dumps(meta))):
+        assert isinstance(other, SpanDict)
+        assert not other.dirty
+        assert pyben.dumps(other) == UNSORTED
+
+
+def test_spans_new_containers_dirty():
+    """Test containers created by hand are always encoded."""
+    assert SpanDict(a=1).dirty
+    assert SpanList([1]).dirty
+    assert pyben.dumps(SpanList([1])) == b"li1ee"
+
+
+@pytest.mark.parametrize(
+    "data", [b"li1e", b"5:ab", b"dl1:ae1:be", b"d1:ae", b"i1x2e", b"x"]
+)
+def test_spans_malformed(data):
+    """Test malformed data raises DecodeError."""
+    with pytest.raises(DecodeError):
+        decode_spans(data)
+    with pytest.raises(DecodeError):
+        pyben.loads(data, spans=True)
+
+
+def test_spans_deep_nesting():
+    """Test deeply nested data is decoded without recursion."""
+    data = b"l" * 5000 + b"e" * 5000
+    value = decode_spans(data)
+    assert isinstance(value, SpanList) and not value.dirty
+    assert (value.start, value.end) == (0, len(data))
+    assert value[0].start == 1 and value[0].end == len(data) - 1
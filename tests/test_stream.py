@@ -0,0 +1,73 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""Testing functions for Pyben stream module."""
+
+import pytest
+
+import pyben
+from pyben.exceptions import DecodeError
+from pyben.stream import IncrementalDecoder
+from tests import context
+
+
+@pytest.mark.parametrize("decoded, encoded", context.data())
+def test_incremental_bytewise(decoded, encoded):
+    """Test values fed one byte at a time."""
+    decoder = IncrementalDecoder()
+    values = []
+    for index in range(len(encoded)):
+        values.extend(decoder.decode(encoded[index:index + 1]))
+    assert values == [decoded]
+    decoder.close()
+
+
+def test_incremental_concatenated():
+    """Test several values arriving in one piece."""
+    items = [decoded for decoded, _ in context.data()]
+    stream = b"".join(pyben.dumps(item) for item in items)
+    decoder = IncrementalDecoder()
+    assert decoder.decode(stream[:-3]) == items[:-1]
+    assert len(decoder) == len(pyben.dumps(items[-1])) - 3
+    assert decoder.decode(stream[-3:]) == items[-1:]
+    assert len(decoder) == 0
+
+
+def test_incremental_frames():
+    """Test raw frames are returned unchanged."""
+    decoder = IncrementalDecoder()
+    decoder.feed(b"4:spami42ed1:ali1eee3:")
+    assert decoder.next_frame() == b"4:spam"
+    assert decoder.next_frame() == b"i42e"
+    assert decoder.next_frame() == b"d1:ali1eee"
+    assert decoder.next_frame() is None
+    assert decoder.remainder == b"3:"
+    with pytest.raises(DecodeError):
+        decoder.close()
+
+
+@pytest.mark.parametrize("data", [b"e", b"x", b"1" * 24, b"1x:"])
+def test_incremental_malformed(data):
+    """Test malformed streams raise DecodeError."""
+    with pytest.raises(DecodeError):
+        IncrementalDecoder().decode(data)
+
+
+def test_incremental_max_size():
+    """Test values larger than max_size are rejected early."""
+    decoder = IncrementalDecoder(max_size=16)
+    assert decoder.decode(b"4:spam") == ["spam"]
+    with pytest.raises(DecodeError):
+        decoder.decode(b"1000:")
+    with pytest.raises(DecodeError):
+        IncrementalDecoder(max_size=16).decode(b"l" + b"i1e" * 6)
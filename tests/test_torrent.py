@@ -0,0 +1,152 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""Testing functions for Pyben torrent module."""
+
+import hashlib
+import pickle
+
+import pytest
+
+import pyben
+from pyben.exceptions import DecodeError, FilePathError
+from pyben.torrent import Metainfo, PieceHashes
+from tests import context
+
+PIECES = b"".join(hashlib.sha1(bytes([num])).digest() for num in range(5))
+ROOT = hashlib.sha256(b"root").digest()
+LAYER = b"".join(hashlib.sha256(bytes([num])).digest() for num in range(3))
+
+
+def single() -> dict:
+    """Return a single file v1 torrent."""
+    meta = context.testmeta()
+    meta["info"]["pieces"] = PIECES
+    return meta
+
+
+def hybrid() -> dict:
+    """Return a multi file hybrid torrent."""
+    return {
+        "announce": "http://a/announce",
+        "announce-list": [["http://a/announce"], ["udp://b:80", "udp://c"]],
+        "info": {
+            "file tree": {
+                "dir": {"x.bin": {"": {"length": 7, "pieces root": ROOT}}},
+                "y.bin": {"": {"length": 5}},
+            },
+            "files": [
+                {"length": 7, "path": ["dir", "x.bin"]},
+                {"attr": "p", "length": 16377, "path": [".pad", "16377"]},
+                {"length": 5, "path": ["y.bin"]},
+            ],
+            "meta version": 2,
+            "name": "payload",
+            "piece length": 16384,
+            "pieces": PIECES[:20],
+        },
+        "piece layers": {ROOT: LAYER},
+    }
+
+
+def test_single_file():
+    """Test fields of a single file torrent."""
+    data = pyben.dumps(single())
+    meta = Metainfo(data)
+    assert meta.name == "ubuntu.iso"
+    assert meta.length == 12845738
+    assert meta.piece_length == 262144
+    assert meta.files == ((("ubuntu.iso",), 12845738),)
+    assert meta.trackers == ("http://ubuntu.com/announce",)
+    info = pyben.dumps(single()["info"])
+    assert meta.infohash == hashlib.sha1(info).digest()
+    assert meta.infohash_v2 is None
+    assert meta.info_get("source") == "ubuntu"
+    assert meta.get("created by") == "mktorrent"
+    assert meta.to_dict() == pyben.loads(data)
+
+
+def test_hybrid():
+    """Test fields of a multi file hybrid torrent."""
+    meta = Metainfo(pyben.dumps(hybrid()))
+    assert meta.length == 12
+    assert meta.files == ((("dir", "x.bin"), 7), (("y.bin",), 5))
+    assert meta.trackers == ("http://a/announce", "udp://b:80", "udp://c")
+    info = pyben.dumps(hybrid()["info"])
+    assert meta.infohash_v2 == hashlib.sha256(info).digest()
+    layers = meta.piece_layers()
+    assert list(layers) == [ROOT]
+    assert layers[ROOT][2] == hashlib.sha256(bytes([2])).digest()
+
+
+def test_v2_only_file_tree():
+    """Test files are read from the file tree without a files list."""
+    meta = hybrid()
+    del meta["info"]["files"], meta["info"]["pieces"]
+    meta = Metainfo(pyben.dumps(meta))
+    assert meta.files == ((("dir", "x.bin"), 7), (("y.bin",), 5))
+    assert meta.pieces is None
+
+
+def test_piece_hashes():
+    """Test digests are sliced from the encoded torrent."""
+    meta = Metainfo(pyben.dumps(single()))
+    pieces = meta.pieces
+    assert len(pieces) == 5
+    assert pieces[0] == hashlib.sha1(b"\0").digest()
+    assert pieces[-1] == pieces[4] == PIECES[80:]
+    assert list(pieces) == [PIECES[i:i + 20] for i in range(0, 100, 20)]
+    assert pieces[1:3].tobytes() == PIECES[20:60]
+    assert pieces[::2] == [PIECES[0:20], PIECES[40:60], PIECES[80:100]]
+    assert pieces[1:3] == PieceHashes(PIECES[20:60])
+    assert pieces[0] in pieces
+    with pytest.raises(IndexError):
+        _ = pieces[5]
+    with pytest.raises(ValueError):
+        PieceHashes(b"x" * 21)
+
+
+def test_lazy_slots():
+    """Test fields are computed once and instances have no dict."""
+    meta = Metainfo(pyben.dumps(single()))
+    assert not hasattr(meta, "__dict__")
+    pieces, files = meta.pieces, meta.files
+    assert meta.pieces is pieces and meta.files is files
+
+
+def test_pickle():
+    """Test instances pickle through their encoded form."""
+    meta = Metainfo(pyben.dumps(hybrid()))
+    assert len(meta.pieces) == 1
+    clone = pickle.loads(pickle.dumps(meta))
+    assert clone.raw == meta.raw
+    assert clone.pieces == meta.pieces
+    assert pickle.loads(pickle.dumps(meta.pieces)) == meta.pieces
+
+
+def test_load(tmp_path):
+    """Test loading from a path."""
+    path = tmp_path / "meta.torrent"
+    pyben.dump(single(), path)
+    assert Metainfo.load(path).name == "ubuntu.iso"
+    with pytest.raises(FilePathError):
+        Metainfo.load(tmp_path / "missing.torrent")
+
+
+@pytest.mark.parametrize(
+    "data", [b"", b"li1ee", b"de", b"d4:infoi1ee", b"d4:infod", b"d4:info-1:e"]
+)
+def test_invalid(data):
+    """Test data without an info dictionary raises DecodeError."""
+    with pytest.raises(DecodeError):
+        Metainfo(data)
@@ -0,0 +1,197 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""Testing functions for Pyben transcode module."""
+
+import io
+import json
+
+import pytest
+
+import pyben
+from pyben.api import _to_json
+from pyben.exceptions import DecodeError, EncodeError
+from pyben.transcode import to_json_stream
+
+DATA = {
+    "announce": "http://tracker/announce",
+    "info": {
+        "name": "café \"quoted\"\n",
+        "pieces": bytes(range(200, 256)) * 40,
+        "files": [{"length": 12, "path": ["a", "b"]}, {"length": -3}],
+        "empty": {},
+        "none": [],
+        "text": "é中" * 700,
+    },
+    "nested": [[[1, [2]], {}], []],
+}
+
+
+class Unseekable(io.RawIOBase):
+    """Binary stream that cannot seek."""
+
+    def __init__(self, data: bytes):
+        """Store the data."""
+        self.data = io.BytesIO(data)
+
+    def readable(self) -> bool:
+        """Return True."""
+        return True
+
+    def readinto(self, buf) -> int:
+        """Read from the wrapped buffer."""
+        return self.data.readinto(buf)
+
+
+def transcode(data, **kwargs) -> str:
+    """Return the JSON text written by `to_json_stream`."""
+    out = io.StringIO()
+    to_json_stream(data, out, **kwargs)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("indent", [None, 0, 2, 4, "\t"])
+@pytest.mark.parametrize("chunk_size", [7, 64, 1 << 16])
+def test_matches_json_dumps(indent, chunk_size):
+    """Test streaming output equals json.dumps of the decoded tree."""
+    expected = json.dumps(_to_json(DATA), indent=indent)
+    encoded = pyben.dumps(DATA)
+    assert transcode(encoded, indent=indent, chunk_size=chunk_size) == (
+        expected
+    )
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1 << 16])
+def test_unseekable(chunk_size):
+    """Test non seekable streams are transcoded."""
+    expected = json.dumps(_to_json(DATA))
+    source = Unseekable(pyben.dumps(DATA))
+    assert transcode(source, chunk_size=chunk_size) == expected
+
+
+def test_path(tmp_path):
+    """Test transcoding a file by path."""
+    path = tmp_path / "meta.torrent"
+    path.write_bytes(pyben.dumps(DATA))
+    assert json.loads(transcode(str(path))) == _to_json(DATA)
+
+
+@pytest.mark.parametrize("value", [0, -12, "", b"\xff\x00", [], {}])
+def test_scalars(value):
+    """Test top level scalars and empty containers."""
+    assert transcode(pyben.dumps(value)) == json.dumps(_to_json(value))
+
+
+@pytest.mark.parametrize(
+    "data",
+    [b"", b"l", b"i12", b"ixe", b"5:abc", b"di1ei2ee", b"d1:ae", b"x"],
+)
+def test_malformed(data):
+    """Test malformed and truncated input raises DecodeError."""
+    with pytest.raises(DecodeError):
+        transcode(data, chunk_size=2)
+
+
+def test_loads_to_json():
+    """Test loads with to_json hex encodes binary strings."""
+    encoded = pyben.dumps(DATA)
+    assert pyben.loads(encoded, to_json=True) == _to_json(DATA)
+
+
+def test_show_streams(tmp_path, capsys):
+    """Test show writes the same text for paths, files and bytes."""
+    path = tmp_path / "meta.torrent"
+    path.write_bytes(pyben.dumps(DATA))
+    expected = json.dumps(_to_json(DATA), indent=4)
+    pyben.show(str(path))
+    assert capsys.readouterr().out == expected
+    with open(path, "rb") as binfile:
+        pyben.show(binfile)
+    assert capsys.readouterr().out == expected
+    pyben.show(path.read_bytes())
+    assert capsys.readouterr().out == expected
+
+
+META = {
+    "announce": "http://tracker/announce",
+    "info": {
+        "name": "deadbeef",
+        "piece length": 16384,
+        "pieces": bytes(range(200, 240)),
+        "files": [{"length": 3, "path": ["ab"]}],
+    },
+    "piece layers": {b"\xfe" * 32: b"\xfd" * 64},
+}
+
+
+def test_from_json_object():
+    """Test from_json reverses load with to_json."""
+    meta = pyben.loads(pyben.dumps(META), to_json=True)
+    assert pyben.from_json(meta) == pyben.dumps(META)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1 << 16])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_from_json_stream(chunk_size, indent):
+    """Test text and binary JSON streams encode like objects."""
+    meta = pyben.loads(pyben.dumps(META), to_json=True)
+    text = json.dumps(meta, indent=indent)
+    expected = pyben.dumps(META)
+    source = io.StringIO(text)
+    assert pyben.from_json(source, chunk_size=chunk_size) == expected
+    source = io.BytesIO(text.encode("utf-8"))
+    out = io.BytesIO()
+    pyben.from_json(source, out, chunk_size=chunk_size)
+    assert out.getvalue() == expected
+
+
+def test_from_json_paths():
+    """Test explicit key paths and wildcards."""
+    data = {"a": {"b": "ff", "c": "ff"}, "l": ["fe", "fd"], "b": "ff"}
+    paths = [("a", "b"), ("l", "*")]
+    expected = {"a": {"b": b"\xff", "c": "ff"}, "l": [b"\xfe", b"\xfd"]}
+    expected["b"] = "ff"
+    assert pyben.from_json(data, binary_keys=paths) == pyben.dumps(expected)
+    stream = io.StringIO(json.dumps(data))
+    assert pyben.from_json(stream, binary_keys=paths) == pyben.dumps(expected)
+
+
+@pytest.mark.parametrize(
+    "text", ['{"a": 1.5}', "[null]", "[1e3]", '{"a": nope}']
+)
+def test_from_json_unencodable(text):
+    """Test values without a bencode form raise EncodeError."""
+    with pytest.raises(EncodeError):
+        pyben.from_json(io.StringIO(text))
+
+
+@pytest.mark.parametrize("text", ["", "[1,", '{"a" 1}', "[1 2]", '{1: 2}'])
+def test_from_json_malformed(text):
+    """Test malformed JSON raises JSONDecodeError."""
+    with pytest.raises(json.JSONDecodeError):
+        pyben.from_json(io.StringIO(text), chunk_size=2)
+
+
+@pytest.mark.parametrize("text", ['{"a": 1} x', "[1]]", "1 2", '"a"\n{}'])
+def test_from_json_extra_data(text):
+    """Test text after the document raises JSONDecodeError."""
+    with pytest.raises(json.JSONDecodeError, match="Extra data"):
+        pyben.from_json(io.StringIO(text), chunk_size=2)
+    assert pyben.from_json(io.StringIO(" [1] \n\t ")) == b"li1ee"
+
+
+def test_from_json_literals():
+    """Test booleans are encoded as integers."""
+    assert pyben.from_json(io.StringIO("[true, false, -0, 12]")) == (
+        b"li1ei0ei0ei12ee"
+    )
@@ -0,0 +1,182 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#####################################################################
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#####################################################################
+"""Testing functions for Pyben verify module."""
+
+import hashlib
+import os
+
+import pytest
+
+import pyben
+from pyben.torrent import Metainfo
+from pyben.verify import BLOCK_SIZE, merkle_root, verify
+from tests import context
+
+PIECE = 1 << 15
+FILES = {"a.bin": 40000, "sub/b.bin": 30000, "sub/c.bin": 0, "d.bin": 5}
+
+
+def v1_meta(contents: dict) -> dict:
+    """Build a v1 torrent with pieces spanning the files."""
+    stream = b"".join(contents.values())
+    pieces = b"".join(
+        hashlib.sha1(stream[start:start + PIECE]).digest()
+        for start in range(0, len(stream), PIECE)
+    )
+    files = [
+        {"length": len(data), "path": name.split("/")}
+        for name, data in contents.items()
+    ]
+    info = {
+        "files": files,
+        "name": "payload",
+        "piece length": PIECE,
+        "pieces": pieces,
+    }
+    return {"info": info}
+
+
+def reference_root(data: bytes, leaves: int) -> bytes:
+    """Compute a merkle root recursively."""
+    if leaves == 1:
+        return hashlib.sha256(data).digest() if data else bytes(32)
+    half = leaves // 2 * BLOCK_SIZE
+    left = reference_root(data[:half], leaves // 2)
+    right = reference_root(data[half:], leaves // 2)
+    return hashlib.sha256(left + right).digest()
+
+
+def v2_meta(contents: dict) -> dict:
+    """Build a v2-only torrent of the payload files."""
+    tree, layers = {}, {}
+    for name, data in contents.items():
+        node = tree
+        for part in name.split("/"):
+            node = node.setdefault(part, {})
+        node[""] = {"length": len(data)}
+        if not data:
+            continue
+        if len(data) <= PIECE:
+            blocks = -(-len(data) // BLOCK_SIZE)
+            leaves = 1 << max(blocks - 1, 0).bit_length()
+            root = reference_root(data, leaves)
+        else:
+            layer = [
+                reference_root(data[start:start + PIECE], PIECE // BLOCK_SIZE)
+                for start in range(0, len(data), PIECE)
+            ]
+            width = 1 << (len(layer) - 1).bit_length()
+            root = reference_root(data, width * PIECE // BLOCK_SIZE)
+            layers[root] = b"".join(layer)
+        node[""]["pieces root"] = root
+    info = {
+        "file tree": tree,
+        "meta version": 2,
+        "name": "payload",
+        "piece length": PIECE,
+    }
+    return {"info": info, "piece layers": layers}
+
+
+def test_v1_complete(tmp_path):
+    """Test a complete v1 download with pieces across files."""
+    meta = v1_meta(context.payload(tmp_path, FILES))
+    result = verify(meta, tmp_path, workers=3)
+    assert result.complete
+    assert result.pieces == 3
+    assert result.bitfield == bytearray(b"\xe0")
+    assert result.size == sum(FILES.values())
+    assert result.mbps >= 0
+    assert repr(result).startswith("VerifyResult(3/3 pieces")
+
+
+def test_v1_damaged(tmp_path):
+    """Test corrupt and missing data clear the bits of their pieces."""
+    meta = v1_meta(context.payload(tmp_path, FILES))
+    path = tmp_path / "payload" / "sub" / "b.bin"
+    data = bytearray(path.read_bytes())
+    data[0] ^= 0xFF
+    path.write_bytes(data)
+    (tmp_path / "payload" / "d.bin").unlink()
+    result = verify(Metainfo(pyben.dumps(meta)), tmp_path)
+    assert (result.verified, result.pieces) == (1, 3)
+    assert 0 in result and 1 not in result and 2 not in result
+
+
+def test_v1_padding(tmp_path):
+    """Test padding files are hashed as zeros."""
+    (tmp_path / "payload").mkdir()
+    (tmp_path / "payload" / "x.bin").write_bytes(b"x" * 100)
+    stream = b"x" * 100 + bytes(PIECE - 100)
+    info = {
+        "files": [
+            {"length": 100, "path": ["x.bin"]},
+            {"attr": "p", "length": PIECE - 100, "path": [".pad", "1"]},
+        ],
+        "name": "payload",
+        "piece length": PIECE,
+        "pieces": hashlib.sha1(stream).digest(),
+    }
+    assert verify({"info": info}, tmp_path).complete
+
+
+def test_single_file(tmp_path):
+    """Test a single file torrent is found directly in the directory."""
+    data = os.urandom(PIECE + 1)
+    (tmp_path / "one.iso").write_bytes(data)
+    info = {
+        "length": len(data),
+        "name": "one.iso",
+        "piece length": PIECE,
+        "pieces": hashlib.sha1(data[:PIECE]).digest()
+        + hashlib.sha1(data[PIECE:]).digest(),
+    }
+    result = verify({"info": info}, str(tmp_path), workers=1)
+    assert result.complete and result.bitfield == bytearray(b"\xc0")
+
+
+@pytest.mark.parametrize("leaves", [1, 2, 4, 8])
+def test_merkle_root(leaves):
+    """Test merkle roots against a recursive reference."""
+    data = os.urandom(leaves * BLOCK_SIZE - 7)
+    hashes = [
+        hashlib.sha256(data[start:start + BLOCK_SIZE]).digest()
+        for start in range(0, len(data), BLOCK_SIZE)
+    ]
+    assert merkle_root(hashes, leaves * 2) == reference_root(data, leaves * 2)
+
+
+def test_v2(tmp_path):
+    """Test v2 pieces are checked per file with their merkle hashes."""
+    meta = v2_meta(context.payload(tmp_path, FILES))
+    result = verify(meta, tmp_path)
+    assert (result.verified, result.pieces) == (4, 4)
+    path = tmp_path / "payload" / "a.bin"
+    data = bytearray(path.read_bytes())
+    data[PIECE] ^= 0xFF
+    path.write_bytes(data)
+    result = verify(meta, tmp_path)
+    assert (result.verified, result.pieces) == (3, 4)
+    assert 1 not in result
+    assert result.bitfield == bytearray(b"\xb0")
+
+
+def test_v2_bad_layer(tmp_path):
+    """Test piece layers not matching their pieces root are ignored."""
+    meta = v2_meta(context.payload(tmp_path, FILES))
+    root, layer = next(iter(meta["piece layers"].items()))
+    meta["piece layers"][root] = layer[32:] + layer[:32]
+    result = verify(meta, tmp_path)
+    assert (result.verified, result.pieces) == (2, 4)
+    assert 0 not in result and 1 not in result